@@ -0,0 +1,92 @@
+"""
+Animation Benchmarks
+====================
+Compare the size and time of exporting an animation as a stream of
+keyframes and deltas with exporting every frame in full::
+
+    python benchmarks/bench_animation.py
+    python benchmarks/bench_animation.py --frames 200 --points 5000
+
+The animation moves a line, updates the title and keeps static markers.
+"full frames" stores every frame in full (one keyframe per frame); "vega
+spec per frame" re-runs the Vega renderer on each frame, as was needed
+before animations could be exported.  Most of the time is spent drawing
+each frame, which every strategy needs.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+
+from mplexporter import Exporter
+from mplexporter.animation import export_animation
+from mplexporter.renderers.vega_renderer import VegaRenderer, VegaHTML
+
+
+def make_animation(frames, npoints):
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, npoints)
+    line, = ax.plot(x, np.sin(x), '-')
+    ax.plot(x[::10], np.cos(x[::10]), 'o')
+    title = ax.set_title('')
+
+    def update(i):
+        line.set_ydata(np.sin(x + 0.1 * i))
+        title.set_text('frame {0}'.format(i))
+        return line, title
+
+    return FuncAnimation(fig, update, frames=frames)
+
+
+def stream(keyframe_interval):
+    def export(anim):
+        return json.dumps(export_animation(
+            anim, keyframe_interval=keyframe_interval).to_dict())
+    return export
+
+
+def vega_per_frame(anim):
+    fig = anim._fig
+    specs = []
+    for framedata in anim.new_frame_seq():
+        anim._draw_frame(framedata)
+        renderer = VegaRenderer()
+        Exporter(renderer, close_mpl=False).run(fig)
+        specs.append(VegaHTML(renderer).specification)
+    return json.dumps(specs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--keyframe-interval', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    print("{0:<28}{1:>10}{2:>14}".format("strategy", "time (s)", "size (kB)"))
+    for name, export in [("vega spec per frame", vega_per_frame),
+                         ("full frames", stream(1)),
+                         ("keyframes every {0}".format(args.keyframe_interval),
+                          stream(args.keyframe_interval))]:
+        anim = make_animation(args.frames, args.points)
+        t0 = time.time()
+        output = export(anim)
+        elapsed = time.time() - t0
+        print("{0:<28}{1:>10.2f}{2:>14.1f}".format(name, elapsed,
+                                                   len(output) / 1e3))
+        plt.close(anim._fig)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
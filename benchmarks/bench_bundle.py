@@ -0,0 +1,111 @@
+"""
+Dashboard Bundle Benchmark
+==========================
+Compare a single VegaBundle document holding many figures to the
+concatenation of separately exported figures, each with its own loader::
+
+    python benchmarks/bench_bundle.py --figures 40
+
+The figures are plotted against a few shared x arrays, as in a dashboard.
+Reported are the document size, the number of bytes the browser parses
+before the first figure can render (a proxy for the time to first render,
+which needs a browser to measure), the time to generate the document, and
+the time to parse all of its JSON payloads.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from mplexporter.renderers.vega_renderer import (VegaBundle, fig_to_vega,
+                                                 D3_URL, VEGA_URL)
+
+SEPARATE_LOADER = ('<script src="{0}"></script>\n'
+                   '<script src="{1}"></script>\n').format(D3_URL, VEGA_URL)
+
+
+def make_figures(n, points):
+    xs = [np.linspace(0, 10 * (i + 1), points) for i in range(4)]
+    figures = []
+    for i in range(n):
+        fig, ax = plt.subplots()
+        x = xs[i % len(xs)]
+        ax.plot(x, np.sin(x), '-k')
+        ax.plot(x, np.cos(x * (i % 5)), '-r')
+        figures.append(fig)
+        plt.close(fig)
+    return figures
+
+
+def separate(figures):
+    return [SEPARATE_LOADER + fig_to_vega(fig) for fig in figures]
+
+
+def bundled(figures):
+    bundle = VegaBundle()
+    for fig in figures:
+        bundle.add(fig)
+    return bundle.html()
+
+
+def parse_payloads(html):
+    """Parse the JSON literals of a document, returning their number"""
+    decoder = json.JSONDecoder()
+    count = 0
+    for marker in ('vg.parse.spec(', 'mplexporter.render(', '] = '):
+        start = html.find(marker)
+        while start != -1:
+            index = start + len(marker)
+            try:
+                obj, index = decoder.raw_decode(html, index)
+                count += 1
+                if html.startswith(', {', index):
+                    # the table references of mplexporter.render
+                    obj, index = decoder.raw_decode(html, index + 2)
+            except ValueError:  # e.g. the loader code
+                pass
+            start = html.find(marker, index)
+    return count
+
+
+def measure(name, build, figures):
+    t0 = time.time()
+    documents = build(figures)
+    elapsed = time.time() - t0
+    if isinstance(documents, list):
+        first = len(documents[0])
+        documents = ''.join(documents)
+    else:
+        first = documents.index('</script>', documents.index(
+            'mplexporter.render(')) + len('</script>')
+    t0 = time.time()
+    parse_payloads(documents)
+    parse = time.time() - t0
+    print("{0:<10}{1:>12.1f}{2:>16.1f}{3:>14.1f}{4:>14.1f}".format(
+        name, len(documents) / 1024., first / 1024., 1000 * elapsed,
+        1000 * parse))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--figures', type=int, default=40)
+    parser.add_argument('--points', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    print("{0:<10}{1:>12}{2:>16}{3:>14}{4:>14}".format(
+        "output", "size (kB)", "first (kB)", "build (ms)", "parse (ms)"))
+    measure("separate", separate, make_figures(args.figures, args.points))
+    measure("bundle", bundled, make_figures(args.figures, args.points))
+
+
+if __name__ == '__main__':
+    main()
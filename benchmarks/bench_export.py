@@ -0,0 +1,266 @@
+"""
+Exporter Benchmarks
+===================
+Measure the time and peak memory of ``Exporter.run`` on the synthetic
+figures of ``figures.py``, for several renderers, and compare the results
+to a stored baseline::
+
+    python benchmarks/bench_export.py                   # run and compare
+    python benchmarks/bench_export.py --save-baseline   # store a baseline
+    python benchmarks/bench_export.py --quick -k scatter
+    python benchmarks/bench_export.py -k subplot --workers 4
+
+Times are the best of several exports, after a first export which draws
+the figure and warms up caches.  Peak memory is that of a single export,
+measured in a fresh process before any other export of the figure, with
+tracemalloc where available (Python 3), and from the growth of the peak
+resident set size otherwise.  Only the export is measured, not the
+creation of the figure.  Renderer callbacks which a renderer does not
+implement are replaced by no-ops, so that every renderer can export every
+figure.  Results are only compared to a baseline recorded in the same
+environment (Python, numpy and matplotlib versions, and platform).
+"""
+import os
+import sys
+import json
+import time
+import warnings
+import argparse
+import platform
+import multiprocessing
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import figures
+
+
+RENDERERS = {'example': ('mplexporter.renderers.example_renderer',
+                         'ExampleRenderer'),
+             'vega': ('mplexporter.renderers.vega_renderer', 'VegaRenderer'),
+             'plotly': ('mplexporter.renderers.plotly.plotly_renderer',
+                        'PlotlyRenderer')}
+
+OPTIONAL_CALLBACKS = ['draw_path', 'draw_text', 'draw_image']
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+
+def load_renderer(name):
+    """Import the renderer class, completed with no-op callbacks"""
+    from mplexporter.renderers.base import Renderer
+    module_name, class_name = RENDERERS[name]
+    module = __import__(module_name, fromlist=[class_name])
+    cls = getattr(module, class_name)
+
+    def defining_class(method):
+        return next(klass for klass in cls.__mro__ if method in vars(klass))
+
+    noops = dict((method, lambda self, *args, **kwargs: None)
+                 for method in OPTIONAL_CALLBACKS
+                 if defining_class(method) is Renderer)
+    return type(class_name, (cls,), noops)
+
+
+def _peak_rss():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak *= 1024  # kilobytes on Linux
+    return peak
+
+
+def measure_time(case, renderer, scale, repeat, workers=None):
+    """Return the best time (seconds) over repeat exports of one figure
+
+    A first, untimed export draws the figure and warms up caches.  If
+    workers is given, axes are extracted on that many worker threads.
+    """
+    from mplexporter.exporter import Exporter
+
+    warnings.simplefilter('ignore')
+    cls = load_renderer(renderer)
+    fig = getattr(figures, case)(scale)
+    Exporter(cls(), close_mpl=False).run(fig)
+
+    times = []
+    for i in range(repeat):
+        t0 = time.time()
+        Exporter(cls(), close_mpl=False, workers=workers).run(fig)
+        times.append(time.time() - t0)
+    return min(times)
+
+
+def measure_peak(case, renderer, scale, workers=None):
+    """Return the peak memory (bytes) used by one export of one figure
+
+    This must run in a fresh process: the export is the first of the
+    figure, so that the peak resident set size it reaches is not hidden by
+    that of an earlier export.  The peak includes the draw of the figure.
+    """
+    from mplexporter.exporter import Exporter
+
+    warnings.simplefilter('ignore')
+    cls = load_renderer(renderer)
+    fig = getattr(figures, case)(scale)
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+    else:
+        rss = _peak_rss()
+    Exporter(cls(), close_mpl=False, workers=workers).run(fig)
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    else:
+        peak = _peak_rss() - rss
+    return peak
+
+
+def _measure_child(conn, func, *args):
+    try:
+        conn.send({'value': func(*args)})
+    except Exception as err:
+        conn.send({'error': "{0}: {1}".format(type(err).__name__, err)})
+    conn.close()
+
+
+def _run_child(func, *args):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_measure_child,
+                                      args=(child, func) + args)
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def run_case(case, renderer, scale=1.0, repeat=3, workers=None):
+    """Measure the export of one figure with one renderer
+
+    Returns a dictionary with the best time (seconds) over repeat exports
+    and the peak memory (bytes) of an export, each measured in a separate
+    process, or with the error which stopped the measure.
+    """
+    result = {}
+    for name, func, args in [('time', measure_time, (repeat, workers)),
+                             ('peak', measure_peak, (workers,))]:
+        value = _run_child(func, case, renderer, scale, *args)
+        if 'error' in value:
+            return value
+        result[name] = value['value']
+    return result
+
+
+def environment():
+    """Return the versions and platform which the results depend on"""
+    import numpy
+    import matplotlib
+    return {'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'matplotlib': matplotlib.__version__,
+            'platform': '{0}-{1}'.format(platform.system(),
+                                         platform.machine())}
+
+
+def compare(results, baseline, threshold, min_time=0.005,
+            min_peak=2 ** 20):
+    """Return the list of (key, measure, ratio) regressions
+
+    A measure regresses if it exceeds the baseline by more than the
+    threshold fraction, and by more than min_time seconds or min_peak bytes.
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None or 'error' in result or 'error' in base:
+            continue
+        for name, floor in [('time', min_time), ('peak', min_peak)]:
+            if base[name] <= 0:
+                continue
+            ratio = result[name] / float(base[name])
+            if ratio > 1 + threshold and result[name] - base[name] > floor:
+                regressions.append((key, name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-k', dest='select', default='',
+                        help="only run cases whose name contains this")
+    parser.add_argument('--renderers', default='example,vega,plotly',
+                        help="comma-separated renderers to benchmark")
+    parser.add_argument('--quick', action='store_true',
+                        help="use figures with 1/10 of the data")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="extract axes on this many worker threads")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="regression threshold, as a fraction")
+    args = parser.parse_args(argv)
+
+    scale = 0.1 if args.quick else 1.0
+    results = {}
+    print("{0:<36}{1:>12}{2:>14}".format("case", "time (ms)", "peak (MB)"))
+    for figure in figures.FIGURES:
+        if args.select not in figure.__name__:
+            continue
+        for renderer in args.renderers.split(','):
+            key = "{0}/{1}".format(figure.__name__, renderer)
+            result = results[key] = run_case(figure.__name__, renderer,
+                                             scale, args.repeat,
+                                             args.workers)
+            if 'error' in result:
+                print("{0:<36}  skipped: {1}".format(key, result['error']))
+            else:
+                print("{0:<36}{1:>12.1f}{2:>14.1f}".format(
+                    key, 1000 * result['time'], result['peak'] / 2. ** 20))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'scale': scale, 'environment': environment(),
+                       'results': results}, f,
+                      indent=1, sort_keys=True, separators=(',', ': '))
+        print("baseline saved to {0}".format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline found at {0}".format(args.baseline))
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['scale'] != scale:
+        print("baseline was recorded with scale={0}: not comparing".format(
+            baseline['scale']))
+        return 0
+    mismatches = sorted(
+        (key, value, baseline.get('environment', {}).get(key))
+        for key, value in environment().items()
+        if baseline.get('environment', {}).get(key) != value)
+    if mismatches:
+        print("WARNING: baseline was recorded in another environment: "
+              "not comparing")
+        for key, value, recorded in mismatches:
+            print("  {0}: {1} (baseline: {2})".format(key, value, recorded))
+        return 0
+
+    regressions = compare(results, baseline['results'], args.threshold)
+    for key, name, ratio in regressions:
+        print("REGRESSION {0}: {1} is {2:.2f}x the baseline".format(
+            key, name, ratio))
+    if not regressions:
+        print("no regressions beyond {0:.0%}".format(args.threshold))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
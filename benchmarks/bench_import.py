@@ -0,0 +1,56 @@
+"""
+Import Time Benchmark
+=====================
+Measure the time taken by ``import mplexporter``, on top of the time taken
+to import its required dependencies (numpy and matplotlib), and check that
+it stays within a budget::
+
+    python benchmarks/bench_import.py --budget 0.05
+
+Each import is timed in a fresh interpreter; the best of several runs is
+reported.  The exit status is 1 if the budget is exceeded.
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIMER = ("import time; t0 = time.time(); {0}; "
+         "print(time.time() - t0)")
+
+DEPENDENCIES = "import numpy, matplotlib, matplotlib.pyplot"
+
+
+def time_import(statement, repeat=5):
+    """Return the best time (seconds) of statement in fresh interpreters"""
+    times = []
+    for i in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', TIMER.format(statement)], cwd=ROOT)
+        times.append(float(output.decode().strip()))
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--budget', type=float, default=0.1,
+                        help="maximum import time of mplexporter, in seconds")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    dependencies = time_import(DEPENDENCIES, args.repeat)
+    total = time_import(DEPENDENCIES + "; import mplexporter", args.repeat)
+    cost = max(total - dependencies, 0)
+    print("dependencies: {0:.1f} ms".format(1000 * dependencies))
+    print("mplexporter:  {0:.1f} ms (budget {1:.1f} ms)".format(
+        1000 * cost, 1000 * args.budget))
+    if cost > args.budget:
+        print("import time budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
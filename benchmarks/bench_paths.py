@@ -0,0 +1,87 @@
+"""
+Path Cache Benchmarks
+=====================
+Measure the time of converting the paths of collections when a dashboard
+re-exports figures rebuilt from the same data, with and without the path
+cache::
+
+    python benchmarks/bench_paths.py
+    python benchmarks/bench_paths.py --exports 10 --size 200
+
+The figures are a filled contour plot, whose paths are new objects with
+equal vertices on every rebuild, and a scatter plot, whose points share a
+marker path.  The time of the "SVG_path" export stage is measured with the
+exporter's instrumentation; the cached runs are timed after a first export
+has filled the cache.
+"""
+import os
+import sys
+import argparse
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from mplexporter import Exporter
+from mplexporter.instrument import Instrumentation
+from mplexporter.paths import PathCache
+
+
+def contour(size):
+    x, y = np.meshgrid(np.linspace(-3, 3, size), np.linspace(-3, 3, size))
+    z = np.exp(-x ** 2 - y ** 2) * np.cos(3 * x) * np.sin(2 * y)
+    fig, ax = plt.subplots()
+    ax.contourf(x, y, z, 20)
+    return fig
+
+
+def scatter(size):
+    fig, ax = plt.subplots()
+    rng = np.random.RandomState(0)
+    ax.scatter(rng.random_sample(size * 50), rng.random_sample(size * 50))
+    return fig
+
+
+def path_time(make_figure, size, cache, exports):
+    """Return the mean time of path conversion per export, in seconds"""
+    total = 0
+    for i in range(exports):
+        fig = make_figure(size)
+        instrument = Instrumentation()
+        exporter = Exporter(None, instrument=instrument,
+                            path_cache=False if cache is None else cache)
+        instrument.start()
+        for event in exporter.iter_events(fig):
+            if event.kind == 'collection':
+                event.paths
+        instrument.stop()
+        total += instrument.stages['exporter.SVG_path'].time
+        plt.close(fig)
+    return total / exports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--exports', type=int, default=5)
+    parser.add_argument('--size', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    print("{0:<12}{1:>16}{2:>14}{3:>10}".format(
+        "figure", "uncached (ms)", "cached (ms)", "speedup"))
+    for make_figure in (contour, scatter):
+        uncached = path_time(make_figure, args.size, None, args.exports)
+        cache = PathCache()
+        path_time(make_figure, args.size, cache, 1)
+        cached = path_time(make_figure, args.size, cache, args.exports)
+        print("{0:<12}{1:>16.1f}{2:>14.1f}{3:>10.1f}".format(
+            make_figure.__name__, 1e3 * uncached, 1e3 * cached,
+            uncached / cached))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
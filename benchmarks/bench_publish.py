@@ -0,0 +1,71 @@
+"""
+Publishing Benchmarks
+=====================
+Measure the time of uploading a batch of figures to the local stand-in of
+the plotly upload API, which answers each request after a fixed latency::
+
+    python benchmarks/bench_publish.py
+    python benchmarks/bench_publish.py --figures 100 --latency 0.1
+
+Three strategies are compared: one publisher per figure, each opening its
+own connection (as fig_to_plotly did), a single publisher reusing its
+connection, and a publisher uploading on several workers.
+"""
+import os
+import sys
+import time
+import argparse
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from mplexporter.renderers.plotly.publish import PlotlyPublisher
+from mplexporter.renderers.plotly.mock_server import MockPlotlyServer
+
+
+def make_figure(npoints):
+    x = list(range(npoints))
+    return ([{'x': x, 'y': x, 'mode': 'lines'}], {'width': 640})
+
+
+def per_figure(url, figures):
+    for figure in figures:
+        with PlotlyPublisher('user', 'key', server=url) as publisher:
+            publisher.upload(figure)
+
+
+def pooled(workers):
+    def publish(url, figures):
+        with PlotlyPublisher('user', 'key', server=url,
+                             max_workers=workers) as publisher:
+            publisher.publish(figures)
+    return publish
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--figures', type=int, default=40)
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help="server latency, in seconds")
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    figures = [make_figure(args.points)] * args.figures
+    print("{0:<28}{1:>10}{2:>14}".format("strategy", "time (s)",
+                                         "connections"))
+    for name, publish in [("connection per figure", per_figure),
+                          ("one reused connection", pooled(1)),
+                          ("{0} workers".format(args.workers),
+                           pooled(args.workers))]:
+        with MockPlotlyServer(latency=args.latency) as server:
+            t0 = time.time()
+            publish(server.url, figures)
+            elapsed = time.time() - t0
+            print("{0:<28}{1:>10.2f}{2:>14}".format(name, elapsed,
+                                                    len(server.connections)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Spatial Index Benchmarks
+========================
+Measure the build time, size and query latency of the spatial index of
+mplexporter.spatial, against a brute-force scan of the points::
+
+    python benchmarks/bench_spatial.py
+    python benchmarks/bench_spatial.py --sizes 1000,100000 --queries 200
+
+Points are drawn in a 640 x 480 pixel axes, half uniformly and half in a
+few dense clusters, as in a typical scatter plot.  Queries are uniform over
+the axes; the latency is the mean over all queries.
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from mplexporter.spatial import SpatialIndex
+
+
+def make_points(size, seed=0):
+    rng = np.random.RandomState(seed)
+    uniform = rng.uniform((0, 0), (640, 480), (size // 2, 2))
+    centers = rng.uniform((0, 0), (640, 480), (5, 2))
+    clusters = (centers[rng.randint(0, 5, size - size // 2)]
+                + rng.normal(0, 10, (size - size // 2, 2)))
+    return np.vstack([uniform, clusters])
+
+
+def mean_time(func, queries):
+    t0 = time.time()
+    for x, y in queries:
+        func(x, y)
+    return (time.time() - t0) / len(queries)
+
+
+def measure(size, nqueries, radius):
+    points = make_points(size)
+    queries = np.random.RandomState(1).uniform((0, 0), (640, 480),
+                                                (nqueries, 2))
+
+    t0 = time.time()
+    index = SpatialIndex(points)
+    build = time.time() - t0
+
+    def brute_nearest(x, y):
+        distances = np.hypot(points[:, 0] - x, points[:, 1] - y)
+        return distances.argmin()
+
+    def brute_within(x, y):
+        distances = np.hypot(points[:, 0] - x, points[:, 1] - y)
+        return np.where(distances <= radius)[0]
+
+    return {'build': build,
+            'nbytes': index.nbytes,
+            'nearest': mean_time(index.nearest, queries),
+            'within': mean_time(lambda x, y: index.within(x, y, radius),
+                                queries),
+            'brute_nearest': mean_time(brute_nearest, queries),
+            'brute_within': mean_time(brute_within, queries)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000',
+                        help="comma-separated numbers of points")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--radius', type=float, default=5.,
+                        help="radius of the within() queries, in pixels")
+    args = parser.parse_args(argv)
+
+    print("{0:>9}{1:>11}{2:>11}{3:>13}{4:>13}{5:>13}{6:>13}".format(
+        "points", "build(ms)", "size(MB)", "nearest(us)", "brute(us)",
+        "within(us)", "brute(us)"))
+    for size in [int(size) for size in args.sizes.split(',')]:
+        result = measure(size, args.queries, args.radius)
+        print("{0:>9}{1:>11.1f}{2:>11.2f}{3:>13.1f}{4:>13.1f}"
+              "{5:>13.1f}{6:>13.1f}".format(
+                  size, 1E3 * result['build'], result['nbytes'] / 2. ** 20,
+                  1E6 * result['nearest'], 1E6 * result['brute_nearest'],
+                  1E6 * result['within'], 1E6 * result['brute_within']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Axis Property Benchmarks
+========================
+Measure the cost of extracting the axis and tick properties of a grid of
+date axes, as re-exported by a dashboard, with and without the axis
+property cache::
+
+    python benchmarks/bench_ticks.py
+    python benchmarks/bench_ticks.py --axes 16 --exports 20
+
+"axes_properties" times the extraction of the axes properties alone;
+"export" times complete exports (including the draw of the figure, which
+the cache does not affect).  The cached runs are timed after a first,
+uncached export has filled the cache.
+"""
+import os
+import sys
+import time
+import datetime
+import argparse
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from mplexporter import Exporter
+from mplexporter.ticks import AxisPropertyCache
+
+
+def date_axes(naxes, npoints=1000):
+    """A grid of time series over a year, on date axes"""
+    ncols = int(np.ceil(np.sqrt(naxes)))
+    nrows = int(np.ceil(naxes / float(ncols)))
+    fig, axes = plt.subplots(nrows, ncols, squeeze=False)
+    start = datetime.datetime(2014, 1, 1)
+    dates = [start + datetime.timedelta(hours=9 * i) for i in range(npoints)]
+    for ax in axes.flat[:naxes]:
+        ax.plot(dates, np.random.random(npoints).cumsum(), '-')
+    for ax in axes.flat[naxes:]:
+        fig.delaxes(ax)
+    return fig
+
+
+def time_properties(fig, cache, exports):
+    t0 = time.time()
+    for i in range(exports):
+        for ax in fig.axes:
+            Exporter.axes_properties(ax, cache)
+    return (time.time() - t0) / exports
+
+
+def time_exports(fig, cache, exports):
+    exporter = Exporter(None, close_mpl=False,
+                        axis_cache=False if cache is None else cache)
+    t0 = time.time()
+    for i in range(exports):
+        for event in exporter.iter_events(fig):
+            pass
+    return (time.time() - t0) / exports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--axes', type=int, default=9)
+    parser.add_argument('--exports', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    fig = date_axes(args.axes)
+    fig.savefig(os.devnull, format='png')
+    print("{0:<20}{1:>14}{2:>14}{3:>10}".format(
+        "stage", "uncached (ms)", "cached (ms)", "speedup"))
+    for name, measure in [("axes_properties", time_properties),
+                          ("export", time_exports)]:
+        uncached = measure(fig, None, args.exports)
+        cache = AxisPropertyCache()
+        measure(fig, cache, 1)
+        cached = measure(fig, cache, args.exports)
+        print("{0:<20}{1:>14.1f}{2:>14.1f}{3:>10.1f}".format(
+            name, 1e3 * uncached, 1e3 * cached, uncached / cached))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Synthetic Benchmark Figures
+===========================
+Generators of synthetic matplotlib figures exercising the hot paths of the
+exporter and renderers.  Each generator takes a ``scale`` argument: 1 gives
+the full-size figure, smaller values give proportionally smaller data for
+quick runs.
+"""
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def _size(n, scale):
+    return max(int(n * scale), 2)
+
+
+def huge_line(scale=1.0):
+    """A single line of 2 million points"""
+    n = _size(2000000, scale)
+    x = np.linspace(0, 100, n)
+    fig, ax = plt.subplots()
+    ax.plot(x, np.sin(x) + 0.1 * np.random.random(n), '-b')
+    return fig
+
+
+def marker_lines(scale=1.0):
+    """50 lines of 2000 points with markers"""
+    n = _size(2000, scale)
+    x = np.linspace(0, 10, n)
+    fig, ax = plt.subplots()
+    for i in range(50):
+        ax.plot(x, np.sin(x + 0.1 * i), '-o', markersize=3)
+    return fig
+
+
+def scatter(scale=1.0):
+    """A scatter plot of 100k points with varying sizes and colors"""
+    n = _size(100000, scale)
+    fig, ax = plt.subplots()
+    ax.scatter(np.random.random(n), np.random.random(n),
+               s=10 * np.random.random(n), c=np.random.random(n))
+    return fig
+
+
+def contour(scale=1.0):
+    """A filled contour plot and a pcolormesh"""
+    n = _size(400, np.sqrt(scale))
+    x, y = np.meshgrid(np.linspace(-3, 3, n), np.linspace(-3, 3, n))
+    z = np.exp(-x ** 2 - y ** 2) * np.cos(3 * x) * np.sin(2 * y)
+    fig, (ax1, ax2) = plt.subplots(1, 2)
+    ax1.contourf(x, y, z, 20)
+    ax2.pcolormesh(x[::4, ::4], y[::4, ::4], z[::4, ::4])
+    return fig
+
+
+def large_image(scale=1.0):
+    """A 2000 x 2000 image"""
+    n = _size(2000, np.sqrt(scale))
+    fig, ax = plt.subplots()
+    ax.imshow(np.random.random((n, n)), interpolation='nearest')
+    return fig
+
+
+def subplot_grid(scale=1.0):
+    """A 5 x 5 grid of subplots, each with two lines"""
+    n = _size(10000, scale)
+    x = np.linspace(0, 10, n)
+    fig, axes = plt.subplots(5, 5)
+    for i, ax in enumerate(axes.flat):
+        ax.plot(x, np.sin(x * i), '-k')
+        ax.plot(x[::100], np.cos(x[::100] * i), 'or')
+    return fig
+
+
+def text_annotations(scale=1.0):
+    """2000 point labels"""
+    n = _size(2000, scale)
+    fig, ax = plt.subplots()
+    x, y = np.random.random((2, n))
+    ax.plot(x, y, '.k')
+    for i in range(n):
+        ax.text(x[i], y[i], "label {0}".format(i), fontsize=6)
+    return fig
+
+
+FIGURES = [huge_line, marker_lines, scatter, contour, large_image,
+           subplot_grid, text_annotations]
@@ -1,2 +1,11 @@
-from renderers import Renderer
-from exporter import Exporter
+from .renderers import Renderer
+
+try:
+    import matplotlib
+except ImportError:
+    # recorded exports can be replayed without matplotlib: see
+    # mplexporter.recording
+    pass
+else:
+    from .exporter import Exporter
+    from .pool import RendererPool
@@ -0,0 +1,291 @@
+"""
+Animation Export
+================
+This submodule exports a matplotlib animation, such as a ``FuncAnimation``,
+as a stream of frames.  The animation is stepped frame by frame, and each
+frame is crawled like a static figure; rather than storing every frame in
+full, the stream stores a keyframe (all the events of the frame) followed
+by deltas, which hold only the event fields that changed since the
+previous frame, down to the changed items of style and property
+dictionaries and the changed columns of data arrays::
+
+    anim = FuncAnimation(fig, update, frames=100)
+    stream = export_animation(anim, keyframe_interval=25)
+    stream.events(42)                 # the events of frame 42
+    stream.replay(42, VegaRenderer())
+    json.dumps(stream.to_dict())      # for a front end to play
+
+A keyframe is stored every ``keyframe_interval`` frames, so that a player
+can seek without applying every delta from the start, and whenever the
+artists of the figure change (e.g. a frame adds a line), since deltas
+pair up the events of consecutive frames by position.
+"""
+import itertools
+
+import numpy as np
+
+from .events import Event, replay
+
+# the format of the dictionaries of FrameStream.to_dict
+VERSION = 1
+
+
+class FrameStream(object):
+    """The frames of an exported animation
+
+    Parameters
+    ----------
+    frames : list
+        For each frame, either ``('key', events)``, with the detached
+        events of the frame, or ``('delta', changes)``, with a list of
+        ``(index, fields)`` pairs giving the fields of the events of the
+        previous frame which changed (see :func:`frame_delta`).
+    interval : float
+        The delay between frames, in milliseconds.
+    keyframe_interval : int
+        The maximum number of frames between keyframes.
+    """
+    def __init__(self, frames, interval=200, keyframe_interval=30):
+        self.frames = frames
+        self.interval = interval
+        self.keyframe_interval = keyframe_interval
+
+    def __len__(self):
+        return len(self.frames)
+
+    def keyframes(self):
+        """Return the indices of the keyframes"""
+        return [i for i, (kind, _) in enumerate(self.frames) if kind == 'key']
+
+    def __iter__(self):
+        """Iterate over the events of each frame"""
+        events = None
+        for kind, content in self.frames:
+            events = _apply(events, kind, content)
+            yield events
+
+    def events(self, i):
+        """Return the events of frame i, as a list of detached events"""
+        if i < 0:
+            i += len(self.frames)
+        start = i
+        while self.frames[start][0] != 'key':
+            start -= 1
+        events = None
+        for kind, content in self.frames[start:i + 1]:
+            events = _apply(events, kind, content)
+        return events
+
+    def replay(self, i, renderer):
+        """Replay frame i into a renderer"""
+        replay(self.events(i), renderer)
+
+    def to_dict(self):
+        """Return the stream as a dictionary of JSON-compatible values
+
+        Arrays become nested lists.  Each frame is a dictionary with either
+        'key', a list of events, each a dictionary with 'kind' and
+        'fields', or 'delta', a list of [index, fields] pairs.  In deltas,
+        the changed items of a dictionary are given as
+        ``{"__patch__": items}``, and the changed columns of an array as
+        ``{"__columns__": [[column, values], ...]}``.
+        """
+        frames = []
+        for kind, content in self.frames:
+            if kind == 'key':
+                frames.append({'key': [{'kind': event.kind,
+                                        'fields': _jsonable(event.fields())}
+                                       for event in content]})
+            else:
+                frames.append({'delta': [[index, _jsonable(fields)]
+                                         for index, fields in content]})
+        return {'version': VERSION, 'interval': self.interval,
+                'keyframe_interval': self.keyframe_interval,
+                'frames': frames}
+
+
+def _apply(events, kind, content):
+    """Return the events of a frame from those of the previous frame"""
+    if kind == 'key':
+        return list(content)
+    events = list(events)
+    for index, fields in content:
+        event = events[index]
+        fields = dict((key, _patch(event[key], change))
+                      for key, change in fields.items())
+        events[index] = Event(event.kind, None,
+                              **dict(event.fields(), **fields))
+    return events
+
+
+class _Patch(dict):
+    """The changed items of a dictionary"""
+
+
+class _Columns(dict):
+    """The changed columns of a two-dimensional array"""
+
+
+def _diff(old, new):
+    """Return the change from old to new: new, or a patch of old"""
+    if isinstance(old, dict) and isinstance(new, dict) and \
+            set(old) == set(new):
+        return _Patch((key, _diff(old[key], new[key])) for key in new
+                      if not _equal(old[key], new[key]))
+    if isinstance(old, np.ndarray) and isinstance(new, np.ndarray) and \
+            old.ndim == 2 and old.shape == new.shape and \
+            old.dtype == new.dtype:
+        columns = [j for j in range(new.shape[1])
+                   if not _equal(old[:, j], new[:, j])]
+        if len(columns) < new.shape[1]:
+            return _Columns((j, new[:, j]) for j in columns)
+    return new
+
+
+def _patch(old, change):
+    """Apply a change returned by _diff to old"""
+    if isinstance(change, _Patch):
+        value = dict(old)
+        for key, item in change.items():
+            value[key] = _patch(old[key], item)
+        return value
+    elif isinstance(change, _Columns):
+        value = np.array(old)
+        for j, column in change.items():
+            value[:, j] = column
+        return value
+    return change
+
+
+def _jsonable(value):
+    if isinstance(value, _Patch):
+        return {'__patch__': dict((key, _jsonable(item))
+                                  for key, item in value.items())}
+    elif isinstance(value, _Columns):
+        return {'__columns__': [[j, _jsonable(column)]
+                                for j, column in sorted(value.items())]}
+    elif isinstance(value, np.ndarray):
+        return value.tolist()
+    elif isinstance(value, np.generic):
+        return value.item()
+    elif isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    elif isinstance(value, dict):
+        return dict((key, _jsonable(item)) for key, item in value.items())
+    return value
+
+
+def _equal(a, b):
+    """Return True if two detached field values are equal"""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        a, b = np.asarray(a), np.asarray(b)
+        if a.shape != b.shape:
+            return False
+        if a.dtype.kind in 'fc' and b.dtype.kind in 'fc':
+            # NaN marks gaps in the data: they are equal to one another
+            return bool(((a == b) | (np.isnan(a) & np.isnan(b))).all())
+        return bool(np.array_equal(a, b))
+    elif isinstance(a, dict) and isinstance(b, dict):
+        return (len(a) == len(b) and
+                all(key in b and _equal(a[key], b[key]) for key in a))
+    elif isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return (len(a) == len(b) and
+                all(_equal(x, y) for x, y in zip(a, b)))
+    try:
+        return bool(a == b)
+    except ValueError:
+        return False
+
+
+def frame_delta(previous, events):
+    """Return the changes from the events of one frame to the next
+
+    Returns None if the frames do not have the same sequence of event
+    kinds, and a keyframe is needed.  Otherwise, returns a list of
+    ``(index, fields)`` pairs with the changed fields of each changed
+    event.  Dictionaries (styles, properties) only hold their changed
+    items, and two-dimensional arrays their changed columns.
+    """
+    if [event.kind for event in previous] != [event.kind for event in events]:
+        return None
+    changes = []
+    for index, (old, new) in enumerate(zip(previous, events)):
+        if set(old.keys()) != set(new.keys()):
+            return None
+        fields = dict((key, _diff(old[key], new[key])) for key in new.keys()
+                      if not _equal(old[key], new[key]))
+        if fields:
+            changes.append((index, fields))
+    return changes
+
+
+def _frame_count(anim):
+    for name in ('save_count', '_save_count'):
+        count = getattr(anim, name, None)
+        if count is not None:
+            return count
+    return None
+
+
+def iter_frames(anim, frames=None, **kwargs):
+    """Step an animation, and yield the detached events of each frame
+
+    Parameters
+    ----------
+    anim : matplotlib.animation.FuncAnimation
+        The animation.  Its figure is left in the state of the last frame.
+    frames : int (optional)
+        The maximum number of frames.  By default, the frames of the
+        animation, up to its save_count for endless animations.
+
+    Keyword arguments are passed to the Exporter; close_mpl is False.
+    """
+    from .exporter import Exporter
+    kwargs['close_mpl'] = False
+    exporter = Exporter(None, **kwargs)
+    fig = anim._fig
+    if frames is None:
+        frames = _frame_count(anim)
+
+    if getattr(anim, '_init_func', None) is not None:
+        anim._init_func()
+    for framedata in itertools.islice(anim.new_frame_seq(), frames):
+        anim._draw_frame(framedata)
+        yield [event.detached() for event in exporter.iter_events(fig)]
+
+
+def export_animation(anim, frames=None, keyframe_interval=30, **kwargs):
+    """Export an animation as a stream of keyframes and deltas
+
+    Parameters
+    ----------
+    anim : matplotlib.animation.FuncAnimation
+        The animation to export.
+    frames : int (optional)
+        The maximum number of frames (see :func:`iter_frames`).
+    keyframe_interval : int
+        The maximum number of frames between keyframes (default 30).  1
+        stores every frame in full.
+
+    Keyword arguments are passed to the Exporter.
+
+    Returns
+    -------
+    stream : FrameStream
+    """
+    stream = []
+    previous = None
+    since_key = 0
+    for events in iter_frames(anim, frames, **kwargs):
+        changes = None
+        if previous is not None and since_key < keyframe_interval - 1:
+            changes = frame_delta(previous, events)
+        if changes is None:
+            stream.append(('key', events))
+            since_key = 0
+        else:
+            stream.append(('delta', changes))
+            since_key += 1
+        previous = events
+    return FrameStream(stream, getattr(anim, '_interval', 200),
+                       keyframe_interval)
@@ -0,0 +1,301 @@
+"""
+Asynchronous Export
+===================
+This submodule contains asyncio-friendly counterparts of
+:meth:`Exporter.run` and of the ``fig_to_*`` functions.  Exports run on a
+bounded pool of worker threads, so that they do not block the event loop;
+each call returns an asyncio future which may be awaited, cancelled or
+given a timeout.  Serialized output can be streamed in chunks to an
+asyncio writer with :func:`stream_json`.
+
+This module requires Python 3.5 or later.
+"""
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .events import replay
+
+
+class ExportCancelled(Exception):
+    """Raised within a worker thread when its export has been cancelled"""
+    pass
+
+
+def _get_loop(loop=None):
+    if loop is not None:
+        return loop
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:  # Python < 3.7
+        return asyncio.get_event_loop()
+
+
+def _then(future, func, loop):
+    """Return a future of func(future.result())
+
+    If func returns a future, the returned future resolves with it.
+    Cancelling the returned future cancels the pending future.
+    """
+    result = loop.create_future()
+    pending = [future]
+
+    def cancel(result):
+        if result.cancelled():
+            pending[-1].cancel()
+
+    def forward(future):
+        if result.done():
+            return
+        if future.cancelled():
+            result.cancel()
+        elif future.exception() is not None:
+            result.set_exception(future.exception())
+        else:
+            result.set_result(future.result())
+
+    def resolve(future):
+        if result.done() or future.cancelled() or future.exception():
+            return forward(future)
+        try:
+            value = func(future.result())
+        except Exception as err:
+            result.set_exception(err)
+            return
+        if asyncio.isfuture(value):
+            pending.append(value)
+            value.add_done_callback(forward)
+        else:
+            result.set_result(value)
+
+    result.add_done_callback(cancel)
+    future.add_done_callback(resolve)
+    return result
+
+
+def _iter_chunks(pieces, chunksize):
+    """Join the strings of pieces into chunks of about chunksize characters"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunksize:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_json(obj, writer, chunksize=65536, loop=None):
+    """Serialize obj to JSON, writing it in chunks to an asyncio writer
+
+    The JSON is encoded incrementally: each chunk of about ``chunksize``
+    characters is encoded, written with ``writer.write`` and, if the
+    writer has a ``drain`` coroutine (as asyncio.StreamWriter does), the
+    next chunk is only encoded once the writer has drained.  The whole
+    document is therefore never held in memory, and the event loop is not
+    blocked for longer than it takes to encode one chunk.
+
+    Parameters
+    ----------
+    obj : object
+        The JSON-serializable object.
+    writer : object
+        An object with a ``write(bytes)`` method and optionally a
+        ``drain()`` coroutine.
+    chunksize : int
+        The approximate size of the written chunks, in characters.
+
+    Returns
+    -------
+    future : asyncio.Future
+        A future resolving to the number of bytes written.
+    """
+    loop = _get_loop(loop)
+    done = loop.create_future()
+    chunks = _iter_chunks(json.JSONEncoder().iterencode(obj), chunksize)
+    written = [0]
+
+    def write_next(drained=None):
+        if done.done():
+            return
+        if drained is not None:
+            if drained.cancelled():
+                done.cancel()
+                return
+            if drained.exception() is not None:
+                done.set_exception(drained.exception())
+                return
+        try:
+            chunk = next(chunks).encode('utf-8')
+            writer.write(chunk)
+        except StopIteration:
+            done.set_result(written[0])
+            return
+        except Exception as err:
+            done.set_exception(err)
+            return
+        written[0] += len(chunk)
+        drain = getattr(writer, 'drain', None)
+        if drain is None:
+            loop.call_soon(write_next)
+        else:
+            asyncio.ensure_future(drain(), loop=loop).add_done_callback(
+                write_next)
+
+    loop.call_soon(write_next)
+    return done
+
+
+class AsyncExporter(object):
+    """Run exports from asyncio code on a bounded pool of worker threads
+
+    Parameters
+    ----------
+    max_workers : int
+        The maximum number of exports running concurrently (default 4).
+        Further exports wait for a free worker.
+    executor : concurrent.futures.Executor (optional)
+        The executor running the exports.  By default, a thread pool of
+        ``max_workers`` threads is created, and shut down by close().
+
+    Every method returns an asyncio future.  Cancelling the future, or
+    exceeding its ``timeout`` (in seconds), cancels the export: an export
+    which has not started yet is dropped, and a running export stops at
+    the next draw event, raising ExportCancelled in its worker thread.
+    """
+    def __init__(self, max_workers=4, executor=None):
+        self._own_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.executor = executor
+
+    def close(self, wait=True):
+        """Shut down the executor, if it was created by this object"""
+        if self._own_executor:
+            self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, func, *args, **kwargs):
+        """Run func(*args, cancelled=event, **kwargs) on the executor
+
+        ``cancelled`` is a threading.Event set when the returned future is
+        cancelled, which func may poll to stop early.  Keyword arguments
+        ``timeout`` and ``loop`` are consumed by submit.
+        """
+        timeout = kwargs.pop('timeout', None)
+        loop = _get_loop(kwargs.pop('loop', None))
+        cancelled = threading.Event()
+        kwargs['cancelled'] = cancelled
+
+        future = loop.run_in_executor(self.executor,
+                                      lambda: func(*args, **kwargs))
+
+        def on_done(future):
+            if future.cancelled():
+                cancelled.set()
+
+        future.add_done_callback(on_done)
+        if timeout is not None:
+            future = asyncio.ensure_future(
+                asyncio.wait_for(future, timeout), loop=loop)
+        return future
+
+    @staticmethod
+    def _export(exporter, fig, cancelled):
+        def events():
+            for event in exporter.iter_events(fig):
+                if cancelled.is_set():
+                    raise ExportCancelled()
+                yield event
+
+        if exporter.instrument is None:
+            replay(events(), exporter.renderer)
+        else:
+            exporter.instrument.start()
+            try:
+                with exporter.instrument.instrument_renderer(
+                        exporter.renderer):
+                    replay(events(), exporter.renderer)
+            finally:
+                exporter.instrument.stop()
+        return exporter
+
+    def run(self, exporter, fig, timeout=None, loop=None):
+        """Run the exporter on the given figure
+
+        The counterpart of :meth:`Exporter.run`.  Each concurrent export
+        must use its own Exporter and renderer.
+
+        Returns
+        -------
+        future : asyncio.Future
+            A future resolving to the exporter.
+        """
+        return self.submit(self._export, exporter, fig,
+                           timeout=timeout, loop=loop)
+
+    def fig_to_vega(self, fig, notebook=False, timeout=None, loop=None):
+        """Asynchronous counterpart of renderers.fig_to_vega"""
+        from .exporter import Exporter
+        from .renderers.vega_renderer import VegaRenderer, VegaHTML
+        loop = _get_loop(loop)
+
+        def html(exporter):
+            vega_html = VegaHTML(exporter.renderer)
+            return vega_html if notebook else vega_html.html()
+
+        future = self.run(Exporter(VegaRenderer()), fig, timeout, loop)
+        return _then(future, html, loop)
+
+    def write_vega(self, fig, writer, chunksize=65536, timeout=None,
+                   loop=None):
+        """Export the figure and stream its Vega specification as JSON
+
+        The timeout applies to the export only, not to the writing.
+
+        Returns
+        -------
+        future : asyncio.Future
+            A future resolving to the number of bytes written.
+        """
+        from .exporter import Exporter
+        from .renderers.vega_renderer import VegaRenderer, VegaHTML
+        loop = _get_loop(loop)
+
+        def write(exporter):
+            specification = VegaHTML(exporter.renderer).specification
+            return stream_json(specification, writer, chunksize, loop)
+
+        future = self.run(Exporter(VegaRenderer()), fig, timeout, loop)
+        return _then(future, write, loop)
+
+    def fig_to_vincent(self, fig, timeout=None, loop=None):
+        """Asynchronous counterpart of renderers.fig_to_vincent"""
+        from .exporter import Exporter
+        from .renderers.vincent_renderer import VincentRenderer
+        loop = _get_loop(loop)
+        future = self.run(Exporter(VincentRenderer()), fig, timeout, loop)
+        return _then(future, lambda exporter: exporter.renderer.chart, loop)
+
+    def fig_to_plotly(self, fig, username=None, api_key=None,
+                      notebook=False, timeout=None, loop=None):
+        """Asynchronous counterpart of renderers.fig_to_plotly
+
+        The upload to plotly runs on the worker thread as well.  It cannot
+        be interrupted once started.
+        """
+        from .renderers.plotly import fig_to_plotly
+
+        def upload(cancelled):
+            return fig_to_plotly(fig, username, api_key, notebook)
+
+        return self.submit(upload, timeout=timeout, loop=loop)
@@ -0,0 +1,238 @@
+"""
+Export Budgets
+==============
+This submodule contains the budget used by the Exporter to bound the time,
+output points and memory of an export, so that a pathological figure
+(e.g. a scatter plot of tens of millions of points) cannot hold an export
+worker for minutes.
+
+Before the data of a line or collection is computed, the exporter asks the
+budget how many points the artist may output.  If the artist has more
+points, it steps down a degradation ladder, until its output fits:
+
+1. 'simplify': drop the points which do not change the drawing at the
+   display resolution (see :func:`simplify`).  This needs all the points
+   in display coordinates, and is skipped when the time or memory budget
+   is the limit.
+2. 'decimate': keep every n-th point, read with a stride from the source
+   data, so that neither the time nor the memory spent grows with the
+   size of the artist.
+3. 'rasterize': if fewer than ``min_points`` points may be output, draw
+   the artist alone into an image, passed to Renderer.draw_image.
+
+Every step taken is reported in ``Exporter.stats['budget']``.
+
+The point budget is split between the artists of a figure before any is
+exported (see :func:`allocate`), so that the first artists do not starve
+the others, and short series do not waste a fixed per-artist share.
+"""
+import numpy as np
+
+# estimated memory of an exported point: a pair of float64 values
+BYTES_PER_POINT = 16
+
+# points exported before the measured time per point is trusted
+MEASURED_POINTS = 10000
+
+# time cost of a point of each kind of artist, relative to a line point
+DEFAULT_WEIGHTS = {'line': 1, 'collection': 8}
+
+
+class ExportBudget(object):
+    """Time, point and memory budget of an export
+
+    Parameters
+    ----------
+    time : float (optional)
+        The wall time of an export, in seconds, including the drawing of
+        the figure by matplotlib.
+    points : int (optional)
+        The total number of data points passed to the renderer.
+    memory : int (optional)
+        The total size of the data arrays computed for the renderer, in
+        bytes, estimated as BYTES_PER_POINT bytes per point.
+    min_points : int
+        Artists which may output fewer points than this (default 64) are
+        rasterized rather than decimated.
+    tolerance : float
+        The resolution of simplification, in display pixels (default 0.5).
+    seconds_per_point : float
+        The estimated time of exporting and rendering a point of a line
+        (default 2e-6), used to predict whether an artist fits the time
+        budget.  Once enough points have been exported, the rate measured
+        so far is used if it is slower.
+    weights : dictionary (optional)
+        The time cost of a point of each kind of artist, relative to that
+        of a point of a line.  By default, DEFAULT_WEIGHTS: renderers draw
+        the elements of collections one by one, which is slower.
+    rasterize : bool
+        If False, artists are decimated to min_points at most, rather than
+        rasterized.
+    allocate : bool
+        If True (default), the points budget is split between the lines
+        and collections of the figure before they are exported, according
+        to their number of points and on-screen extent (see allocate).
+        Otherwise, artists are served in drawing order until the budget is
+        spent.
+
+    The exporter records, per figure, the points and bytes spent and the
+    list of the degradation steps taken in ``Exporter.stats['budget']``.
+    Each step is a dictionary of the 'kind' and 'label' of the artist, the
+    'step', the limiting budget ('reason'), and the number of 'points' of
+    the artist and of points it outputs after the step ('output').  The
+    points of a collection are its offsets and the vertices of its paths:
+    decimation keeps every n-th element (path and offset), so that its
+    output is estimated.
+    """
+    def __init__(self, time=None, points=None, memory=None, min_points=64,
+                 tolerance=0.5, seconds_per_point=2e-6, weights=None,
+                 rasterize=True, allocate=True):
+        self.time = time
+        self.points = points
+        self.memory = memory
+        self.min_points = min_points
+        self.tolerance = tolerance
+        self.seconds_per_point = seconds_per_point
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.rasterize = rasterize
+        self.allocate = allocate
+
+    @staticmethod
+    def new_stats():
+        return {'points': 0, 'bytes': 0, 'cost': 0., 'draw_time': 0.,
+                'steps': []}
+
+    def allowance(self, stats, elapsed, kind='line', share=None):
+        """Return the number of points the next artist may output
+
+        Parameters
+        ----------
+        stats : dictionary
+            The budget statistics of the export (see new_stats), including
+            the time spent drawing the figure with matplotlib, 'draw_time'.
+        elapsed : float
+            The time elapsed since the start of the export, in seconds.
+        kind : string
+            The kind of the artist, 'line' or 'collection'.
+        share : int (optional)
+            The points allocated to the artist, if allocated.
+
+        Returns
+        -------
+        allowance : tuple
+            The number of points, or None if unlimited, and the name of the
+            limiting budget: 'points', 'memory' or 'time'.
+        """
+        limits = []
+        if self.points is not None:
+            points = self.points - stats['points']
+            if share is not None:
+                points = min(points, share)
+            limits.append((points, 'points'))
+        if self.memory is not None:
+            limits.append(((self.memory - stats['bytes']) // BYTES_PER_POINT,
+                           'memory'))
+        if self.time is not None:
+            rate = self.seconds_per_point
+            if stats['points'] >= MEASURED_POINTS:
+                rate = max(rate, (elapsed - stats['draw_time'])
+                           / stats['cost'])
+            limits.append(((self.time - elapsed)
+                           / (rate * self.weights.get(kind, 1)), 'time'))
+        if not limits:
+            return None, None
+        points, reason = min(limits)
+        return max(int(points), 0), reason
+
+    def spend(self, stats, points, kind='line'):
+        """Record the output of points by an artist"""
+        stats['points'] += points
+        stats['bytes'] += points * BYTES_PER_POINT
+        stats['cost'] += points * self.weights.get(kind, 1)
+
+
+def simplify(points, tolerance, ordered=True):
+    """Return the indices of the points which change a drawing
+
+    Points are binned in square cells of tolerance pixels.
+
+    Parameters
+    ----------
+    points : ndarray
+        The (N, 2) display coordinates of the points.
+    tolerance : float
+        The size of the cells, in display pixels.
+    ordered : bool
+        If True (for lines), only the first and last points of each run of
+        consecutive points within a cell are kept.  Otherwise (for markers),
+        only the last point drawn in each cell is kept.
+
+    Returns
+    -------
+    indices : ndarray
+        The sorted indices of the points kept.  Non-finite points, which
+        break lines, are always kept.
+    """
+    cells = np.floor(np.asarray(points) / tolerance)
+    finite = np.isfinite(cells).all(1)
+    if ordered:
+        same = (cells[1:] == cells[:-1]).all(1) & finite[1:] & finite[:-1]
+        keep = np.ones(len(cells), dtype=bool)
+        # keep the points entering and leaving each cell
+        keep[1:-1] = ~(same[:-1] & same[1:])
+        return np.nonzero(keep)[0]
+    cells = cells[finite].astype(np.int64)
+    if not len(cells):
+        return np.nonzero(~finite)[0]
+    cells -= cells.min(0)
+    keys = cells[:, 0] * (cells[:, 1].max() + 1) + cells[:, 1]
+    # the last point of a cell is drawn on top: find it from the end
+    last = np.unique(keys[::-1], return_index=True)[1]
+    kept = np.nonzero(finite)[0][len(keys) - 1 - last]
+    return np.sort(np.concatenate([kept, np.nonzero(~finite)[0]]))
+
+
+def allocate(total, lengths, extents):
+    """Split a total number of points between artists
+
+    Each artist is given at most its number of points, and the budget it
+    does not need is shared by the others: the shares are in proportion to
+    the on-screen extents of the artists, except for those needing less.
+
+    Parameters
+    ----------
+    total : int
+        The number of points to split.
+    lengths : array_like
+        The number of points of each artist.
+    extents : array_like
+        The on-screen extent of each artist, e.g. in pixels.
+
+    Returns
+    -------
+    shares : ndarray
+        The integer number of points allocated to each artist, whose sum
+        is at most total.
+    """
+    lengths = np.asarray(lengths, dtype=float)
+    extents = np.maximum(np.asarray(extents, dtype=float), 1)
+    if total >= lengths.sum():
+        return lengths.astype(int)
+    shares = np.zeros(len(lengths))
+    remaining = float(total)
+    weight = extents.sum()
+    # the artists needing the fewest points per extent are served first:
+    # once one cannot be served in full, neither can the following ones
+    for i in np.argsort(lengths / extents, kind='mergesort'):
+        shares[i] = min(lengths[i], remaining * extents[i] / weight)
+        remaining -= shares[i]
+        weight -= extents[i]
+    return np.floor(shares).astype(int)
+
+
+def decimation_step(npoints, allowed):
+    """Return the stride keeping at most allowed of npoints points"""
+    if allowed <= 0:
+        raise ValueError("cannot decimate to {0} points".format(allowed))
+    return max(1, -(-npoints // allowed))
@@ -0,0 +1,82 @@
+"""
+Shared Data Columns
+===================
+This submodule contains the column store used to detect identical data
+columns within an exported figure, so that renderers can emit each distinct
+column once and reference it from several marks or traces.
+"""
+import hashlib
+
+import numpy as np
+
+
+class ColumnStore(object):
+    """Registry of the distinct data columns of a figure
+
+    Columns are identified first by their buffer (data pointer, shape,
+    strides and dtype), which is cheap and catches the same array being
+    passed several times, e.g. to draw_line and draw_markers.  Otherwise
+    they are identified by a hash of their content, which catches copies,
+    e.g. many lines plotted against the same x values.
+
+    The store keeps a reference to each registered array, so that a buffer
+    address cannot be reused by another array while the store is alive.
+    """
+    def __init__(self):
+        self.columns = {}
+        self._by_buffer = {}
+        self._by_hash = {}
+        self._arrays = []
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __contains__(self, key):
+        return key in self.columns
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    @staticmethod
+    def _buffer_id(column):
+        interface = column.__array_interface__
+        return (interface['data'][0], column.shape, column.strides,
+                column.dtype.str)
+
+    @staticmethod
+    def _content_hash(column):
+        column = np.ascontiguousarray(column)
+        digest = hashlib.sha1(column.view(np.uint8)).hexdigest()
+        return (digest, column.shape, column.dtype.str)
+
+    def key(self, column):
+        """Return the key of the given column, registering it if it is new
+
+        Parameters
+        ----------
+        column : array_like
+            A one-dimensional array of values.
+
+        Returns
+        -------
+        key : string
+            A key of the form 'c0', 'c1', ..., which is the same for all
+            columns with identical content.
+        """
+        column = np.asarray(column)
+        buffer_id = self._buffer_id(column)
+        key = self._by_buffer.get(buffer_id)
+        if key is not None:
+            return key
+
+        content_hash = self._content_hash(column)
+        key = self._by_hash.get(content_hash)
+        if key is None or not np.array_equal(self.columns[key], column):
+            key = 'c{0}'.format(len(self.columns))
+            self.columns[key] = column
+            self._by_hash[content_hash] = key
+
+        self._by_buffer[buffer_id] = key
+        self._arrays.append(column)
+        return key
+
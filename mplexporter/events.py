@@ -0,0 +1,225 @@
+"""
+Draw Events
+===========
+This submodule contains the event objects yielded by
+:meth:`Exporter.iter_events`, along with tools for replaying a stream of
+events into a renderer.
+"""
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+import numpy as np
+
+from .lazy import LazyArray, LazyStyle
+
+# map of event kind -> renderer method which consumes it
+RENDERER_METHODS = {'line': 'draw_line',
+                    'markers': 'draw_markers',
+                    'path': 'draw_path',
+                    'collection': 'draw_path_collection',
+                    'text': 'draw_text',
+                    'texts': 'draw_texts',
+                    'image': 'draw_image',
+                    'spatial_index': 'draw_spatial_index'}
+
+OPEN_EVENTS = {'open_figure': 'draw_figure',
+               'open_axes': 'draw_axes'}
+
+CLOSE_EVENTS = ('close_figure', 'close_axes')
+
+# fields holding per-export state of the exporter, which detached events drop
+EXPORT_STATE_FIELDS = ('column_store', 'style_table')
+
+
+class Deferred(object):
+    """A value which is computed by ``func(*args)`` on first access
+
+    The result is cached, so that a deferred value shared between several
+    events (e.g. the data of a line and of its markers) is computed once.
+    """
+    __slots__ = ('func', 'args', '_value', '_done')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+        self._value = None
+        self._done = False
+
+    @property
+    def done(self):
+        return self._done
+
+    def get(self):
+        if not self._done:
+            self._value = self.func(*self.args)
+            self._done = True
+            self.func = self.args = None
+        return self._value
+
+    def item(self, index):
+        """Return a Deferred for ``self.get()[index]``"""
+        return Deferred(lambda: self.get()[index])
+
+
+class Event(object):
+    """A single draw event
+
+    Parameters
+    ----------
+    kind : string
+        One of 'open_figure', 'open_axes', 'line', 'markers', 'path',
+        'collection', 'text', 'texts', 'image', 'close_axes',
+        'close_figure'.
+    mplobj : matplotlib object
+        The matplotlib figure, axes or artist which generated the event.
+    **fields :
+        The arguments of the associated renderer method.  Any field given
+        as a :class:`Deferred` is computed the first time it is accessed;
+        data arrays and styles are usually given as the lazy containers of
+        :mod:`mplexporter.lazy`, and are computed piecewise as they are used.
+
+    Fields are available both as attributes and as items, e.g.
+    ``event.data`` or ``event['data']``.
+    """
+    __slots__ = ('kind', 'mplobj', '_fields')
+
+    def __init__(self, kind, mplobj=None, **fields):
+        self.kind = kind
+        self.mplobj = mplobj
+        self._fields = fields
+
+    def __repr__(self):
+        return "Event({0!r}, {1})".format(self.kind,
+                                          sorted(self._fields.keys()))
+
+    def keys(self):
+        return self._fields.keys()
+
+    def is_computed(self, key):
+        """Return True if the field ``key`` does not require computation"""
+        return getattr(self._fields[key], 'done', True)
+
+    def __getitem__(self, key):
+        value = self._fields[key]
+        if isinstance(value, Deferred):
+            value = self._fields[key] = value.get()
+        return value
+
+    def __getattr__(self, key):
+        if key.startswith('_'):
+            # e.g. special methods looked up by pickle before _fields is set
+            raise AttributeError(key)
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def compute(self):
+        """Compute all deferred and lazy fields, e.g. in a worker thread
+
+        Unlike accessing the fields, this records no access in the access
+        log of lazy fields.
+        """
+        for key, value in list(self._fields.items()):
+            if isinstance(value, Deferred):
+                self._fields[key] = value.get()
+            elif hasattr(value, 'compute'):
+                value.compute()
+        return self
+
+    def compute_styles(self):
+        """Compute the lazy style fields only, recording no access
+
+        Style fields read the matplotlib artist, unlike the data, which may
+        then be computed in another thread.
+        """
+        for value in self._fields.values():
+            for style in (value if isinstance(value, list) else [value]):
+                if isinstance(style, LazyStyle):
+                    style.compute()
+        return self
+
+    def detached(self):
+        """Return a plain copy of this event, independent of matplotlib
+
+        All fields are computed: lazy arrays become numpy arrays and styles
+        become dictionaries.  The matplotlib object is dropped (renderers
+        replaying detached events receive ``mplobj=None``), as is the
+        per-export state of the exporter, so that the event can be pickled,
+        stored, or replayed in a process without matplotlib.
+        """
+        fields = {}
+        for key in self._fields:
+            if key in EXPORT_STATE_FIELDS:
+                continue
+            fields[key] = _plain(self[key])
+        return Event(self.kind, None, **fields)
+
+    def fields(self):
+        """Return a dictionary of all fields, computing any deferred ones"""
+        return dict((key, self[key]) for key in self._fields)
+
+    def dispatch(self, renderer, lazy=False):
+        """Call the renderer method associated with this draw event
+
+        Unless lazy is True, lazy arrays and styles are passed to the
+        renderer computed, as numpy arrays and dictionaries.
+        """
+        method = getattr(renderer, RENDERER_METHODS[self.kind])
+        fields = self.fields()
+        if not lazy:
+            fields = dict((key, _computed(value))
+                          for key, value in fields.items())
+        return method(mplobj=self.mplobj, **fields)
+
+
+def _plain(value):
+    """Return value with lazy arrays and styles converted to plain types"""
+    if isinstance(value, LazyArray):
+        return np.asarray(value.values)
+    elif isinstance(value, Mapping):
+        return dict((name, value[name]) for name in value)
+    elif isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _computed(value):
+    """Return value with lazy arrays and styles computed into numpy arrays
+    and dictionaries (interned Style records are kept)"""
+    if isinstance(value, LazyArray):
+        return np.asarray(value.values)
+    elif isinstance(value, LazyStyle):
+        return value.copy()
+    elif isinstance(value, list):
+        return [_computed(item) for item in value]
+    return value
+
+
+def replay(events, renderer, lazy=False):
+    """Replay a stream of events into a renderer
+
+    Parameters
+    ----------
+    events : iterable
+        An iterable of Event objects, such as that returned by
+        :meth:`Exporter.iter_events`.
+    renderer : Renderer object
+        The renderer which consumes the events.
+    lazy : bool
+        If True, pass the renderer the lazy arrays and styles of the
+        events, rather than their computed values (see Event.dispatch).
+    """
+    contexts = []
+    for event in events:
+        if event.kind in OPEN_EVENTS:
+            method = getattr(renderer, OPEN_EVENTS[event.kind])
+            context = method(event.mplobj, **event.fields())
+            context.__enter__()
+            contexts.append(context)
+        elif event.kind in CLOSE_EVENTS:
+            contexts.pop().__exit__(None, None, None)
+        else:
+            event.dispatch(renderer, lazy)
@@ -5,7 +5,40 @@ This submodule contains tools for crawling a matplotlib figure and exporting
 relevant pieces to a renderer.
 """
 import io
+import time
+import weakref
+import warnings
+import threading
+
+import numpy as np
+from matplotlib.lines import Line2D
+
 from . import utils
+from .budget import allocate, decimation_step, simplify
+from .columns import ColumnStore
+from .events import Deferred, Event
+from .lazy import AccessLog, LazyArray, LazyStyle
+from .paths import PathCache
+from .prune import PrunePolicy
+from .spatial import SpatialIndex
+from .styles import StyleTable
+from .ticks import default_cache as default_axis_cache
+
+
+# matplotlib does not support drawing a figure from several threads at once,
+# nor concurrent use of pyplot: exports hold these locks while they do.
+_figure_locks = weakref.WeakKeyDictionary()
+_figure_locks_lock = threading.Lock()
+_pyplot_lock = threading.Lock()
+
+
+def _figure_lock(fig):
+    """Return the lock serializing the drawing of the given figure"""
+    with _figure_locks_lock:
+        lock = _figure_locks.get(fig)
+        if lock is None:
+            lock = _figure_locks[fig] = threading.Lock()
+        return lock
 
 
 class Exporter(object):
@@ -21,11 +54,153 @@ class Exporter(object):
         If True (default), close the matplotlib figure as it is rendered. This
         is useful for when the exporter is used within the notebook, or with
         an interactive matplotlib backend.
+    track_access : bool
+        If True, record which fields of the lazily computed data and style
+        arguments the renderer consumes.  The record is available as the
+        ``access_log`` attribute (see mplexporter.lazy.AccessLog).  This
+        implies lazy.
+    lazy : bool
+        If True, pass renderers lazy data arrays and style mappings, whose
+        fields are only computed as the renderer uses them (see
+        mplexporter.lazy).  By default, renderers receive numpy arrays and
+        dictionaries.
+    chunksize : int
+        The number of points transformed at once for large or memory-mapped
+        line data (default 65536).
+    chunk_threshold : int
+        Lines with more points than this (default 2 ** 20) are transformed
+        in chunks of ``chunksize``, bounding the size of the temporary
+        arrays.  Lines whose data are numpy memmaps are always transformed
+        in chunks, straight from the memmap and into a temporary-file backed
+        output array, so that memory use does not grow with the data size.
+        This bound excludes the copy of the data which matplotlib itself
+        caches in each line (``Line2D._xy``) when the figure is drawn.
+    precision : PrecisionPolicy object (optional)
+        If given, the policy used to round and/or downcast line, marker,
+        path and offset data before they reach the renderer.  See
+        mplexporter.precision.PrecisionPolicy.
+    intern_styles : bool
+        If True, pass renderers interned, immutable Style records rather
+        than lazily computed style mappings: all style fields are then
+        computed, but each distinct style is represented by a single record
+        whose ``id`` renderers may use to emit a shared style definition.
+        See mplexporter.styles.StyleTable.
+
+    Attributes
+    ----------
+    stats : dictionary
+        Statistics about the last exported figure.  If a precision policy
+        is used, ``stats['precision']`` holds the number of values processed
+        and their size before and after the policy was applied.  If a
+        budget is used, ``stats['budget']`` holds the points and bytes
+        spent and the list of the degradation steps taken.  If artists are
+        pruned, ``stats['prune']`` holds the number of axes and artists
+        skipped, in total and for each reason.
+    columns : ColumnStore object
+        The store of distinct data columns of the last exported figure,
+        shared with the renderer to deduplicate data (see
+        Renderer.column_key).
+    styles : StyleTable object
+        The table of distinct styles of the last exported figure, shared
+        with the renderer (see Renderer.intern_style).
+    instrument : Instrumentation object (optional)
+        If given, record the time, number of calls and points processed
+        (and optionally the memory allocated) of each export stage and of
+        each renderer callback.  See mplexporter.instrument.Instrumentation.
+    workers : int or ThreadPool (optional)
+        If given, the data, paths and styles of each axes are extracted on
+        a pool of worker threads (a multiprocessing.pool.ThreadPool of this
+        many threads, or the given pool), overlapping the numpy work of
+        figures with many axes.  The renderer is still called from the
+        calling thread, axes by axes, in the same order as without
+        workers.  Fields are then computed eagerly, whether or not the
+        renderer uses them.
+    spatial_index : bool
+        If True, build a spatial index of the points of the lines and of
+        the data offsets of the collections (e.g. scatter points) of each
+        axes, in display coordinates, for hit tests.  The index is passed
+        to Renderer.draw_spatial_index after the elements of the axes, and
+        is available in the ``spatial_indexes`` attribute.  See
+        mplexporter.spatial.SpatialIndex.
+    budget : ExportBudget object (optional)
+        If given, the wall time, output points and memory of the export
+        are bounded: lines and collections which do not fit are
+        simplified, decimated or rasterized, and each step taken is
+        reported in ``stats['budget']``.  The points budget is split
+        between the lines and collections of the figure before they are
+        exported.  See mplexporter.budget.
+    prune : bool or PrunePolicy object
+        If True (default), axes and artists which draw nothing (invisible,
+        empty or fully transparent ones) are skipped before they are
+        processed, and the number skipped is reported in
+        ``stats['prune']``.  A PrunePolicy selects which checks are made;
+        if False, every artist is exported.  See mplexporter.prune.
+    axis_cache : bool or AxisPropertyCache object
+        If True (default), the axis and tick properties of each axes are
+        kept in a cache shared by all exporters, and reused by later
+        exports while the axis is unchanged; the cache hits and misses are
+        reported in ``stats['axis_cache']``.  An AxisPropertyCache may be
+        given instead, e.g. to invalidate it explicitly; if False, the
+        properties are extracted on every export.  See mplexporter.ticks.
+    path_cache : bool or PathCache object
+        If True (default), the SVG vertices and codes of the paths of
+        collections are kept in a bounded cache of this exporter, so that
+        paths repeated within a collection or from one export to the next
+        are converted once; the number of paths, distinct paths, and cache
+        hits and misses are reported in ``stats['path_cache']``.  A
+        PathCache may be given instead, e.g. to share it between exporters;
+        if False, every path is converted on every export.  See
+        mplexporter.paths.
+
+    Exports may run concurrently in several threads, each with its own
+    Exporter.  Renderers keep their figure and axes state per thread (see
+    Renderer.context), but most accumulate their output in attributes:
+    use a separate renderer per concurrent export, e.g. from a
+    mplexporter.pool.RendererPool.
     """
 
-    def __init__(self, renderer, close_mpl=True):
+    def __init__(self, renderer, close_mpl=True, track_access=False,
+                 lazy=False,
+                 chunksize=65536, chunk_threshold=2 ** 20, precision=None,
+                 intern_styles=False, instrument=None, workers=None,
+                 spatial_index=False, budget=None, prune=True,
+                 axis_cache=True, path_cache=True):
         self.close_mpl = close_mpl
         self.renderer = renderer
+        self.chunksize = chunksize
+        self.chunk_threshold = chunk_threshold
+        self.precision = precision
+        self.stats = {}
+        self.columns = None
+        self.intern_styles = intern_styles
+        self.styles = None
+        self.lazy = lazy or track_access
+        if track_access:
+            self.access_log = AccessLog()
+        else:
+            self.access_log = None
+        self.instrument = instrument
+        self.workers = workers
+        self.spatial_index = spatial_index
+        self.spatial_indexes = {}
+        self.budget = budget
+        if prune is True:
+            prune = PrunePolicy()
+        self.prune = prune or None
+        if axis_cache is True:
+            axis_cache = default_axis_cache
+        elif axis_cache is False:
+            axis_cache = None
+        self.axis_cache = axis_cache
+        if path_cache is True:
+            path_cache = PathCache()
+        elif path_cache is False:
+            path_cache = None
+        self.path_cache = path_cache
+        self._started = None
+        self._shares = {}
+        self._timed_fields = {}
+        self._lock = threading.Lock()
 
     def run(self, fig):
         """
@@ -36,13 +211,163 @@ class Exporter(object):
         fig : matplotlib.Figure instance
             The figure to export
         """
+        if self.instrument is None:
+            self._prepare_fig(fig)
+            self.crawl_fig(fig)
+            return
+
+        self.instrument.start()
+        try:
+            with self.instrument.instrument_renderer(self.renderer):
+                self._prepare_fig(fig)
+                self.crawl_fig(fig)
+        finally:
+            self.instrument.stop()
+
+    def iter_events(self, fig):
+        """
+        Lazily generate the draw events for the given figure
+
+        This is the pull-based counterpart of :meth:`run`: rather than calling
+        the renderer, it yields one :class:`~mplexporter.events.Event` per
+        renderer call, in the order in which :meth:`run` would make them.
+        Expensive fields such as transformed data, paths and images are
+        computed only when they are accessed.  The stream may be passed to
+        :func:`mplexporter.events.replay` to drive a renderer.
+
+        Parameters
+        ----------
+        fig : matplotlib.Figure instance
+            The figure to export
+
+        Yields
+        ------
+        event : Event object
+        """
+        self._prepare_fig(fig)
+        yield Event('open_figure', fig,
+                    properties=self.figure_properties(fig),
+                    column_store=self.columns,
+                    style_table=self.styles)
+        for ax in self._kept(fig.axes, 'axes'):
+            properties = self._axes_properties(ax)
+            yield Event('open_axes', ax, properties=properties)
+            for event in self.iter_ax_events(ax):
+                yield event
+            yield Event('close_axes', ax)
+        yield Event('close_figure', fig)
+
+    def _prepare_fig(self, fig):
+        self._started = time.time()
+        self.stats = {}
+        self.columns = ColumnStore()
+        self.styles = StyleTable()
+        self.spatial_indexes = {}
+        if self.precision is not None:
+            self.stats['precision'] = self.precision.new_stats()
+        if self.budget is not None:
+            self.stats['budget'] = self.budget.new_stats()
+        if self.prune is not None:
+            self.stats['prune'] = self.prune.new_stats()
+        if self.axis_cache is not None:
+            self.stats['axis_cache'] = {'hits': 0, 'misses': 0}
+        if self.path_cache is not None:
+            self.stats['path_cache'] = {'paths': 0, 'unique': 0,
+                                        'hits': 0, 'misses': 0}
+
         # Calling savefig executes the draw() command, putting elements
         # in the correct place.
-        fig.savefig(io.BytesIO(), format='png', dpi=fig.dpi)
+        with _figure_lock(fig):
+            self._timed('savefig', fig.savefig)(io.BytesIO(), format='png',
+                                                dpi=fig.dpi)
+        if self.budget is not None:
+            self.stats['budget']['draw_time'] = time.time() - self._started
+            self._shares = {}
+            if self.budget.allocate and self.budget.points is not None:
+                self._shares = self._timed('allocate',
+                                           self.allocate_points)(fig)
         if self.close_mpl:
+            # pyplot is only needed (and imported) to close the figure
             import matplotlib.pyplot as plt
-            plt.close(fig)
-        self.crawl_fig(fig)
+            with _pyplot_lock:
+                plt.close(fig)
+
+    def _timed(self, stage, func, count=None):
+        """Return func, instrumented as the given stage if requested"""
+        if self.instrument is None:
+            return func
+        return self.instrument.wrap('exporter.' + stage, func, count)
+
+    @staticmethod
+    def _count_rows(result, *args, **kwargs):
+        return len(result)
+
+    @staticmethod
+    def _count_vertices(result, *args, **kwargs):
+        if isinstance(result, list):
+            return sum(len(vertices) for vertices, pathcodes in result)
+        return len(result[0])
+
+    def _dispatch(self, events):
+        for event in events:
+            event.dispatch(self.renderer, self.lazy)
+
+    def _with_precision(self, data, ax, coordinates, source=None):
+        """Wrap deferred data so that the precision policy is applied"""
+        if self.precision is None:
+            return data
+        # the decimals are computed here, as they read the axes
+        return Deferred(self._timed('precision', self._apply_precision,
+                                    self._count_rows),
+                        data, self.precision.decimals(ax, coordinates),
+                        coordinates, source)
+
+    def _apply_precision(self, data, decimals, coordinates, source):
+        data = data.get()
+        # transforms may return their input: never modify the figure data
+        copy = source is not None and np.may_share_memory(data, source)
+        total = self.stats.get('precision')
+        if total is None:
+            return self.precision.apply(data, None, coordinates, copy=copy,
+                                        decimals=decimals)
+        # accumulate separately, as data may be computed in worker threads
+        stats = self.precision.new_stats()
+        data = self.precision.apply(data, None, coordinates, stats=stats,
+                                    copy=copy, decimals=decimals)
+        with self._lock:
+            for key, value in stats.items():
+                total[key] += value
+        return data
+
+    def _style(self, kind, obj, fields, argument='style', key=None):
+        if self.instrument is not None:
+            fields_id = id(fields)
+            if fields_id not in self._timed_fields:
+                self._timed_fields[fields_id] = dict(
+                    (name, self._timed('style', func))
+                    for name, func in fields.items())
+            fields = self._timed_fields[fields_id]
+        if self.intern_styles:
+            if self.styles is None:
+                self.styles = StyleTable()
+            if key is not None:
+                return self.styles.intern_artist(obj, fields, key)
+            return self.styles.intern(utils.get_style(obj, fields))
+        return LazyStyle(obj, fields, self.access_log, kind, argument)
+
+    def _lazy_array(self, kind, deferred, shape=None, argument='data'):
+        return LazyArray(deferred, shape, self.access_log, kind, argument)
+
+    def _process_transform(self, transform, ax):
+        """Return the coordinate code and the frozen transform of data
+
+        Deferred computations may run on worker threads: they use frozen
+        copies of the transforms, computed here, as the invalidation
+        caches of matplotlib transforms are not thread-safe.
+        """
+        code, transform = self.process_transform(transform, ax,
+                                                 return_trans=True)
+        return code, transform.frozen()
 
     @staticmethod
     def process_transform(transform, ax=None, data=None, return_trans=False):
@@ -93,129 +418,602 @@ class Exporter(object):
             else:
                 return code
 
+    @staticmethod
+    def figure_properties(fig):
+        """Return the property dictionary passed to renderer.open_figure"""
+        return {'figwidth': fig.get_figwidth(),
+                'figheight': fig.get_figheight(),
+                'dpi': fig.dpi}
+
+    def _axes_properties(self, ax):
+        return self._timed('axes_properties', self.axes_properties)(
+            ax, self.axis_cache, self.stats.get('axis_cache'))
+
+    @staticmethod
+    def axes_properties(ax, axis_cache=None, stats=None):
+        """Return the property dictionary passed to renderer.open_axes
+
+        If given, the axis properties are looked up in axis_cache (an
+        AxisPropertyCache), counting the hits and misses in stats.
+        """
+        if axis_cache is None:
+            axes = [utils.get_axis_properties(ax.xaxis),
+                    utils.get_axis_properties(ax.yaxis)]
+        else:
+            axes = [axis_cache.get(ax.xaxis, stats),
+                    axis_cache.get(ax.yaxis, stats)]
+        return {'xlim': ax.get_xlim(),
+                'ylim': ax.get_ylim(),
+                'xlabel': ax.get_xlabel(),
+                'ylabel': ax.get_ylabel(),
+                'title': ax.get_title(),
+                'bounds': ax.get_position().bounds,
+                # an axis has gridlines if it has ticks
+                'xgrid': bool(ax.xaxis._gridOnMajor and axes[0]['nticks']),
+                'ygrid': bool(ax.yaxis._gridOnMajor and axes[1]['nticks']),
+                'dynamic': ax.get_navigate(),
+                'axes': axes}
+
     def crawl_fig(self, fig):
         """Crawl the figure and process all axes"""
-        properties = {'figwidth': fig.get_figwidth(),
-                      'figheight': fig.get_figheight(),
-                      'dpi': fig.dpi}
-        with self.renderer.draw_figure(fig, properties):
-            for ax in fig.axes:
-                self.crawl_ax(ax)
+        properties = self.figure_properties(fig)
+        with self.renderer.draw_figure(fig, properties, self.columns,
+                                       self.styles):
+            axes = self._kept(fig.axes, 'axes')
+            if self.workers is None:
+                for ax in axes:
+                    self.crawl_ax(ax)
+            else:
+                for ax, properties, events in self._extract_axes(axes):
+                    with self.renderer.draw_axes(ax, properties):
+                        self._dispatch(events)
+
+    def _extract_axes(self, axes):
+        """Extract the properties and events of each axes on the workers
+
+        Yields (ax, properties, events) in the order of axes, as soon as
+        each is ready.
+
+        Matplotlib objects are only read in the calling thread: the events,
+        styles and images of all axes are generated there, and the workers
+        compute the data and paths of the events, from frozen transforms
+        (see _process_transform).
+        """
+        pool = self.workers
+        if isinstance(pool, int):
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(pool)
+        try:
+            extracted = [self._prepare_ax(ax) for ax in axes]
+            for result in pool.imap(self._compute_ax, extracted):
+                yield result
+        finally:
+            if pool is not self.workers:
+                pool.terminate()
+
+    def _prepare_ax(self, ax):
+        properties = self._axes_properties(ax)
+        events = list(self.iter_ax_events(ax))
+        for event in events:
+            if event.kind == 'image':
+                # rasterizing or encoding images draws matplotlib artists
+                event.compute()
+                continue
+            event.compute_styles()
+        return ax, properties, events
+
+    @staticmethod
+    def _compute_ax(extracted):
+        ax, properties, events = extracted
+        for event in events:
+            event.compute()
+        return ax, properties, events
 
     def crawl_ax(self, ax):
         """Crawl the axes and process all elements within"""
-        properties = {'xlim': ax.get_xlim(),
-                      'ylim': ax.get_ylim(),
-                      'xlabel': ax.get_xlabel(),
-                      'ylabel': ax.get_ylabel(),
-                      'title': ax.get_title(),
-                      'bounds': ax.get_position().bounds,
-                      'xgrid': bool(ax.xaxis._gridOnMajor
-                                    and ax.xaxis.get_gridlines()),
-                      'ygrid': bool(ax.yaxis._gridOnMajor
-                                    and ax.yaxis.get_gridlines()),
-                      'dynamic': ax.get_navigate(),
-                      'axes': [utils.get_axis_properties(ax.xaxis),
-                               utils.get_axis_properties(ax.yaxis)]}
-
+        properties = self._axes_properties(ax)
         with self.renderer.draw_axes(ax, properties):
-            for line in ax.lines:
-                self.draw_line(ax, line)
-            for text in ax.texts:
-                # xlabel and ylabel are passed as arguments to the axes
-                # we don't want to pass them again here
-                if text is ax.xaxis.label:
-                    continue
-                if text is ax.yaxis.label:
+            self._dispatch(self.iter_ax_events(ax))
+
+    def _kept(self, artists, kind, count=True):
+        """Return the artists which the prune policy does not skip
+
+        Unless count is False, the skipped artists are counted in
+        ``stats['prune']``.
+        """
+        if self.prune is None:
+            return list(artists)
+        reason = self._timed('prune', self.prune.reason)
+        kept, skipped = [], []
+        for artist in artists:
+            why = reason(artist, kind)
+            if why is None:
+                kept.append(artist)
+            else:
+                skipped.append(why)
+        stats = self.stats.get('prune')
+        if count and skipped and stats is not None:
+            # axes may be crawled in worker threads
+            with self._lock:
+                stats['axes' if kind == 'axes' else 'artists'] += \
+                    len(skipped)
+                for why in skipped:
+                    stats[why] += 1
+        return kept
+
+    def iter_ax_events(self, ax):
+        """Generate the draw events for all elements within the axes"""
+        # the lines and collections exported, with their exported points
+        emitted = [] if self.spatial_index else None
+        for line in self._kept(ax.lines, 'line'):
+            for event in self.line_events(ax, line, emitted):
+                yield event
+        # xlabel and ylabel are passed as arguments to the axes
+        # we don't want to pass them again here
+        texts = [text for text in ax.texts
+                 if text is not ax.xaxis.label and text is not ax.yaxis.label]
+        for event in self.texts_events(ax, self._kept(texts, 'text')):
+            yield event
+        for patch in self._kept(ax.patches, 'patch'):
+            for event in self.patch_events(ax, patch):
+                yield event
+        for collection in self._kept(ax.collections, 'collection'):
+            for event in self.collection_events(ax, collection, emitted):
+                yield event
+        for image in self._kept(ax.images, 'image'):
+            for event in self.image_events(ax, image):
+                yield event
+        if self.spatial_index:
+            index = self._timed('spatial_index',
+                                self.build_spatial_index)(ax, emitted)
+            self.spatial_indexes[ax] = index
+            yield Event('spatial_index', ax, index=index)
+
+    @staticmethod
+    def build_spatial_index(ax, emitted=None, **kwargs):
+        """Return the SpatialIndex of the points of the axes
+
+        The points of each line, and the offsets of each collection which
+        are in data coordinates, are indexed in display coordinates.
+        emitted is the list of (artist, keep) pairs of the lines and
+        collections exported, keep being the indices of their exported
+        points, or None if all were exported; it defaults to all the lines
+        and collections of the axes.  Keyword arguments are passed to
+        SpatialIndex.
+        """
+        if emitted is None:
+            emitted = [(artist, None) for artist
+                       in list(ax.lines) + list(ax.collections)]
+        artist_points = []
+        for artist, keep in emitted:
+            if isinstance(artist, Line2D):
+                points = artist.get_xydata()
+                transform = artist.get_transform()
+            else:
+                transform, transOffset, points, paths = \
+                    artist._prepare_points()
+                if not (transOffset.contains_branch(ax.transData)
+                        and len(points)):
                     continue
-                self.draw_text(ax, text)
-            for patch in ax.patches:
-                self.draw_patch(ax, patch)
-            for collection in ax.collections:
-                self.draw_collection(ax, collection)
-            for image in ax.images:
-                self.draw_image(ax, image)
+                transform = transOffset
+                if keep is not None:
+                    # offsets are cycled over the paths
+                    keep = np.unique(keep % len(points))
+            if keep is None:
+                keep = np.arange(len(points))
+            artist_points.append((artist,
+                                  transform.transform(points[keep]), keep))
+        return SpatialIndex.from_artists(artist_points, **kwargs)
 
     def draw_line(self, ax, line):
         """Process a matplotlib line and call renderer.draw_line"""
-        code, data = self.process_transform(line.get_transform(),
-                                            ax, line.get_xydata())
-        linestyle = utils.get_line_style(line)
-        if linestyle['dasharray'] not in ['None', 'none', None]:
-            self.renderer.draw_line(data,
-                                    coordinates=code,
-                                    style=linestyle, mplobj=line)
-
-        markerstyle = utils.get_marker_style(line)
-        if markerstyle['marker'] not in ['None', 'none', None]:
-            self.renderer.draw_markers(data,
-                                       coordinates=code,
-                                       style=markerstyle, mplobj=line)
+        self._dispatch(self.line_events(ax, line))
 
     def draw_text(self, ax, text):
         """Process a matplotlib text object and call renderer.draw_text"""
+        self._dispatch(self.text_events(ax, text))
+
+    def draw_patch(self, ax, patch):
+        """Process a matplotlib patch object and call renderer.draw_path"""
+        self._dispatch(self.patch_events(ax, patch))
+
+    def draw_collection(self, ax, collection):
+        """Process a matplotlib collection and call renderer.draw_collection"""
+        self._dispatch(self.collection_events(ax, collection))
+
+    def draw_image(self, ax, image):
+        """Process a matplotlib image object and call renderer.draw_image"""
+        self._dispatch(self.image_events(ax, image))
+
+    def line_events(self, ax, line, emitted=None):
+        """Generate the line and marker events for a matplotlib line
+
+        If emitted is given, (line, keep) is appended to it if the line is
+        exported, keep being the indices of the points exported, or None.
+        """
+        code, transform = self._process_transform(line.get_transform(), ax)
+        linestyle = self._style('line', line, utils.LINE_STYLE,
+                                key=utils.line_style_key)
+        markerstyle = self._style('markers', line, utils.MARKER_STYLE,
+                                  key=utils.marker_style_key)
+        draw_line = linestyle.peek('dasharray') not in ['None', 'none', None]
+        draw_markers = markerstyle.peek('marker') not in ['None', 'none',
+                                                          None]
+        if not (draw_line or draw_markers):
+            return
+
+        # the length of the original data, without building matplotlib's
+        # cached copy of the xy data
+        npoints = len(line.get_xdata(orig=True))
+        step, value = self._degrade(
+            line, 'line', npoints,
+            lambda: line.get_transform().transform(line.get_xydata()),
+            ordered=draw_line)
+        if step == 'rasterize':
+            yield self._raster_event(ax, line)
+            return
+        if emitted is not None:
+            emitted.append((line, self._kept_indices(step, value,
+                                                     npoints)))
+
+        # the line and its markers share the same lazily transformed data
+        data, shape, source = self._line_data(
+            line, transform, step=value if step == 'decimate' else 1,
+            indices=value if step == 'simplify' else None)
+        data = self._with_precision(data, ax, code, source)
+
+        if draw_line:
+            yield Event('line', line,
+                        data=self._lazy_array('line', data, shape),
+                        coordinates=code, style=linestyle)
+
+        if draw_markers:
+            yield Event('markers', line,
+                        data=self._lazy_array('markers', data, shape),
+                        coordinates=code, style=markerstyle)
+
+    def _line_data(self, line, transform, step=1, indices=None):
+        """Return the deferred transformed data of a line, its shape, and
+        the source array it was computed from (if held in memory)
+
+        If given, only the points of the given indices, or every step-th
+        point, are transformed.
+        """
+        x = line.get_xdata(orig=True)
+        y = line.get_ydata(orig=True)
+        memmap = ((utils.is_memmap(x) or utils.is_memmap(y))
+                  and isinstance(x, np.ndarray) and isinstance(y, np.ndarray)
+                  and x.ndim == y.ndim == 1 and len(x) == len(y)
+                  and indices is None)
+        if not memmap:
+            xydata = line.get_xydata()
+            if indices is not None:
+                xydata = xydata[indices]
+            if len(xydata) <= self.chunk_threshold and step == 1:
+                return (Deferred(self._timed('process_transform',
+                                             transform.transform,
+                                             self._count_rows), xydata),
+                        xydata.shape, xydata)
+            x, y = xydata[:, 0], xydata[:, 1]
+        return (Deferred(self._timed('process_transform',
+                                     self._transform_chunked,
+                                     self._count_rows),
+                         transform, x, y, memmap, step),
+                ((len(x) + step - 1) // step, 2), None)
+
+    def _transform_chunked(self, transform, x, y, memmap=False, step=1):
+        out = utils.empty_buffer(((len(x) + step - 1) // step, 2),
+                                 memmap=memmap)
+        return utils.transform_chunked(transform, x, y,
+                                       chunksize=self.chunksize, step=step,
+                                       out=out)
+
+    def _degrade(self, artist, kind, npoints, display=None, ordered=True):
+        """Fit an artist of npoints points into the export budget
+
+        display is a function returning the display coordinates of the
+        points, if the artist may be simplified.
+
+        Returns
+        -------
+        step, value : tuple
+            (None, None) if the artist fits the budget (or there is no
+            budget), ('simplify', indices) of the points to keep,
+            ('decimate', stride) or ('rasterize', None).
+        """
+        budget = self.budget
+        if budget is None:
+            return None, None
+        stats = self.stats['budget']
+        with self._lock:
+            allowed, reason = budget.allowance(
+                stats, time.time() - self._started, kind,
+                self._shares.get(artist))
+            if allowed is None or npoints <= allowed:
+                budget.spend(stats, npoints, kind)
+                return None, None
+
+        steps = []
+        result = None
+        # simplification costs time and memory proportional to npoints
+        if display is not None and reason == 'points':
+            indices = self._timed('simplify', simplify, self._count_rows)(
+                display(), budget.tolerance, ordered)
+            steps.append(('simplify', len(indices)))
+            if len(indices) <= allowed:
+                result = ('simplify', indices)
+        if result is None:
+            if allowed < budget.min_points and budget.rasterize:
+                steps.append(('rasterize', 0))
+                result = ('rasterize', None)
+            else:
+                stride = decimation_step(npoints,
+                                         max(allowed, budget.min_points))
+                steps.append(('decimate', -(-npoints // stride)))
+                result = ('decimate', stride)
+
+        with self._lock:
+            budget.spend(stats, steps[-1][1], kind)
+            for step, output in steps:
+                stats['steps'].append({'kind': kind,
+                                       'label': artist.get_label(),
+                                       'step': step, 'reason': reason,
+                                       'points': npoints, 'allowed': allowed,
+                                       'output': output})
+        return result
+
+    def allocate_points(self, fig):
+        """Split the points budget between the lines and collections of fig
+
+        Each artist is allocated a share of the budget according to its
+        number of points and to the size of its bounding box on screen,
+        clipped to its axes (see mplexporter.budget.allocate).
+
+        Returns
+        -------
+        shares : dictionary
+            The number of points allocated to each artist.
+        """
+        artists, lengths, extents = [], [], []
+        for ax in self._kept(fig.axes, 'axes', count=False):
+            for line in self._kept(ax.lines, 'line', count=False):
+                if (utils.get_dasharray(line) in ['None', 'none', None]
+                        and line.get_marker() in ['None', 'none', None]):
+                    continue
+                xydata = line.get_xydata()
+                artists.append(line)
+                lengths.append(len(xydata))
+                extents.append(self._extent(ax, line.get_transform(),
+                                            xydata))
+            for collection in self._kept(ax.collections, 'collection',
+                                         count=False):
+                offsets = collection.get_offsets()
+                paths = collection.get_paths()
+                artists.append(collection)
+                lengths.append(len(offsets) + sum(len(path.vertices)
+                                                  for path in paths))
+                if len(offsets) > 1:
+                    extents.append(self._extent(
+                        ax, collection.get_offset_transform(), offsets))
+                else:
+                    extents.append(self._extent(
+                        ax, ax.transData,
+                        collection.get_datalim(ax.transData).get_points()))
+        shares = allocate(self.budget.points, lengths, extents)
+        return dict(zip(artists, shares))
+
+    @staticmethod
+    def _extent(ax, transform, points):
+        """Return the width plus height of the display bounding box of
+        points, clipped to the axes, in pixels"""
+        if not len(points):
+            return 0
+        with warnings.catch_warnings():
+            # all-nan columns
+            warnings.simplefilter('ignore', RuntimeWarning)
+            corners = np.array([np.nanmin(points, 0), np.nanmax(points, 0)])
+        if not np.isfinite(corners).all():
+            return 0
+        corners = np.sort(transform.transform(corners), axis=0)
+        (x0, y0), (x1, y1) = ax.bbox.get_points()
+        return (max(0, min(corners[1, 0], x1) - max(corners[0, 0], x0))
+                + max(0, min(corners[1, 1], y1) - max(corners[0, 1], y0)))
+
+    def _raster_event(self, ax, artist):
+        """Return the image event of an artist drawn alone"""
+        return Event('image', artist,
+                     imdata=Deferred(self._timed('rasterize',
+                                                 utils.rasterize_artist),
+                                     artist, ax),
+                     extent=ax.get_xlim() + ax.get_ylim(),
+                     coordinates="data",
+                     style={'alpha': 1, 'zorder': artist.get_zorder()})
+
+    def text_events(self, ax, text):
+        """Generate the event for a matplotlib text object"""
         content = text.get_text()
         if content:
             transform = text.get_transform()
             position = text.get_position()
             code, position = self.process_transform(transform, ax,
                                                     position)
-            style = utils.get_text_style(text)
-            self.renderer.draw_text(content, position, code,
-                                    style, mplobj=text)
+            style = self._style('text', text, utils.TEXT_STYLE,
+                                key=utils.text_style_key)
+            yield Event('text', text, text=content, position=position,
+                        coordinates=code, style=style)
 
-    def draw_patch(self, ax, patch):
-        """Process a matplotlib patch object and call renderer.draw_path"""
-        vertices, pathcodes = utils.SVG_path(patch.get_path())
-        transform = patch.get_transform()
-        coordinates, vertices = self.process_transform(transform,
-                                                       ax, vertices)
-        linestyle = utils.get_path_style(patch)
-        self.renderer.draw_path(vertices,
-                                coordinates=coordinates,
-                                pathcodes=pathcodes,
-                                style=linestyle,
-                                mplobj=patch)
+    def texts_events(self, ax, texts):
+        """Generate batched events for a sequence of matplotlib texts
 
-    def draw_collection(self, ax, collection):
-        """Process a matplotlib collection and call renderer.draw_collection"""
+        Consecutive texts sharing a transform are batched into one 'texts'
+        event, whose positions are transformed in a single call.
+        """
+        batch = []
+        for text in texts:
+            if not text.get_text():
+                continue
+            if batch and text.get_transform() is not batch[0].get_transform():
+                yield self._texts_event(ax, batch)
+                batch = []
+            batch.append(text)
+        if batch:
+            yield self._texts_event(ax, batch)
+
+    def _texts_event(self, ax, texts):
+        code, transform = self._process_transform(texts[0].get_transform(),
+                                                  ax)
+        positions = np.array([text.get_position() for text in texts],
+                             dtype=float)
+        positions = self._lazy_array(
+            'texts', Deferred(self._timed('process_transform',
+                                          transform.transform,
+                                          self._count_rows), positions),
+            positions.shape, argument='positions')
+        styles = [self._style('texts', text, utils.TEXT_STYLE, 'styles',
+                              key=utils.text_style_key)
+                  for text in texts]
+        return Event('texts', texts,
+                     texts=[text.get_text() for text in texts],
+                     positions=positions, coordinates=code, styles=styles)
+
+    def patch_events(self, ax, patch):
+        """Generate the path event for a matplotlib patch object"""
+        coordinates, transform = self._process_transform(
+            patch.get_transform(), ax)
+        path = Deferred(self._timed('SVG_path', self._process_path,
+                                    self._count_vertices),
+                        patch.get_path(), transform)
+        vertices = self._with_precision(path.item(0), ax, coordinates)
+        linestyle = self._style('path', patch, utils.PATH_STYLE,
+                                key=utils.path_style_key)
+        yield Event('path', patch,
+                    data=self._lazy_array('path', vertices),
+                    coordinates=coordinates,
+                    pathcodes=path.item(1),
+                    style=linestyle)
+
+    def collection_events(self, ax, collection, emitted=None):
+        """Generate the path collection event for a matplotlib collection
+
+        If emitted is given, (collection, keep) is appended to it, keep
+        being the indices of the paths and offsets exported, or None.
+        """
         (transform, transOffset,
          offsets, paths) = collection._prepare_points()
+        path_transforms = collection.get_transforms()
+        styles = None
 
-        offset_coordinates, offsets = self.process_transform(transOffset,
-                                                             ax,
-                                                             offsets)
+        keep = None
+        if self.budget is not None:
+            # markers at data offsets may be simplified
+            display = None
+            if (len(paths) <= 1 and len(offsets) > 1
+                    and transOffset.contains_branch(ax.transData)):
+                display = lambda: transOffset.transform(offsets)
+            npoints = len(offsets) + sum(len(path.vertices)
+                                         for path in paths)
+            step, value = self._degrade(collection, 'collection', npoints,
+                                        display, ordered=False)
+            if step == 'rasterize':
+                yield self._raster_event(ax, collection)
+                return
+            if step is not None:
+                keep = self._kept_indices(step, value,
+                                          max(len(paths), len(offsets)))
+                offsets = self._take(offsets, keep)
+                paths = self._take(paths, keep)
+                path_transforms = self._take(path_transforms, keep)
+                styles = dict(
+                    (key, self._take(values, keep)) for key, values in
+                    utils.get_style(collection,
+                                    utils.COLLECTION_STYLE).items())
+                if self.intern_styles:
+                    styles = self.styles.intern(styles)
 
-        processed_paths = [utils.SVG_path(path) for path in paths]
-        path_coordinates, tr = self.process_transform(transform, ax,
-                                                      return_trans=True)
-        processed_paths = [(tr.transform(path[0]), path[1])
-                           for path in processed_paths]
-        path_transforms = collection.get_transforms()
-        styles = {'linewidth': collection.get_linewidths(),
-                  'facecolor': collection.get_facecolors(),
-                  'edgecolor': collection.get_edgecolors(),
-                  'alpha': collection._alpha,
-                  'zorder': collection.get_zorder()}
+        offset_coordinates, transOffset = self._process_transform(
+            transOffset, ax)
+        offsets = self._lazy_array(
+            'collection',
+            self._with_precision(Deferred(self._timed('process_transform',
+                                                      transOffset.transform,
+                                                      self._count_rows),
+                                          offsets),
+                                 ax, offset_coordinates, offsets),
+            offsets.shape, argument='offsets')
+
+        path_coordinates, tr = self._process_transform(transform, ax)
+        processed_paths = Deferred(self._timed('SVG_path',
+                                               self._process_paths,
+                                               self._count_vertices),
+                                   paths, tr)
+        if styles is None:
+            styles = self._style('collection', collection,
+                                 utils.COLLECTION_STYLE, argument='styles')
+        if emitted is not None:
+            emitted.append((collection, keep))
 
         offset_dict = {"data": "before",
                        "screen": "after"}
         offset_order = offset_dict[collection.get_offset_position()]
 
-        self.renderer.draw_path_collection(processed_paths,
-                                           path_coordinates,
-                                           path_transforms,
-                                           offsets,
-                                           offset_coordinates,
-                                           offset_order,
-                                           styles,
-                                           mplobj=collection)
+        yield Event('collection', collection,
+                    paths=processed_paths,
+                    path_coordinates=path_coordinates,
+                    path_transforms=path_transforms,
+                    offsets=offsets,
+                    offset_coordinates=offset_coordinates,
+                    offset_order=offset_order,
+                    styles=styles)
 
-    def draw_image(self, ax, image):
-        """Process a matplotlib image object and call renderer.draw_image"""
-        self.renderer.draw_image(imdata=utils.image_to_base64(image),
-                                 extent=image.get_extent(),
-                                 coordinates="data",
-                                 style={"alpha": image.get_alpha(),
-                                        "zorder": image.get_zorder()},
-                                 mplobj=image)
+    @staticmethod
+    def _kept_indices(step, value, npoints):
+        """Return the indices of the points kept by a step of _degrade, or
+        None if all are kept"""
+        if step == 'simplify':
+            return value
+        elif step == 'decimate':
+            return np.arange(0, npoints, value)
+        return None
+
+    @staticmethod
+    def _take(values, indices):
+        """Take the given elements of a cycled per-element sequence"""
+        if isinstance(values, (list, tuple)):
+            if len(values) <= 1:
+                return values
+            return [values[i % len(values)] for i in indices]
+        if values is None or np.ndim(values) == 0 or len(values) <= 1:
+            return values
+        return np.asarray(values)[indices % len(values)]
+
+    @staticmethod
+    def _process_path(path, transform):
+        vertices, pathcodes = utils.SVG_path(path)
+        return transform.transform(vertices), pathcodes
+
+    def _process_paths(self, paths, transform):
+        if self.path_cache is None:
+            return [self._process_path(path, transform) for path in paths]
+        processed = {}
+        result = []
+        for entry in self.path_cache.process(paths,
+                                             self.stats.get('path_cache')):
+            # paths repeated in the collection share their output
+            key = id(entry)
+            if key not in processed:
+                vertices, pathcodes = entry
+                processed[key] = (transform.transform(vertices),
+                                  list(pathcodes))
+            result.append(processed[key])
+        return result
+
+    def image_events(self, ax, image):
+        """Generate the event for a matplotlib image object"""
+        yield Event('image', image,
+                    imdata=Deferred(self._timed('image_to_base64',
+                                                utils.image_to_base64),
+                                    image),
+                    extent=image.get_extent(),
+                    coordinates="data",
+                    style=self._style('image', image, utils.IMAGE_STYLE,
+                                      key=utils.image_style_key))
@@ -0,0 +1,269 @@
+"""
+Instrumentation
+===============
+This submodule contains the opt-in instrumentation used to profile the
+stages of an export (savefig, transforms, path conversion, style
+extraction, ...) and the callbacks of the renderer.
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+# renderer callbacks, with the name and position of the argument holding
+# the points they process
+RENDERER_CALLBACKS = {'open_figure': None,
+                      'close_figure': None,
+                      'open_axes': None,
+                      'close_axes': None,
+                      'draw_line': ('data', 0),
+                      'draw_markers': ('data', 0),
+                      'draw_path': ('data', 0),
+                      'draw_path_collection': ('offsets', 3),
+                      'draw_text': None,
+                      'draw_texts': ('positions', 1),
+                      'draw_image': None}
+
+
+def _count_points(data):
+    """Count the points of data, without triggering a lazy computation"""
+    shape = getattr(data, 'known_shape', None)
+    if shape is None and not hasattr(data, 'known_shape'):
+        shape = getattr(data, 'shape', None)
+    if shape:
+        return shape[0]
+    return 0
+
+
+class StageStats(object):
+    """Accumulated statistics of one instrumented stage or callback"""
+    __slots__ = ('calls', 'time', 'points', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.points = 0
+        self.bytes = None
+
+    def add(self, elapsed, points, nbytes):
+        self.calls += 1
+        self.time += elapsed
+        self.points += points
+        if nbytes is not None:
+            self.bytes = (self.bytes or 0) + nbytes
+
+    def as_dict(self):
+        return {'calls': self.calls, 'time': self.time,
+                'points': self.points, 'bytes': self.bytes}
+
+
+class Report(object):
+    """Structured report of an instrumented export
+
+    The report maps stage names to StageStats.  Exporter stages are named
+    e.g. 'exporter.savefig' or 'exporter.process_transform', renderer
+    callbacks e.g. 'renderer.draw_line'.  Times are inclusive: lazily
+    computed stages (such as transforms) are counted both on their own and
+    within the renderer callback which triggered them.
+    """
+    def __init__(self, stages):
+        self.stages = stages
+
+    def __getitem__(self, name):
+        return self.stages[name]
+
+    def __contains__(self, name):
+        return name in self.stages
+
+    def as_dict(self):
+        return dict((name, stats.as_dict())
+                    for name, stats in self.stages.items())
+
+    def __str__(self):
+        lines = ["{0:<36}{1:>8}{2:>12}{3:>12}{4:>14}".format(
+            "stage", "calls", "time (ms)", "points", "bytes")]
+        for name in sorted(self.stages, key=lambda name:
+                           -self.stages[name].time):
+            stats = self.stages[name]
+            lines.append("{0:<36}{1:>8}{2:>12.2f}{3:>12}{4:>14}".format(
+                name, stats.calls, 1000 * stats.time, stats.points,
+                '-' if stats.bytes is None else stats.bytes))
+        return "\n".join(lines)
+
+
+class Instrumentation(object):
+    """Opt-in profiling of Exporter stages and Renderer callbacks
+
+    Parameters
+    ----------
+    sinks : list of callables (optional)
+        Each sink is called after every measurement as
+        ``sink(name, measurement)``, where measurement is a dictionary with
+        the keys 'time' (seconds), 'points' and 'bytes'.  This may be used
+        to forward measurements to a logger or a statsd-like client.
+    trace_memory : bool (optional)
+        If True, use tracemalloc to measure the bytes allocated by each
+        stage: the peak of the traced memory during the stage, above its
+        value when the stage started, so that temporary allocations are
+        counted.  This slows down the export, and is only available on
+        Python 3; before Python 3.9, which cannot reset the peak, the net
+        growth of the traced memory (or zero) is measured instead.
+
+    Pass the instrumentation to the Exporter, and call report() after the
+    export.
+    """
+    def __init__(self, sinks=None, trace_memory=False):
+        if trace_memory and tracemalloc is None:
+            raise ValueError("trace_memory requires the tracemalloc module")
+        self.sinks = list(sinks or [])
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._started_tracing = False
+        self._frames = []
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self.stages = {}
+
+    def report(self):
+        """Return a Report of the measurements so far"""
+        return Report(dict(self.stages))
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _memory_start(self):
+        """Start measuring the memory of a stage: return its frame, a
+        [start, peak] list, or None if memory is not traced"""
+        if not (self.trace_memory and tracemalloc.is_tracing()):
+            return None
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, 'reset_peak'):
+                # the stages being measured keep the peak reached so far
+                for frame in self._frames:
+                    frame[1] = max(frame[1], peak)
+                tracemalloc.reset_peak()
+            frame = [current, current]
+            self._frames.append(frame)
+        return frame
+
+    def _memory_end(self, frame):
+        """Return the bytes allocated by the stage of frame"""
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            self._frames.remove(frame)
+            if not hasattr(tracemalloc, 'reset_peak'):
+                return max(current - frame[0], 0)
+            for outer in self._frames:
+                outer[1] = max(outer[1], peak)
+            return max(frame[1], peak) - frame[0]
+
+    def record(self, name, elapsed, points=0, nbytes=None):
+        """Record one measurement of the given stage"""
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.add(elapsed, points, nbytes)
+        for sink in self.sinks:
+            sink(name, {'time': elapsed, 'points': points, 'bytes': nbytes})
+
+    @contextmanager
+    def measure(self, name, points=0):
+        """Context manager measuring the enclosed block as stage name"""
+        frame = self._memory_start()
+        t0 = time.time()
+        yield
+        elapsed = time.time() - t0
+        nbytes = None
+        if frame is not None:
+            nbytes = self._memory_end(frame)
+        self.record(name, elapsed, points, nbytes)
+
+    def wrap(self, name, func, count=None):
+        """Return func, instrumented as stage name
+
+        If count is given, the number of points processed by each call is
+        count(result, *args, **kwargs).
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            frame = self._memory_start()
+            t0 = time.time()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                elapsed = time.time() - t0
+                nbytes = None
+                if frame is not None:
+                    nbytes = self._memory_end(frame)
+            points = 0 if count is None else count(result, *args, **kwargs)
+            self.record(name, elapsed, points, nbytes)
+            return result
+        return wrapper
+
+    @contextmanager
+    def instrument_renderer(self, renderer):
+        """Context manager instrumenting the callbacks of a renderer
+
+        Within the context, the renderer methods listed in
+        RENDERER_CALLBACKS are replaced by instrumented versions, so that
+        calls made by the renderer to itself (e.g. from draw_line to
+        draw_path) are recorded as well.  The methods are restored on
+        exit, including those the renderer instance defined itself.
+        """
+        previous = dict((callback, vars(renderer)[callback])
+                        for callback in RENDERER_CALLBACKS
+                        if callback in vars(renderer))
+        for callback, argument in RENDERER_CALLBACKS.items():
+            count = None
+            if argument is not None:
+                count = self._argument_counter(*argument)
+            method = getattr(renderer, callback)
+            setattr(renderer, callback,
+                    self.wrap('renderer.' + callback, method, count))
+        try:
+            yield renderer
+        finally:
+            for callback in RENDERER_CALLBACKS:
+                if callback in previous:
+                    setattr(renderer, callback, previous[callback])
+                else:
+                    delattr(renderer, callback)
+
+    @staticmethod
+    def _argument_counter(name, position):
+        def count(result, *args, **kwargs):
+            if name in kwargs:
+                return _count_points(kwargs[name])
+            elif len(args) > position:
+                return _count_points(args[position])
+            return 0
+        return count
+
+
+def logging_sink(logger=None, level=logging.DEBUG):
+    """Return an instrumentation sink writing measurements to a logger"""
+    if logger is None:
+        logger = logging.getLogger('mplexporter')
+
+    def sink(name, measurement):
+        logger.log(level, "%s: %.3f ms, %d points, %s bytes", name,
+                   1000 * measurement['time'], measurement['points'],
+                   measurement['bytes'])
+    return sink
@@ -0,0 +1,206 @@
+"""
+Lazy Payloads
+=============
+This submodule contains the lazy containers which the Exporter passes to
+renderers in place of eagerly computed arrays and style dictionaries, if
+it is created with ``lazy=True`` (or ``track_access=True``).  Each
+field is computed on first access and cached, so that renderers only pay
+for the information they actually use.  An :class:`AccessLog` may be
+attached to record which fields were consumed.
+"""
+import threading
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+import numpy as np
+
+
+class AccessLog(object):
+    """Record of the payload fields offered to and consumed by a renderer
+
+    Entries are keyed by ``(kind, argument)``, where ``kind`` is the event
+    kind (e.g. 'line') and ``argument`` the renderer argument (e.g. 'style').
+    """
+    def __init__(self):
+        self.offered = {}
+        self.consumed = {}
+        self._lock = threading.Lock()
+
+    def offer(self, kind, argument, fields):
+        key = (kind, argument)
+        with self._lock:
+            counts = self.offered.setdefault(key, {})
+            for field in fields:
+                counts[field] = counts.get(field, 0) + 1
+
+    def record(self, kind, argument, field):
+        with self._lock:
+            counts = self.consumed.setdefault((kind, argument), {})
+            counts[field] = counts.get(field, 0) + 1
+
+    def unused(self, kind, argument):
+        """Return the sorted list of offered fields which were never used"""
+        consumed = self.consumed.get((kind, argument), {})
+        return sorted(field for field in self.offered.get((kind, argument),
+                                                          {})
+                      if field not in consumed)
+
+    def report(self):
+        """Return a human-readable summary of the consumed fields"""
+        lines = []
+        for key in sorted(self.offered):
+            consumed = self.consumed.get(key, {})
+            lines.append("{0}.{1}: consumed [{2}], unused [{3}]".format(
+                key[0], key[1],
+                ", ".join("{0} x{1}".format(field, consumed[field])
+                          for field in sorted(consumed)),
+                ", ".join(self.unused(*key))))
+        return "\n".join(lines)
+
+
+class LazyStyle(Mapping):
+    """A read-only style mapping whose values are computed on first access
+
+    Parameters
+    ----------
+    obj : object
+        The object (usually a matplotlib artist) the style describes.
+    fields : dictionary
+        A mapping of style keys to functions of ``obj`` computing the value.
+    log : AccessLog (optional)
+        If given, each access of a key is recorded in the log.
+    kind, argument : strings (optional)
+        The names under which accesses are recorded.
+
+    Use ``dict(style)`` to obtain a plain (e.g. JSON-serializable) copy.
+    """
+    def __init__(self, obj, fields, log=None, kind=None, argument='style'):
+        self._obj = obj
+        self._fields = fields
+        self._values = {}
+        self._log = log
+        self._kind = kind
+        self._argument = argument
+        if log is not None:
+            log.offer(kind, argument, fields)
+
+    def peek(self, key):
+        """Return the value for key without recording an access"""
+        try:
+            return self._values[key]
+        except KeyError:
+            value = self._values[key] = self._fields[key](self._obj)
+            return value
+
+    def compute(self):
+        """Compute all fields, without recording any access"""
+        for key in self._fields:
+            self.peek(key)
+
+    def copy(self):
+        """Return a plain dictionary of all fields"""
+        return dict((key, self[key]) for key in self._fields)
+
+    def __getitem__(self, key):
+        if self._log is not None:
+            self._log.record(self._kind, self._argument, key)
+        return self.peek(key)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        return "LazyStyle({0})".format(sorted(self._fields))
+
+
+class LazyArray(object):
+    """An array-like object whose values are computed on first access
+
+    Parameters
+    ----------
+    deferred : Deferred object
+        The deferred computation producing the array.
+    shape : tuple (optional)
+        The shape of the array, if it is known without computing the values.
+        Accessing ``shape`` or ``len()`` then does not trigger the
+        computation.
+    log : AccessLog (optional)
+        If given, the access of the shape and the values are recorded.
+    kind, argument : strings (optional)
+        The names under which accesses are recorded.
+
+    Any array attribute or operation not defined here is forwarded to the
+    computed array; ``np.asarray(data)`` returns it directly.
+    """
+    __slots__ = ('_deferred', '_shape', '_log', '_kind', '_argument')
+
+    def __init__(self, deferred, shape=None, log=None, kind=None,
+                 argument='data'):
+        self._deferred = deferred
+        self._shape = shape
+        self._log = log
+        self._kind = kind
+        self._argument = argument
+        if log is not None:
+            log.offer(kind, argument, ['shape', 'values'])
+
+    def _record(self, field):
+        if self._log is not None:
+            self._log.record(self._kind, self._argument, field)
+
+    @property
+    def done(self):
+        return self._deferred.done
+
+    def compute(self):
+        """Compute the array, without recording an access"""
+        self._deferred.get()
+
+    @property
+    def values(self):
+        """The computed array"""
+        self._record('values')
+        return self._deferred.get()
+
+    @property
+    def known_shape(self):
+        """The shape if it is known without computation, otherwise None"""
+        if self._shape is None and self.done:
+            self._shape = np.shape(self._deferred.get())
+        return self._shape
+
+    @property
+    def shape(self):
+        self._record('shape')
+        if self._shape is None:
+            self._shape = np.shape(self._deferred.get())
+        return self._shape
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.values, dtype=dtype)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.values, attr)
+
+    def __repr__(self):
+        if self.done:
+            return "LazyArray({0!r})".format(self._deferred.get())
+        else:
+            return "LazyArray(<not computed>, shape={0})".format(self._shape)
@@ -0,0 +1,140 @@
+"""
+Path Cache
+==========
+This submodule contains the cache of processed paths used by the Exporter
+for collections.  Converting a matplotlib path to SVG vertices and codes
+(see utils.SVG_path) walks its segments in Python, which dominates the
+export of collections with many or large paths; yet scatter plots repeat
+one marker path, and contour plots are rebuilt identically from one
+refresh to the next.
+
+Paths are identified by a hash of their vertices and codes, so that equal
+paths share one entry whichever objects hold them.  Read-only paths (such
+as the unit paths of matplotlib), which cannot change, are also remembered
+by identity, so that they are not even hashed again.  The cache is bounded
+by the total number of vertices it holds, evicting the least recently used
+entries.  Each Exporter has its own cache by default; one may be shared by
+several exporters by passing it as their ``path_cache``.
+"""
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from . import utils
+
+
+def path_digest(path):
+    """Return a hash of the vertices and codes of a matplotlib path"""
+    vertices = np.ascontiguousarray(path.vertices, dtype=float)
+    digest = hashlib.sha1(str(vertices.shape).encode('ascii'))
+    digest.update(vertices.tobytes())
+    if path.codes is not None:
+        digest.update(np.ascontiguousarray(path.codes, np.uint8).tobytes())
+    return digest.digest()
+
+
+class PathCache(object):
+    """A bounded cache of the SVG vertices and codes of matplotlib paths
+
+    Parameters
+    ----------
+    max_vertices : int
+        The maximum total number of vertices held (default 2 ** 20).
+        Paths with more vertices are not cached.
+
+    Attributes
+    ----------
+    hits, misses, evictions : int
+        The number of lookups answered from the cache, of paths converted,
+        and of entries evicted.
+
+    The cache may be shared by exporters running in several threads.
+    Cached vertices are read-only.
+    """
+    def __init__(self, max_vertices=2 ** 20):
+        self.max_vertices = max_vertices
+        self.vertices = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._digests = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._digests = weakref.WeakKeyDictionary()
+            self.vertices = 0
+
+    def _digest(self, path):
+        if not getattr(path, 'readonly', False):
+            return path_digest(path)
+        with self._lock:
+            digest = self._digests.get(path)
+        if digest is None:
+            digest = path_digest(path)
+            with self._lock:
+                self._digests[path] = digest
+        return digest
+
+    def get(self, path, stats=None):
+        """Return the SVG vertices and codes of a path
+
+        The result is that of ``utils.SVG_path(path)``; the caller must
+        not modify it.  If stats is given, its 'hits' or 'misses' entry is
+        incremented.
+        """
+        digest = self._digest(path)
+        with self._lock:
+            entry = self._entries.pop(digest, None)
+            if entry is not None:
+                # move to the most recently used end
+                self._entries[digest] = entry
+                self.hits += 1
+                if stats is not None:
+                    stats['hits'] += 1
+                return entry
+
+        vertices, codes = utils.SVG_path(path)
+        vertices.flags.writeable = False
+        entry = (vertices, codes)
+        with self._lock:
+            self.misses += 1
+            if stats is not None:
+                stats['misses'] += 1
+            if len(vertices) > self.max_vertices or digest in self._entries:
+                return entry
+            self._entries[digest] = entry
+            self.vertices += len(vertices)
+            while self.vertices > self.max_vertices:
+                old_vertices, old_codes = self._entries.popitem(last=False)[1]
+                self.vertices -= len(old_vertices)
+                self.evictions += 1
+        return entry
+
+    def process(self, paths, stats=None):
+        """Return the SVG vertices and codes of each of a sequence of paths
+
+        Repeated path objects are looked up once.  If stats is given, its
+        'paths' entry counts the paths, and 'unique' the distinct objects.
+        """
+        results = {}
+        processed = []
+        for path in paths:
+            key = id(path)
+            if key not in results:
+                results[key] = self.get(path, stats)
+            processed.append(results[key])
+        if stats is not None:
+            with self._lock:
+                stats['paths'] += len(processed)
+                stats['unique'] += len(results)
+        return processed
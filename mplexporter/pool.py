@@ -0,0 +1,106 @@
+"""
+Renderer Pool
+=============
+This submodule contains a thread-safe pool of renderers, used to export
+figures concurrently from several threads without creating a renderer for
+each export.
+"""
+import threading
+from contextlib import contextmanager
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from .exporter import Exporter
+
+
+class RendererPool(object):
+    """A thread-safe pool of renderers
+
+    Parameters
+    ----------
+    factory : callable
+        Called without arguments to create a new renderer, e.g. a Renderer
+        subclass.  Renderers are reused by later exports, and so must reset
+        their output in open_figure (as the bundled renderers do).
+    size : int (optional)
+        The maximum number of renderers in use at once.  If given, threads
+        wait for a renderer to be released; otherwise new renderers are
+        created as needed.
+
+    Examples
+    --------
+    >>> pool = RendererPool(VegaRenderer, size=4)
+    >>> marks = pool.export(fig, lambda renderer: renderer.marks)
+    """
+    def __init__(self, factory, size=None):
+        self.factory = factory
+        self.size = size
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        if size is None:
+            self._slots = None
+        else:
+            self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a renderer from the pool, creating it if none is idle"""
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            renderer = self.factory()
+        except Exception:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+        with self._lock:
+            self.created += 1
+        return renderer
+
+    def release(self, renderer):
+        """Return a renderer to the pool"""
+        self._idle.put(renderer)
+        if self._slots is not None:
+            self._slots.release()
+
+    @contextmanager
+    def renderer(self):
+        """Context manager holding a renderer of the pool"""
+        renderer = self.acquire()
+        try:
+            yield renderer
+        finally:
+            self.release(renderer)
+
+    def export(self, fig, output=None, **kwargs):
+        """Export a figure with a renderer of the pool
+
+        Parameters
+        ----------
+        fig : matplotlib.Figure instance
+            The figure to export.
+        output : callable (optional)
+            Called with the renderer once the figure has been exported,
+            before the renderer is returned to the pool, to extract the
+            output of the export.
+        **kwargs :
+            Passed to the Exporter.  close_mpl defaults to False here, so
+            that concurrent exports do not use pyplot.
+
+        Returns
+        -------
+        result : object
+            The result of output(renderer), or None.
+        """
+        kwargs.setdefault('close_mpl', False)
+        with self.renderer() as renderer:
+            Exporter(renderer, **kwargs).run(fig)
+            if output is not None:
+                return output(renderer)
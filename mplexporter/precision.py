@@ -0,0 +1,177 @@
+"""
+Output Precision
+================
+This submodule contains the precision policy used by the Exporter to reduce
+the numerical precision of exported data to what can actually be displayed.
+"""
+import json
+
+import numpy as np
+
+
+def shortest_float64(values):
+    """Return float32 values as the float64 values of their shortest
+    decimal representation
+
+    A float32 value converted to float64 is written with up to 17 digits
+    (e.g. 0.12 as 0.11999999731779099); this gives it the digits of the
+    shortest decimal which rounds to the same float32 value (0.12) instead.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    wide = values.astype(float)
+    result = wide.copy()
+    finite = np.isfinite(wide) & (wide != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponent = np.floor(np.log10(np.abs(np.where(finite, wide, 1))))
+    todo = finite
+    # float32 values are resolved by at most 9 significant digits
+    for digits in range(1, 10):
+        if not todo.any():
+            break
+        decimals = digits - 1 - exponent[todo]
+        scale = 10. ** np.abs(decimals)
+        rounded = np.where(decimals >= 0,
+                           np.round(wide[todo] * scale) / scale,
+                           np.round(wide[todo] / scale) * scale)
+        exact = rounded.astype(np.float32) == values[todo]
+        indices = np.flatnonzero(todo)[exact]
+        result[indices] = rounded[exact]
+        todo[indices] = False
+    return result
+
+
+def to_list(values):
+    """Return an array of values as a list of python numbers, for JSON
+
+    float32 values are converted by shortest_float64, so that their JSON
+    text is not longer than their float32 representation.
+    """
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        values = shortest_float64(values)
+    return values.tolist()
+
+
+class PrecisionPolicy(object):
+    """Output precision policy for exported data
+
+    Parameters
+    ----------
+    pixel_fraction : float or None
+        Data are rounded to the number of decimals which resolves this
+        fraction of a display pixel (default 0.1).  For data coordinates
+        the size of a pixel is derived from the axes limits and size; for
+        figure and point coordinates the data are already in pixels.
+        Columns on non-linear axis scales are not rounded.  If None, no
+        rounding is done.
+    dtype : numpy dtype or None
+        If given (e.g. ``np.float32``), data are downcast to this type.
+        This halves the size of binary output.  Renderers writing JSON
+        convert the values with :func:`to_list`, so that each is written
+        with the shortest decimal representation of its float32 value.
+    measure : bool
+        If True, also measure the size of the JSON text representation of
+        the data before and after the policy is applied.  This is costly,
+        and is intended for evaluating a policy.
+
+    The Exporter records, per figure, the number of values processed and
+    the bytes saved in ``Exporter.stats['precision']``.
+    """
+    def __init__(self, pixel_fraction=0.1, dtype=None, measure=False):
+        self.pixel_fraction = pixel_fraction
+        self.dtype = dtype
+        self.measure = measure
+
+    @staticmethod
+    def new_stats():
+        return {'values': 0,
+                'binary_bytes_before': 0, 'binary_bytes_after': 0,
+                'text_bytes_before': 0, 'text_bytes_after': 0}
+
+    def decimals(self, ax, coordinates):
+        """Return the number of decimals to keep for the x and y columns
+
+        The result is a pair, in which None indicates that the column
+        should not be rounded.
+        """
+        if self.pixel_fraction is None:
+            return None, None
+        if coordinates != 'data':
+            return (self._tolerance_decimals(self.pixel_fraction),) * 2
+        if ax is None:
+            return None, None
+
+        decimals = []
+        for lim, scale, npixels in [(ax.get_xlim(), ax.get_xscale(),
+                                     ax.bbox.width),
+                                    (ax.get_ylim(), ax.get_yscale(),
+                                     ax.bbox.height)]:
+            if scale != 'linear' or npixels <= 0:
+                decimals.append(None)
+            else:
+                tolerance = self.pixel_fraction * abs(lim[1] - lim[0])
+                decimals.append(self._tolerance_decimals(tolerance / npixels))
+        return tuple(decimals)
+
+    @staticmethod
+    def _tolerance_decimals(tolerance):
+        if not tolerance > 0 or not np.isfinite(tolerance):
+            return None
+        return int(np.ceil(-np.log10(tolerance)))
+
+    def apply(self, data, ax, coordinates, stats=None, copy=True,
+              decimals=None):
+        """Apply the policy to a shape (N, 2) array of data
+
+        Parameters
+        ----------
+        data : ndarray
+            The data, as produced by Exporter.process_transform.
+        ax : matplotlib Axes object
+            The axes the data is associated with.
+        coordinates : string
+            The coordinate code of the data: 'data', 'figure' or 'points'.
+        stats : dictionary (optional)
+            If given, a dictionary created by new_stats(), which is updated
+            with the measured savings.
+        copy : bool (optional)
+            If False, the data are rounded in place.
+        decimals : tuple (optional)
+            The result of ``decimals(ax, coordinates)``, if already
+            computed; ax is then not used.
+
+        Returns
+        -------
+        data : ndarray
+        """
+        data = np.asarray(data)
+        if data.ndim != 2 or data.shape[1] != 2 or data.dtype.kind != 'f':
+            return data
+
+        if stats is not None:
+            stats['values'] += data.size
+            stats['binary_bytes_before'] += data.nbytes
+            if self.measure:
+                stats['text_bytes_before'] += self._text_size(data)
+
+        if decimals is None:
+            decimals = self.decimals(ax, coordinates)
+        for column, column_decimals in enumerate(decimals):
+            if column_decimals is not None:
+                if copy:
+                    data = data.copy()
+                    copy = False
+                np.around(data[:, column], column_decimals,
+                          out=data[:, column])
+        if self.dtype is not None:
+            data = data.astype(self.dtype)
+
+        if stats is not None:
+            stats['binary_bytes_after'] += data.nbytes
+            if self.measure:
+                stats['text_bytes_after'] += self._text_size(data)
+        return data
+
+    @staticmethod
+    def _text_size(data):
+        return len(json.dumps(np.asarray(data, dtype=float).tolist()))
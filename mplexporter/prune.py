@@ -0,0 +1,142 @@
+"""
+Artist Pruning
+==============
+This submodule contains the pruning policy used by the Exporter to skip
+artists which draw nothing: invisible artists and axes, artists without
+data, and fully transparent artists.  The checks only look at artist
+properties and data lengths, so that they cost far less than exporting
+the artists they prune.
+"""
+import numpy as np
+from matplotlib.colors import colorConverter
+from matplotlib.collections import PathCollection
+
+NO_LINESTYLES = ('None', 'none', ' ', '', None)
+NO_MARKERS = ('None', 'none', ' ', '', None)
+
+
+def _transparent_colors(colors):
+    """Return True if all the given colors are fully transparent"""
+    if colors is None:
+        return True
+    if np.ndim(colors) <= 1:
+        # a color name or a single RGB(A) sequence
+        return colorConverter.to_rgba(colors)[3] == 0
+    colors = np.asarray(colors)
+    return len(colors) == 0 or not np.any(colors[:, 3])
+
+
+def _no_edges(edgecolors, linewidths):
+    return (_transparent_colors(edgecolors) or
+            not np.any(np.asarray(linewidths) > 0))
+
+
+def is_transparent(artist, kind):
+    """Return True if the artist is drawn fully transparent
+
+    The alpha of an artist overrides that of its colors.
+    """
+    alpha = artist.get_alpha()
+    if alpha is not None:
+        return alpha == 0
+    if kind == 'line':
+        if artist.get_linestyle() not in NO_LINESTYLES and \
+                not _transparent_colors(artist.get_color()):
+            return False
+        if artist.get_marker() in NO_MARKERS:
+            return True
+        return (_transparent_colors(artist.get_markerfacecolor()) and
+                (artist.get_markeredgewidth() == 0 or
+                 _transparent_colors(artist.get_markeredgecolor())))
+    elif kind == 'text':
+        return (artist.get_bbox_patch() is None and
+                _transparent_colors(artist.get_color()))
+    elif kind == 'patch':
+        return (not artist.get_hatch() and
+                (not artist.get_fill() or
+                 _transparent_colors(artist.get_facecolor())) and
+                _no_edges(artist.get_edgecolor(),
+                          artist.get_linewidth()))
+    elif kind == 'collection':
+        facecolors = artist.get_facecolors()
+        edgecolors = artist.get_edgecolors()
+        if np.ndim(edgecolors) == 0 and edgecolors == 'face':
+            edgecolors = facecolors
+        return (not artist.get_hatch() and
+                _transparent_colors(facecolors) and
+                _no_edges(edgecolors, artist.get_linewidths()))
+    return False
+
+
+def is_empty(artist, kind):
+    """Return True if the artist has no data to draw"""
+    if kind == 'line':
+        return len(artist.get_xydata()) == 0
+    elif kind == 'text':
+        return not artist.get_text()
+    elif kind == 'patch':
+        return len(artist.get_path().vertices) == 0
+    elif kind == 'collection':
+        # e.g. a scatter plot of no points
+        return (len(artist.get_paths()) == 0 or
+                (isinstance(artist, PathCollection) and
+                 len(artist.get_offsets()) == 0))
+    elif kind == 'image':
+        array = artist.get_array()
+        return array is None or np.size(array) == 0
+    return False
+
+
+class PrunePolicy(object):
+    """Pruning policy for the artists of exported figures
+
+    Parameters
+    ----------
+    invisible : bool
+        If True (default), skip artists and axes which are not visible
+        (see ``Artist.set_visible``).
+    empty : bool
+        If True (default), skip lines, patches, collections and images
+        without data, and empty texts.
+    transparent : bool
+        If True (default), skip artists whose alpha is zero, or whose
+        lines, markers, faces and edges are all fully transparent (or
+        'none').
+
+    The Exporter records, per figure, the number of axes and artists
+    skipped for each reason in ``Exporter.stats['prune']``.
+    """
+    def __init__(self, invisible=True, empty=True, transparent=True):
+        self.invisible = invisible
+        self.empty = empty
+        self.transparent = transparent
+
+    @staticmethod
+    def new_stats():
+        return {'axes': 0, 'artists': 0,
+                'invisible': 0, 'empty': 0, 'transparent': 0}
+
+    def reason(self, artist, kind):
+        """Return why the artist should be skipped, or None
+
+        Parameters
+        ----------
+        artist : matplotlib Artist or Axes
+        kind : string
+            One of 'axes', 'line', 'text', 'patch', 'collection' or
+            'image'.
+
+        Returns
+        -------
+        reason : string or None
+            'invisible', 'empty' or 'transparent'.
+        """
+        if self.invisible and not artist.get_visible():
+            return 'invisible'
+        if kind == 'axes':
+            return None
+        if self.empty and is_empty(artist, kind):
+            return 'empty'
+        if self.transparent and is_transparent(artist, kind):
+            return 'transparent'
+        return None
@@ -0,0 +1,212 @@
+"""
+Recorded Exports
+================
+This submodule stores the result of crawling a figure (figure and axes
+properties, styles, paths, data and offset arrays, images) in a compact
+binary file, which can be replayed into any renderer later, without
+matplotlib::
+
+    record(fig, 'figure.mplx')                  # where matplotlib is used
+    replay(load('figure.mplx'), VegaRenderer())  # anywhere
+
+The file starts with an 8-byte magic string, a 4-byte version and the
+8-byte length of a JSON header, all little-endian.  The header describes
+the events, in which each array is replaced by a reference to its entry in
+the header's array table.  The arrays follow the header, each aligned on
+64 bytes of the file, so that they can be memory-mapped on reload.  Images
+are stored as raw PNG bytes rather than base64 text.
+"""
+import json
+import struct
+import base64
+
+import numpy as np
+
+from .events import Event, replay
+
+# replay is available from this module too, as in the example above
+__all__ = ['save', 'record', 'load', 'replay']
+
+MAGIC = b'MPLXPORT'
+VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sIQ')
+
+# event fields holding base64-encoded data, stored as raw bytes
+BASE64_FIELDS = ('imdata',)
+
+
+class _Encoder(object):
+    """Replace the arrays of event fields by references to an array table"""
+    def __init__(self):
+        self.arrays = []
+        self.table = []
+        self.nbytes = 0
+
+    def add(self, array):
+        array = np.ascontiguousarray(array)
+        offset = -self.nbytes % ALIGNMENT + self.nbytes
+        self.arrays.append((offset, array))
+        self.table.append({'offset': offset, 'shape': list(array.shape),
+                           'dtype': array.dtype.str})
+        self.nbytes = offset + array.nbytes
+        return len(self.table) - 1
+
+    def encode(self, value):
+        if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            return {'__array__': self.add(value)}
+        elif isinstance(value, np.ndarray):
+            return self.encode(value.tolist())
+        elif isinstance(value, np.generic):
+            return value.item()
+        elif isinstance(value, tuple):
+            return {'__tuple__': [self.encode(item) for item in value]}
+        elif isinstance(value, list):
+            return [self.encode(item) for item in value]
+        elif isinstance(value, dict):
+            return dict((key, self.encode(item))
+                        for key, item in value.items())
+        return value
+
+    def encode_event(self, event):
+        fields = {}
+        for key, value in event.fields().items():
+            if key in BASE64_FIELDS and value is not None:
+                data = np.frombuffer(base64.b64decode(value), np.uint8)
+                fields[key] = {'__base64__': self.add(data)}
+            else:
+                fields[key] = self.encode(value)
+        return {'kind': event.kind, 'fields': fields}
+
+
+def save(events, file):
+    """Save a stream of events to a binary file
+
+    Parameters
+    ----------
+    events : iterable
+        Events, such as those of :meth:`Exporter.iter_events`.  They are
+        detached (see :meth:`Event.detached`) before being stored.
+    file : string or file object
+        The path of the file, or a binary file object.
+    """
+    if not hasattr(file, 'write'):
+        with open(file, 'wb') as f:
+            return save(events, f)
+
+    encoder = _Encoder()
+    header = {'events': [encoder.encode_event(event.detached())
+                         for event in events]}
+    header['arrays'] = encoder.table
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+    start = _PREAMBLE.size + len(header)
+    padding = -start % ALIGNMENT
+    file.write(_PREAMBLE.pack(MAGIC, VERSION, len(header) + padding))
+    file.write(header + b' ' * padding)
+    position = 0
+    for offset, array in encoder.arrays:
+        file.write(b'\0' * (offset - position))
+        file.write(array.tobytes())
+        position = offset + array.nbytes
+
+
+def record(fig, file, **kwargs):
+    """Export a figure and save its events to a binary file
+
+    Keyword arguments are passed to the Exporter; close_mpl defaults to
+    False.
+    """
+    from .exporter import Exporter
+    kwargs.setdefault('close_mpl', False)
+    save(Exporter(None, **kwargs).iter_events(fig), file)
+
+
+def _decode(value, arrays):
+    if isinstance(value, list):
+        return [_decode(item, arrays) for item in value]
+    elif isinstance(value, dict):
+        if '__array__' in value:
+            return arrays(value['__array__'])
+        elif '__tuple__' in value:
+            return tuple(_decode(item, arrays) for item in value['__tuple__'])
+        elif '__base64__' in value:
+            data = arrays(value['__base64__']).tobytes()
+            return base64.b64encode(data).decode('ascii')
+        return dict((key, _decode(item, arrays))
+                    for key, item in value.items())
+    return value
+
+
+def load(file, mmap=True):
+    """Load the events saved in a binary file
+
+    Parameters
+    ----------
+    file : string or file object
+        The path of the file, or a binary file object.
+    mmap : bool
+        If True (default) and file is a path, the arrays are read-only
+        views of a memory map of the file, and are only read from disk as
+        they are used.  Otherwise they are read into memory.
+
+    Returns
+    -------
+    events : list of Event objects
+        Detached events, which may be passed to
+        :func:`mplexporter.events.replay`.
+    """
+    if not hasattr(file, 'read'):
+        if mmap:
+            with open(file, 'rb') as f:
+                header, data_offset = _read_header(f)
+            if header['arrays']:
+                data = np.memmap(file, np.uint8, 'r', offset=data_offset)
+            else:
+                data = np.zeros(0, np.uint8)
+            return _events(header, data)
+        with open(file, 'rb') as f:
+            return load(f)
+
+    header, data_offset = _read_header(file)
+    return _events(header, _read_aligned(file))
+
+
+def _read_header(file):
+    magic, version, length = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+    if magic != MAGIC:
+        raise ValueError("not a recorded mplexporter export")
+    if version > VERSION:
+        raise ValueError("unsupported recording version {0}".format(version))
+    header = json.loads(file.read(length).decode('utf-8'))
+    return header, _PREAMBLE.size + length
+
+
+def _read_aligned(file):
+    """Read the rest of file into an array aligned on ALIGNMENT bytes"""
+    start = file.tell()
+    file.seek(0, 2)
+    size = file.tell() - start
+    file.seek(start)
+    buffer = np.empty(size + ALIGNMENT, np.uint8)
+    skip = -buffer.ctypes.data % ALIGNMENT
+    data = buffer[skip:skip + size]
+    file.readinto(data)
+    return data
+
+
+def _events(header, data):
+    table = header['arrays']
+
+    def arrays(index):
+        entry = table[index]
+        dtype = np.dtype(str(entry['dtype']))
+        shape = tuple(entry['shape'])
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        offset = entry['offset']
+        return data[offset:offset + nbytes].view(dtype).reshape(shape)
+
+    return [Event(event['kind'], None, **_decode(event['fields'], arrays))
+            for event in header['events']]
+
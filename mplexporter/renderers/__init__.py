@@ -4,10 +4,139 @@ Matplotlib Renderers
 This submodule contains renderer objects which define renderer behavior used
 within the Exporter class.  The base renderer class is :class:`Renderer`, an
 abstract base class
+
+The bundled renderers are imported lazily, on first access, so that
+importing this module does not import optional dependencies such as plotly.
+Renderers may be looked up by name with :func:`get_renderer`; third-party
+packages can register their own renderers under the ``mplexporter.renderers``
+entry point group, e.g. in their setup.py::
+
+    entry_points={'mplexporter.renderers': ['myformat = mypkg:MyRenderer']}
 """
+import sys
+import types
+import importlib
 
 from .base import Renderer
-from .vega_renderer import VegaRenderer, fig_to_vega
-from .vincent_renderer import VincentRenderer, fig_to_vincent
-from .example_renderer import ExampleRenderer
-from .plotly import PlotlyRenderer, fig_to_plotly
+
+
+ENTRY_POINT_GROUP = 'mplexporter.renderers'
+
+# renderer name -> (module, class name) of the bundled renderers
+RENDERERS = {'example': ('.example_renderer', 'ExampleRenderer'),
+             'vega': ('.vega_renderer', 'VegaRenderer'),
+             'vincent': ('.vincent_renderer', 'VincentRenderer'),
+             'plotly': ('.plotly', 'PlotlyRenderer')}
+
+# public attribute -> module of the lazily imported names
+_LAZY_ATTRIBUTES = {'ExampleRenderer': '.example_renderer',
+                    'VegaRenderer': '.vega_renderer',
+                    'fig_to_vega': '.vega_renderer',
+                    'VegaBundle': '.vega_renderer',
+                    'figs_to_vega_bundle': '.vega_renderer',
+                    'VincentRenderer': '.vincent_renderer',
+                    'fig_to_vincent': '.vincent_renderer',
+                    'PlotlyRenderer': '.plotly',
+                    'PlotlyHTML': '.plotly',
+                    'PlotlyPublisher': '.plotly',
+                    'fig_to_plotly': '.plotly',
+                    'figs_to_plotly': '.plotly'}
+
+__all__ = ['Renderer', 'get_renderer', 'available_renderers'] + sorted(
+    _LAZY_ATTRIBUTES)
+
+_registry = {}
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError("module {0!r} has no attribute {1!r}"
+                             "".format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+def _iter_entry_points():
+    """Iterate over the renderer entry points of installed packages"""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        try:
+            import pkg_resources
+        except ImportError:
+            return
+        for entry_point in pkg_resources.iter_entry_points(ENTRY_POINT_GROUP):
+            yield entry_point
+        return
+
+    entry_points = entry_points()
+    if hasattr(entry_points, 'select'):
+        group = entry_points.select(group=ENTRY_POINT_GROUP)
+    else:
+        group = entry_points.get(ENTRY_POINT_GROUP, [])
+    for entry_point in group:
+        yield entry_point
+
+
+def register_renderer(name, renderer):
+    """Register a renderer class under the given name"""
+    _registry[name] = renderer
+
+
+def available_renderers():
+    """Return the sorted names of the bundled and registered renderers
+
+    This does not import any renderer.
+    """
+    names = set(RENDERERS) | set(_registry)
+    names.update(entry_point.name for entry_point in _iter_entry_points())
+    return sorted(names)
+
+
+def get_renderer(name):
+    """Return the renderer class registered under the given name
+
+    The name is looked up among the renderers registered with
+    register_renderer(), the bundled renderers, and finally the entry points
+    of installed packages.  Only the module of the requested renderer is
+    imported.
+    """
+    if name not in _registry:
+        if name in RENDERERS:
+            module, class_name = RENDERERS[name]
+            module = importlib.import_module(module, __name__)
+            _registry[name] = getattr(module, class_name)
+        else:
+            for entry_point in _iter_entry_points():
+                if entry_point.name == name:
+                    _registry[name] = entry_point.load()
+                    break
+            else:
+                raise ValueError("unknown renderer {0!r}: available renderers "
+                                 "are {1}".format(name,
+                                                  available_renderers()))
+    return _registry[name]
+
+
+if sys.version_info < (3, 7):
+    # module-level __getattr__ (PEP 562) is not supported: emulate it with a
+    # module subclass which shares this module's namespace.
+    class _LazyModule(types.ModuleType):
+        def __getattr__(self, name):
+            return __getattr__(name)
+
+        def __dir__(self):
+            return __dir__()
+
+    _module = _LazyModule(__name__, __doc__)
+    _module.__dict__.update(globals())
+    # keep the original module alive, since its globals are used above
+    _module._original_module = sys.modules[__name__]
+    sys.modules[__name__] = _module
@@ -1,14 +1,79 @@
 import warnings
 import itertools
+import threading
 from contextlib import contextmanager
 
 import numpy as np
-from matplotlib import transforms
 
-from .. import utils
+from ..columns import ColumnStore
+from ..styles import Style, StyleTable, freeze
+
+
+def _color_to_hex(color):
+    """Convert a color to a hex code, as utils.color_to_hex does
+
+    RGB(A) sequences, such as the colors of collections, are converted
+    without importing matplotlib.
+    """
+    if not isinstance(color, np.ndarray) and color in ['none', 'None', None]:
+        return 'none'
+    try:
+        rgb = np.asarray(color, dtype=float)
+    except (TypeError, ValueError):
+        rgb = None
+    if rgb is None or rgb.shape not in [(3,), (4,)]:
+        from .. import utils
+        return utils.color_to_hex(color)
+    return '#{0:02X}{1:02X}{2:02X}'.format(*(int(255 * c) for c in rgb[:3]))
+
+
+class ExportContext(object):
+    """The state of the figure and axes being rendered
+
+    Each thread rendering with a Renderer has its own context, so that a
+    renderer's figure and axes state is not shared between concurrent
+    exports.
+    """
+    __slots__ = ('fig', 'fig_properties', 'ax', 'ax_properties',
+                 'column_store', 'style_table')
+
+    def __init__(self):
+        self.fig = None
+        self.fig_properties = {}
+        self.ax = None
+        self.ax_properties = {}
+        self.column_store = None
+        self.style_table = None
+
+
+def _context_property(name):
+    def fget(self):
+        return getattr(self.context, name)
+
+    def fset(self, value):
+        setattr(self.context, name, value)
+    return property(fget, fset)
 
 
 class Renderer(object):
+    @property
+    def context(self):
+        """The ExportContext of the export running in the current thread"""
+        local = self.__dict__.get('_local')
+        if local is None:
+            local = self.__dict__.setdefault('_local', threading.local())
+        context = getattr(local, 'context', None)
+        if context is None:
+            context = local.context = ExportContext()
+        return context
+
+    _current_fig = _context_property('fig')
+    _fig_properties = _context_property('fig_properties')
+    _current_ax = _context_property('ax')
+    _ax_properties = _context_property('ax_properties')
+    column_store = _context_property('column_store')
+    style_table = _context_property('style_table')
+
     @staticmethod
     def ax_zoomable(ax):
         return bool(ax and ax.get_navigate())
@@ -34,20 +99,63 @@ class Renderer(object):
         return self.ax_has_ygrid(self._current_ax)
 
     @contextmanager
-    def draw_figure(self, fig, properties):
-        if hasattr(self, "_current_fig") and self._current_fig is not None:
+    def draw_figure(self, fig, properties, column_store=None,
+                    style_table=None):
+        if self._current_fig is not None:
             warnings.warn("figure embedded in figure: something is wrong")
         self._current_fig = fig
         self._fig_properties = properties
+        if column_store is None:
+            column_store = ColumnStore()
+        self.column_store = column_store
+        if style_table is None:
+            style_table = StyleTable()
+        self.style_table = style_table
         self.open_figure(fig, properties)
         yield
         self.close_figure(fig)
         self._current_fig = None
         self._fig_properties = {}
+        self.column_store = None
+        self.style_table = None
+
+    def column_key(self, column):
+        """
+        Return the key identifying a data column within the current figure.
+
+        Columns with identical content (e.g. the x values of many lines
+        plotted against the same array) share the same key, so that
+        renderers can emit each distinct column only once and refer to it
+        by key.  See mplexporter.columns.ColumnStore.
+
+        Parameters
+        ----------
+        column : array_like
+            A one-dimensional array, e.g. ``data[:, 0]``.
+
+        Returns
+        -------
+        key : string
+        """
+        if self.column_store is None:
+            self.column_store = ColumnStore()
+        return self.column_store.key(column)
+
+    def intern_style(self, style):
+        """
+        Return the interned Style record for a style dictionary.
+
+        Within a figure, styles with identical items are represented by the
+        same immutable record, whose ``id`` attribute can be used to emit a
+        shared style definition once.  See mplexporter.styles.StyleTable.
+        """
+        if self.style_table is None:
+            self.style_table = StyleTable()
+        return self.style_table.intern(style)
 
     @contextmanager
     def draw_axes(self, ax, properties):
-        if hasattr(self, "_current_ax") and self._current_ax is not None:
+        if self._current_ax is not None:
             warnings.warn("axes embedded in axes: something is wrong")
         self._current_ax = ax
         self._ax_properties = properties
@@ -139,7 +247,7 @@ class Renderer(object):
         """Build an iterator over the elements of the path collection"""
         N = max(len(paths), len(offsets))
 
-        if not path_transforms:
+        if len(path_transforms) == 0:
             path_transforms = [np.eye(3)]
 
         edgecolor = styles['edgecolor']
@@ -201,21 +309,37 @@ class Renderer(object):
         if offset_order == "before":
             raise NotImplementedError("offset before transform")
 
+        # elements share a handful of distinct styles: build each only
+        # once, and intern them only if the exporter interned the styles
+        intern = isinstance(styles, Style)
+        element_styles = {}
         for tup in self._iter_path_collection(paths, path_transforms,
                                               offsets, styles):
             (path, path_transform, offset, ec, lw, fc) = tup
             vertices, pathcodes = path
-            path_transform = transforms.Affine2D(path_transform)
-            vertices = path_transform.transform(vertices)
+            # the affine path transform, applied with numpy so that
+            # recorded exports replay without matplotlib
+            path_transform = np.asarray(path_transform, dtype=float)
+            vertices = (np.dot(vertices, path_transform[:2, :2].T)
+                        + path_transform[:2, 2])
             # This is a hack:
             if path_coordinates == "figure":
                 path_coordinates = "points"
-            style = {"edgecolor": utils.color_to_hex(ec),
-                     "facecolor": utils.color_to_hex(fc),
-                     "edgewidth": lw,
-                     "dasharray": "10,0",
-                     "alpha": styles['alpha'],
-                     "zorder": styles['zorder']}
+            key = (freeze(ec), freeze(fc), lw)
+            style = element_styles.get(key)
+            if style is None:
+                style = {"edgecolor": _color_to_hex(ec),
+                         "facecolor": _color_to_hex(fc),
+                         "edgewidth": lw,
+                         "dasharray": "10,0",
+                         "alpha": styles['alpha'],
+                         "zorder": styles['zorder']}
+                if intern:
+                    style = self.intern_style(style)
+                element_styles[key] = style
+            if not intern:
+                # renderers may modify the dictionaries they are given
+                style = dict(style)
             self.draw_path(vertices, path_coordinates, pathcodes, style,
                            offset, offset_coordinates, mplobj=mplobj)
 
@@ -268,6 +392,34 @@ class Renderer(object):
         """
         raise NotImplementedError()
 
+    def draw_texts(self, texts, positions, coordinates, styles, mplobj=None):
+        """
+        Draw a batch of texts sharing the same coordinates.
+
+        By default, this calls draw_text for each text.  Renderers drawing
+        many texts (e.g. point labels) may override it to emit them at once.
+
+        Parameters
+        ----------
+        texts : list
+            The N strings to draw
+        positions : array_like
+            The (N, 2) array of the positions of the texts
+        coordinates : string
+            A string code, which should be either 'data' for data coordinates,
+            or 'figure' for figure (pixel) coordinates.
+        styles : list
+            The N style dictionaries of the texts.  If the exporter interns
+            styles, these are Style records, shared by texts of the same
+            style (see Renderer.intern_style).
+        mplobj : list of matplotlib objects
+            the matplotlib plot elements which generated these texts, or None
+        """
+        positions = np.asarray(positions)
+        for i, text in enumerate(texts):
+            self.draw_text(text, positions[i], coordinates, styles[i],
+                           mplobj=None if mplobj is None else mplobj[i])
+
     def draw_path(self, data, coordinates, pathcodes, style,
                   offset=None, offset_coordinates="data", mplobj=None):
         """
@@ -324,3 +476,23 @@ class Renderer(object):
             the matplotlib plot object which generated this image
         """
         raise NotImplementedError()
+
+    def draw_spatial_index(self, index, mplobj=None):
+        """
+        Receive the spatial index of the points of the current axes.
+
+        This is only called if the exporter builds spatial indexes, after
+        the other elements of the axes.  By default, it does nothing:
+        renderers may write the index next to their output, e.g. with
+        ``index.to_dict(sidecar)``, for client-side hit tests, as the
+        VegaRenderer does.
+
+        Parameters
+        ----------
+        index : SpatialIndex object
+            The index of the points of the axes, in display coordinates.
+            See mplexporter.spatial.SpatialIndex.
+        mplobj : matplotlib object
+            the matplotlib axes of the index
+        """
+        pass
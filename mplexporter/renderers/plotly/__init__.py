@@ -1 +1,3 @@
-from .plotly_renderer import PlotlyRenderer, fig_to_plotly
\ No newline at end of file
+from .plotly_renderer import (PlotlyRenderer, PlotlyHTML, fig_to_plotly,
+                              figs_to_plotly)
+from .publish import PlotlyPublisher, UploadError
@@ -0,0 +1,162 @@
+"""
+Plotly Stand-in Server
+======================
+A local stand-in for the plotly upload API, for testing and benchmarking
+the publishing of figures (see mplexporter.renderers.plotly.publish)
+without network access::
+
+    with MockPlotlyServer(latency=0.05, failures=2) as server:
+        publisher = PlotlyPublisher('user', 'key', server=server.url)
+        ...
+        server.requests      # the uploads received
+        server.connections   # the distinct client connections used
+
+The server keeps connections alive between requests, answers each upload
+with a unique figure URL, and can delay its answers, fail a number of
+requests, and drop the connection of a number of uploads after storing
+them, to exercise retries.
+"""
+import json
+import time
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # buffer each response, so that its headers and content are sent at
+    # once: separate writes stall keep-alive clients on delayed ACKs
+    wbufsize = -1
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status, result, headers=()):
+        content = json.dumps(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        length = int(self.headers.get('content-length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        form = dict((key, values[0]) for key, values in form.items())
+        self.server.mock.handle(self, form)
+
+
+class MockPlotlyServer(object):
+    """A local server answering like the plotly upload API
+
+    Parameters
+    ----------
+    latency : float
+        The time taken to answer each request, in seconds (default 0).
+    failures : int
+        The number of requests, first received, which are answered with
+        failure_status (default 0).
+    failure_status : int
+        The HTTP status of the failed requests (default 503).
+    drops : int
+        The number of uploads, first received after the failures, which
+        are stored but whose connection is closed without an answer
+        (default 0).
+
+    Attributes
+    ----------
+    url : string
+        The URL of the running server.
+    requests : list
+        The form fields of each successful upload, with its 'args' (the
+        data) and 'kwargs' decoded from JSON.
+    connections : set
+        The client (host, port) of each connection which sent a request.
+    """
+    def __init__(self, latency=0., failures=0, failure_status=503,
+                 drops=0):
+        self.latency = latency
+        self.failures = failures
+        self.failure_status = failure_status
+        self.drops = drops
+        self.requests = []
+        self.connections = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return "http://{0}:{1}".format(host, port)
+
+    def start(self):
+        """Start the server on a free port of the loopback interface"""
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.mock = self
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server and close its socket"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handle(self, handler, form):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.connections.add(handler.client_address)
+            dropped = False
+            if self.failures > 0:
+                self.failures -= 1
+                failed = True
+            else:
+                failed = False
+                if form.get('un') and form.get('key'):
+                    form['args'] = json.loads(form['args'])
+                    form['kwargs'] = json.loads(form['kwargs'])
+                    self.requests.append(form)
+                    if self.drops > 0:
+                        self.drops -= 1
+                        dropped = True
+                number = len(self.requests)
+        if dropped:
+            handler.close_connection = True
+        elif failed:
+            handler._respond(self.failure_status,
+                             {'error': 'service unavailable'},
+                             [('Retry-After', '0')])
+        elif not (form.get('un') and form.get('key')):
+            handler._respond(200, {'error': 'missing credentials',
+                                   'url': ''})
+        else:
+            handler._respond(200, {'url': "{0}/~{1}/{2}".format(
+                self.url, form['un'], number),
+                'message': '', 'warning': '', 'error': '',
+                'filename': form['kwargs'].get('filename', '')})
@@ -3,11 +3,13 @@ Plotly Renderer
 ================
 This is a renderer class to be used with an exporter for rendering plots in Plotly!
 """
-import plotly
+import os
+import json
+import random
 
 from . import plotly_utils
 from .. base import Renderer
-from ... exporter import Exporter
+from ...precision import to_list
 
 
 class PlotlyRenderer(Renderer):
@@ -18,11 +20,13 @@ class PlotlyRenderer(Renderer):
         self.data = []
         self.layout = {}
         self.axis_ct = 0
+        self.columns = {}
 
     def open_figure(self, fig, properties):
         self.output += "opening figure\n"
         self.layout['width'] = int(properties['figwidth']*properties['dpi'])
         self.layout['height'] = int(properties['figheight']*properties['dpi'])
+        self.columns = {}
 
     def close_figure(self, fig):
         self.output += "closing figure\n"
@@ -55,13 +59,25 @@ class PlotlyRenderer(Renderer):
     def close_axes(self, ax):
         self.output += "  closing axis {}\n".format(self.axis_ct)
 
+    def get_column(self, column):
+        """Return the list of values of a data column
+
+        Identical columns share the same list object, so that traces
+        plotted against the same x values reference a single list.
+        """
+        key = self.column_key(column)
+        if key not in self.columns:
+            # python floats, which json can serialize
+            self.columns[key] = to_list(column)
+        return self.columns[key]
+
     def draw_line(self, data, coordinates, style, mplobj=None):
         if coordinates == 'data':
             self.output += "    draw line with {0} points\n".format(data.shape[0])
             trace = {
                 'mode': 'lines',
-                'x': [xy_pair[0] for xy_pair in data],
-                'y': [xy_pair[1] for xy_pair in data],
+                'x': self.get_column(data[:, 0]),
+                'y': self.get_column(data[:, 1]),
                 'xaxis': 'x{}'.format(self.axis_ct),
                 'yaxis': 'y{}'.format(self.axis_ct),
                 'line': {
@@ -80,8 +96,8 @@ class PlotlyRenderer(Renderer):
             self.output += "    draw {0} markers\n".format(data.shape[0])
             trace = {
                 'mode': 'markers',
-                'x': [xy_pair[0] for xy_pair in data],
-                'y': [xy_pair[1] for xy_pair in data],
+                'x': self.get_column(data[:, 0]),
+                'y': self.get_column(data[:, 1]),
                 'xaxis': 'x{}'.format(self.axis_ct),
                 'yaxis': 'y{}'.format(self.axis_ct),
                 'marker': {
@@ -126,14 +142,126 @@ class PlotlyRenderer(Renderer):
             pass
 
 
-def fig_to_plotly(fig, username=None, api_key=None, notebook=False):
+class PlotlyHTML(object):
+    """HTML representation of a figure rendered with plotly.js
+
+    The data columns of the traces are inlined, or, with a sidecar writer
+    (see mplexporter.sidecar.SidecarWriter), written as binary Float64
+    typed-array files which the page fetches in parallel before plotting.
+    Columns shared by several traces are written once.  Fetching the files
+    requires the page to be served over HTTP.
+    """
+    def __init__(self, renderer):
+        self.data = renderer.data
+        self.layout = renderer.layout
+
+    def html(self, sidecar=None, plotly_url=None):
+        if plotly_url is None:
+            plotly_url = PLOTLY_URL
+        number = random.randint(0, 2 ** 16)
+        data = self.data
+        arrays = []
+        if sidecar is not None:
+            references = {}
+            data = []
+            for index, trace in enumerate(self.data):
+                trace = dict(trace)
+                for key in ('x', 'y'):
+                    column = trace.pop(key, None)
+                    if column is None:
+                        continue
+                    if id(column) not in references:
+                        references[id(column)] = sidecar.write_array(column)
+                    arrays.append([index, key, references[id(column)]])
+                data.append(trace)
+        return PLOTLY_TEMPLATE.format(plotly_url=plotly_url, id=number,
+                                      data=json.dumps(data),
+                                      layout=json.dumps(self.layout),
+                                      arrays=json.dumps(arrays))
+
+    def save(self, path, sidecar=True, plotly_url=None):
+        """Save an HTML document, with sidecar files in 'name_files/'"""
+        from ...sidecar import SidecarWriter
+        writer = None
+        if sidecar:
+            writer = SidecarWriter(os.path.splitext(path)[0] + '_files')
+        with open(path, 'w') as f:
+            f.write(PLOTLY_DOCUMENT.format(body=self.html(writer,
+                                                          plotly_url)))
+
+
+PLOTLY_URL = "https://cdn.plot.ly/plotly-latest.min.js"
+
+PLOTLY_TEMPLATE = """<div id="plotly{id}"></div>
+<script src="{plotly_url}"></script>
+<script>
+(function() {{
+  var data = {data};
+  var layout = {layout};
+  var arrays = {arrays};
+  Promise.all(arrays.map(function(array) {{
+    return fetch(array[2].url).then(function(response) {{
+      return response.arrayBuffer();
+    }}).then(function(buffer) {{
+      return Array.prototype.slice.call(new window[array[2].type](buffer));
+    }});
+  }})).then(function(values) {{
+    arrays.forEach(function(array, i) {{
+      data[array[0]][array[1]] = values[i];
+    }});
+    Plotly.newPlot("plotly{id}", data, layout);
+  }});
+}})();
+</script>
+"""
+
+PLOTLY_DOCUMENT = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+</head>
+<body>
+{body}</body>
+</html>
+"""
+
+
+def fig_to_plotly(fig, username=None, api_key=None, notebook=False,
+                  publisher=None):
     """Convert a matplotlib figure to plotly dictionary
 
+    If a publisher (see mplexporter.renderers.plotly.publish) is given, the
+    figure is uploaded with it, reusing its connections, and the URL of
+    the figure is returned.
     """
+    from ... exporter import Exporter
     renderer = PlotlyRenderer(username=username, api_key=api_key)
     Exporter(renderer).run(fig)
+    if publisher is not None:
+        return publisher.upload(renderer)['url']
+    import plotly  # only import if fig_to_plotly is used
     py = plotly.plotly(renderer.username, renderer.api_key)
     if notebook:
         return py.iplot(renderer.data, layout=renderer.layout)
     else:
         py.plot(renderer.data, layout=renderer.layout)
+
+
+def figs_to_plotly(figs, publisher, **kwargs):
+    """Export several matplotlib figures and upload them in a batch
+
+    The figures are exported in turn, then uploaded concurrently by the
+    publisher.  Keyword arguments are passed to plotly.
+
+    Returns
+    -------
+    results : list
+        The result of each upload, as returned by PlotlyPublisher.publish.
+    """
+    from ... exporter import Exporter
+    renderers = []
+    for fig in figs:
+        renderer = PlotlyRenderer()
+        Exporter(renderer).run(fig)
+        renderers.append(renderer)
+    return publisher.publish(renderers, **kwargs)
@@ -0,0 +1,372 @@
+"""
+Plotly Publishing
+=================
+This submodule uploads rendered figures to plotly in batches.  Uploads run
+concurrently on a bounded pool of worker threads, each of which keeps its
+HTTP connection open from one upload to the next; failed uploads are
+retried with exponential backoff, and every figure waits in an optional
+on-disk outbox until its upload succeeds::
+
+    with PlotlyPublisher(username, api_key, outbox='outbox') as publisher:
+        results = publisher.publish(renderers)
+
+Figures left in the outbox, e.g. by an interrupted batch job, are sent by
+:meth:`PlotlyPublisher.flush`.  Uploads are not idempotent: a failed
+upload is only retried, or left in the outbox, if the server cannot have
+stored the figure.  The publisher talks to the plotly upload
+API directly, and does not need the plotly package.  Tests may use the
+local stand-in server of mplexporter.renderers.plotly.mock_server.
+"""
+import os
+import json
+import time
+import random
+import select
+import socket
+import hashlib
+import threading
+
+try:
+    import http.client as httplib
+    from urllib.parse import urlparse, urlencode
+except ImportError:  # Python 2
+    import httplib
+    from urlparse import urlparse
+    from urllib import urlencode
+
+PLOTLY_SERVER = 'https://plot.ly'
+UPLOAD_PATH = '/clientresp'
+
+# HTTP statuses worth retrying: the server is overloaded or unavailable,
+# and did not process the request
+RETRY_STATUSES = (429, 503)
+
+# the suffix of the outbox files claimed by an upload
+CLAIM_SUFFIX = '.sending'
+
+
+class UploadError(Exception):
+    """Raised when a figure could not be uploaded
+
+    Attributes
+    ----------
+    status : int or None
+        The HTTP status of the last attempt, if the server answered.
+    sent : bool
+        True if the server may have stored the figure, e.g. if the
+        connection was lost after the request was sent.  Such uploads are
+        not retried, as sending them again could upload the figure twice.
+    """
+    def __init__(self, message, status=None, sent=False):
+        Exception.__init__(self, message)
+        self.status = status
+        self.sent = sent
+
+
+class _NotSent(Exception):
+    """Raised by PlotlyPublisher._post if the request was not sent"""
+    def __init__(self, reason):
+        Exception.__init__(self, str(reason))
+        self.reason = reason
+
+
+def _dropped(sock):
+    """Return True if the peer closed an idle connection (or sent data no
+    request asked for)"""
+    try:
+        return bool(select.select([sock], [], [], 0)[0])
+    except (socket.error, ValueError):
+        return True
+
+
+class PlotlyPublisher(object):
+    """Upload rendered figures to plotly
+
+    Parameters
+    ----------
+    username, api_key : string
+        The plotly credentials.
+    server : string
+        The URL of the plotly server (default 'https://plot.ly').
+    max_workers : int
+        The maximum number of concurrent uploads (default 4).
+    retries : int
+        The number of times a failed upload is retried (default 3).
+        Failures to connect and statuses in RETRY_STATUSES are retried;
+        other errors, which may come after the server stored the figure,
+        are not.
+    backoff : float
+        The base delay between retries, in seconds (default 0.5).  The
+        n-th retry waits a random time of up to ``backoff * 2 ** n``
+        seconds, or the delay requested by a Retry-After header.
+    timeout : float
+        The timeout of each request, in seconds (default 30).
+    outbox : string (optional)
+        A directory in which each figure is written before it is
+        uploaded, and removed from once uploaded.  An upload first claims
+        its file by renaming it with CLAIM_SUFFIX, so that concurrent
+        publishers never send the same figure.
+    """
+    def __init__(self, username, api_key, server=PLOTLY_SERVER, max_workers=4,
+                 retries=3, backoff=0.5, timeout=30., outbox=None):
+        self.username = username
+        self.api_key = api_key
+        url = urlparse(server)
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.outbox = outbox
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker threads and close their connections"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            connections, self._connections = self._connections, []
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def _connection(self):
+        """Return the persistent connection of the calling thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and connection.sock is not None and \
+                _dropped(connection.sock):
+            # the server closed the idle connection: reconnect, rather
+            # than send a request which may be lost
+            connection.close()
+        if connection is None:
+            if self.scheme == 'https':
+                cls = httplib.HTTPSConnection
+            else:
+                cls = httplib.HTTPConnection
+            connection = cls(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _discard_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _post(self, body):
+        """Post body on the thread's connection: return (status, headers,
+        response body)
+
+        Raises _NotSent if the connection could not be opened, in which
+        case the server did not receive the request.
+        """
+        connection = self._connection()
+        if connection.sock is None:
+            try:
+                connection.connect()
+            except (socket.error, httplib.HTTPException) as err:
+                self._discard_connection()
+                raise _NotSent(err)
+        try:
+            connection.request('POST', UPLOAD_PATH, body, {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Connection': 'keep-alive'})
+            response = connection.getresponse()
+            content = response.read()
+        except Exception:
+            # the connection is in an unknown state: open a new one
+            self._discard_connection()
+            raise
+        if response.getheader('connection', '').lower() == 'close':
+            self._discard_connection()
+        return response.status, response, content
+
+    def _body(self, figure):
+        kwargs = dict(figure.get('kwargs', {}), layout=figure['layout'])
+        return urlencode({'un': self.username, 'key': self.api_key,
+                          'origin': 'plot', 'platform': 'python',
+                          'args': json.dumps(figure['data']),
+                          'kwargs': json.dumps(kwargs)})
+
+    def _delay(self, attempt, response=None):
+        if response is not None:
+            try:
+                return float(response.getheader('retry-after'))
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    def _send(self, figure):
+        """Upload a figure, retrying on failure, and return the response"""
+        body = self._body(figure)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                status, response, content = self._post(body)
+            except _NotSent as err:
+                if last:
+                    raise UploadError("upload failed: {0}".format(err))
+                time.sleep(self._delay(attempt))
+                continue
+            except (socket.error, httplib.HTTPException) as err:
+                raise UploadError("upload failed after the request was "
+                                  "sent: {0}".format(err), sent=True)
+            if status in RETRY_STATUSES and not last:
+                time.sleep(self._delay(attempt, response))
+                continue
+            if status != 200:
+                # other server errors may come after the figure was stored
+                raise UploadError("upload failed with HTTP status {0}"
+                                  "".format(status), status,
+                                  sent=status >= 500 and
+                                  status not in RETRY_STATUSES)
+            result = json.loads(content.decode('utf-8'))
+            if result.get('error'):
+                raise UploadError(result['error'], status)
+            return result
+
+    def _figure(self, figure, **kwargs):
+        """Return the upload dictionary of a renderer, a (data, layout)
+        pair, or an upload dictionary"""
+        if hasattr(figure, 'data') and hasattr(figure, 'layout'):
+            figure = {'data': figure.data, 'layout': figure.layout}
+        elif isinstance(figure, tuple):
+            figure = {'data': figure[0], 'layout': figure[1]}
+        if kwargs:
+            figure = dict(figure, kwargs=dict(figure.get('kwargs', {}),
+                                              **kwargs))
+        return figure
+
+    def _write_outbox(self, figure):
+        """Write a figure to the outbox, and return its path"""
+        if not os.path.isdir(self.outbox):
+            os.makedirs(self.outbox)
+        content = json.dumps(figure).encode('utf-8')
+        name = "{0:.6f}-{1}.json".format(
+            time.time(), hashlib.sha1(content).hexdigest()[:12])
+        path = os.path.join(self.outbox, name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(content)
+        os.rename(path + '.tmp', path)
+        return path
+
+    def pending(self):
+        """Return the paths of the figures waiting in the outbox, oldest
+        first"""
+        if self.outbox is None or not os.path.isdir(self.outbox):
+            return []
+        return [os.path.join(self.outbox, name)
+                for name in sorted(os.listdir(self.outbox))
+                if name.endswith('.json')]
+
+    def _claim(self, path):
+        """Claim an outbox file: return its new path, or None if another
+        upload claimed it first"""
+        claimed = path + CLAIM_SUFFIX
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            return None
+        return claimed
+
+    def _upload_entry(self, entry):
+        figure, path = entry
+        claimed = None
+        if path is not None:
+            claimed = self._claim(path)
+            if claimed is None:
+                return None
+            if figure is None:
+                with open(claimed, 'rb') as f:
+                    figure = json.loads(f.read().decode('utf-8'))
+        try:
+            result = self._send(figure)
+        except UploadError as err:
+            # a figure the server may have stored stays claimed
+            if claimed is not None and not err.sent:
+                os.rename(claimed, path)
+            return err
+        if claimed is not None:
+            os.remove(claimed)
+        return result
+
+    def _upload_all(self, entries):
+        if len(entries) <= 1 or self.max_workers <= 1:
+            return [self._upload_entry(entry) for entry in entries]
+        return self._worker_pool().map(self._upload_entry, entries)
+
+    def _worker_pool(self):
+        """Return the pool of worker threads, which is kept from one batch
+        to the next, so that the workers reuse their connections"""
+        with self._lock:
+            if self._pool is None:
+                from multiprocessing.pool import ThreadPool
+                self._pool = ThreadPool(self.max_workers)
+            return self._pool
+
+    def upload(self, figure, **kwargs):
+        """Upload a figure, and return the response of the server
+
+        Parameters
+        ----------
+        figure : PlotlyRenderer, tuple or dictionary
+            A renderer which exported a figure, a (data, layout) pair, or
+            a dictionary with 'data', 'layout' and optionally 'kwargs'.
+
+        Keyword arguments, such as filename, fileopt or world_readable,
+        are passed to plotly.  Raises UploadError if the upload fails.
+        """
+        result = self.publish([figure], **kwargs)[0]
+        if isinstance(result, UploadError):
+            raise result
+        return result
+
+    def publish(self, figures, **kwargs):
+        """Upload several figures concurrently
+
+        Each figure is first written to the outbox, if any.
+
+        Returns
+        -------
+        results : list
+            For each figure, in order, the response of the server (a
+            dictionary whose 'url' is that of the figure), the UploadError
+            of a failed upload, or None if another publisher flushing the
+            outbox claimed the figure first.  Failed figures stay in the
+            outbox; those which the server may have stored (see
+            UploadError.sent) are not pending, but left claimed, so that
+            they are not sent twice.
+        """
+        entries = []
+        for figure in figures:
+            figure = self._figure(figure, **kwargs)
+            path = None if self.outbox is None else \
+                self._write_outbox(figure)
+            entries.append((figure, path))
+        return self._upload_all(entries)
+
+    def flush(self):
+        """Upload the figures waiting in the outbox
+
+        Each figure is claimed before it is sent, so that publishers may
+        flush the same outbox concurrently.  Returns the results of the
+        uploads of the figures claimed, as publish() does.
+        """
+        results = self._upload_all([(None, path)
+                                    for path in self.pending()])
+        return [result for result in results if result is not None]
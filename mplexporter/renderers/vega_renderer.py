@@ -1,8 +1,10 @@
 import warnings
 import json
 import random
+import hashlib
+import os
 from .base import Renderer
-from ..exporter import Exporter
+from ..precision import to_list
 
 
 class VegaRenderer(Renderer):
@@ -14,7 +16,9 @@ class VegaRenderer(Renderer):
         self.scales = []
         self.axes = []
         self.marks = []
-            
+        self.spatial_indexes = []
+        self._tables = {}
+
     def open_axes(self, ax, properties):
         if len(self.axes) > 0:
             warnings.warn("multiple axes not yet supported")
@@ -33,21 +37,47 @@ class VegaRenderer(Renderer):
                             range="height",
                         ),]
 
+    def add_data(self, data):
+        """Add data to the shared data tables
+
+        Series with identical x values share a single table, in which each
+        distinct y column is stored once, so that e.g. many lines plotted
+        against the same x array emit that array only once.
+
+        Returns
+        -------
+        dataname, xfield, yfield : strings
+            The name of the table and the fields holding the x and y values.
+        """
+        xkey = self.column_key(data[:, 0])
+        ykey = self.column_key(data[:, 1])
+        if xkey not in self._tables:
+            table = {'name': "table{0:03d}".format(len(self.data) + 1),
+                     'values': [dict(x=x) for x in to_list(data[:, 0])]}
+            self.data.append(table)
+            self._tables[xkey] = (table, set())
+        table, fields = self._tables[xkey]
+        if ykey == xkey:
+            return table['name'], 'data.x', 'data.x'
+        if ykey not in fields:
+            for row, y in zip(table['values'], to_list(data[:, 1])):
+                row[ykey] = y
+            fields.add(ykey)
+        return table['name'], 'data.x', 'data.' + ykey
+
     def draw_line(self, data, coordinates, style, mplobj=None):
         if coordinates != 'data':
             warnings.warn("Only data coordinates supported. Skipping this")
-        dataname = "table{0:03d}".format(len(self.data) + 1)
+        dataname, xfield, yfield = self.add_data(data)
 
         # TODO: respect the other style settings
-        self.data.append({'name': dataname,
-                          'values': [dict(x=d[0], y=d[1]) for d in data]})
         self.marks.append({'type': 'line',
                            'from': {'data': dataname},
                            'properties': {
                                "enter": {
                                    "interpolate": {"value": "monotone"},
-                                   "x": {"scale": "x", "field": "data.x"},
-                                   "y": {"scale": "y", "field": "data.y"},
+                                   "x": {"scale": "x", "field": xfield},
+                                   "y": {"scale": "y", "field": yfield},
                                    "stroke": {"value": style['color']},
                                    "strokeOpacity": {"value": style['alpha']},
                                    "strokeWidth": {"value": style['linewidth']},
@@ -58,18 +88,16 @@ class VegaRenderer(Renderer):
     def draw_markers(self, data, coordinates, style, mplobj=None):
         if coordinates != 'data':
             warnings.warn("Only data coordinates supported. Skipping this")
-        dataname = "table{0:03d}".format(len(self.data) + 1)
+        dataname, xfield, yfield = self.add_data(data)
 
         # TODO: respect the other style settings
-        self.data.append({'name': dataname,
-                          'values': [dict(x=d[0], y=d[1]) for d in data]})
         self.marks.append({'type': 'symbol',
                            'from': {'data': dataname},
                            'properties': {
                                "enter": {
                                    "interpolate": {"value": "monotone"},
-                                   "x": {"scale": "x", "field": "data.x"},
-                                   "y": {"scale": "y", "field": "data.y"},
+                                   "x": {"scale": "x", "field": xfield},
+                                   "y": {"scale": "y", "field": yfield},
                                    "fill": {"value": style['facecolor']},
                                    "fillOpacity": {"value": style['alpha']},
                                    "stroke": {"value": style['edgecolor']},
@@ -79,6 +107,61 @@ class VegaRenderer(Renderer):
                            }
                        })
 
+    def draw_texts(self, texts, positions, coordinates, styles, mplobj=None):
+        if coordinates != 'data':
+            warnings.warn("Only data coordinates supported. Skipping this")
+            return
+        # a single mark draws all the texts, styled by fields of the table
+        table = {'name': "table{0:03d}".format(len(self.data) + 1),
+                 'values': [{'x': x, 'y': y, 'text': text,
+                             'fill': style['color'],
+                             'opacity': style['alpha'],
+                             'fontSize': style['fontsize'],
+                             'align': style['halign'],
+                             'baseline': VEGA_BASELINES.get(style['valign'],
+                                                            'middle'),
+                             'angle': -style['rotation']}
+                            for text, (x, y), style
+                            in zip(texts, positions, styles)]}
+        self.data.append(table)
+        enter = dict((key, {'field': 'data.' + key})
+                     for key in ['text', 'fill', 'opacity', 'fontSize',
+                                 'align', 'baseline', 'angle'])
+        enter['x'] = {'scale': 'x', 'field': 'data.x'}
+        enter['y'] = {'scale': 'y', 'field': 'data.y'}
+        self.marks.append({'type': 'text',
+                           'from': {'data': table['name']},
+                           'properties': {'enter': enter}})
+
+    def draw_image(self, imdata, extent, coordinates, style, mplobj=None):
+        if coordinates != 'data':
+            warnings.warn("Only data coordinates supported. Skipping this")
+            return
+        xmin, xmax, ymin, ymax = extent
+        self.marks.append({'type': 'image',
+                           'properties': {
+                               'enter': {
+                                   'url': {'value': IMAGE_URL_PREFIX + imdata},
+                                   'x': {'scale': 'x', 'value': xmin},
+                                   'x2': {'scale': 'x', 'value': xmax},
+                                   'y': {'scale': 'y', 'value': ymax},
+                                   'y2': {'scale': 'y', 'value': ymin},
+                                   'opacity': {'value': style['alpha']},
+                               }
+                           }
+                       })
+
+    def draw_spatial_index(self, index, mplobj=None):
+        # written next to the specification by VegaHTML, for hit tests
+        self.spatial_indexes.append(index)
+
+
+IMAGE_URL_PREFIX = 'data:image/png;base64,'
+
+# matplotlib vertical alignment -> vega text baseline
+VEGA_BASELINES = {'top': 'top', 'bottom': 'bottom', 'center': 'middle',
+                  'baseline': 'alphabetic', 'center_baseline': 'middle'}
+
 
 class VegaHTML(object):
     def __init__(self, renderer):
@@ -88,35 +171,238 @@ class VegaHTML(object):
                                   scales=renderer.scales,
                                   axes=renderer.axes,
                                   marks=renderer.marks)
+        # the spatial indexes of the axes, if the exporter built them (see
+        # mplexporter.spatial), are not part of the vega grammar
+        self.spatial_indexes = renderer.spatial_indexes
+        if self.spatial_indexes:
+            self.specification['spatial_indexes'] = [
+                index.to_dict() for index in self.spatial_indexes]
 
-    def html(self):
-        """Build the HTML representation for IPython."""
+    def sidecar_specification(self, sidecar):
+        """Return the specification, with its data and images in sidecars
+
+        Data tables are written as JSON files and images as PNG files by
+        the sidecar writer (see mplexporter.sidecar.SidecarWriter), and
+        referenced by URL in the returned specification.  The arrays of the
+        spatial indexes are written as binary typed-array files.
+        """
+        data = [{'name': table['name'],
+                 'url': sidecar.write_json(table['values']),
+                 'format': {'type': 'json'}}
+                for table in self.specification['data']]
+        marks = []
+        for mark in self.specification['marks']:
+            url = mark.get('properties', {}).get('enter', {}).get('url')
+            if url and url.get('value', '').startswith(IMAGE_URL_PREFIX):
+                image = url['value'][len(IMAGE_URL_PREFIX):]
+                enter = dict(mark['properties']['enter'],
+                             url={'value': sidecar.write_base64(image)})
+                mark = dict(mark, properties=dict(mark['properties'],
+                                                  enter=enter))
+            marks.append(mark)
+        specification = dict(self.specification, data=data, marks=marks)
+        if self.spatial_indexes:
+            specification['spatial_indexes'] = [
+                index.to_dict(sidecar) for index in self.spatial_indexes]
+        return specification
+
+    def html(self, sidecar=None):
+        """Build the HTML representation for IPython.
+
+        If a sidecar writer is given, data and images are written to
+        sidecar files rather than inlined.
+        """
+        specification = self.specification
+        if sidecar is not None:
+            specification = self.sidecar_specification(sidecar)
         id = random.randint(0, 2 ** 16)
         html = '<div id="vis%d"></div>' % id
         html += '<script>\n'
-        html += VEGA_TEMPLATE % (json.dumps(self.specification), id)
+        html += VEGA_TEMPLATE % (json.dumps(specification), id)
         html += '</script>\n'
         return html
 
+    def save(self, path, sidecar=True):
+        """Save a standalone HTML document
+
+        If sidecar is True, data and images are written to a directory
+        named after the document (e.g. 'figure_files' for 'figure.html'),
+        which must be served along with it.
+        """
+        from ..sidecar import SidecarWriter
+        writer = None
+        if sidecar:
+            writer = SidecarWriter(os.path.splitext(path)[0] + '_files')
+        with open(path, 'w') as f:
+            f.write(VEGA_DOCUMENT.format(d3_url=D3_URL, vega_url=VEGA_URL,
+                                         body=self.html(writer)))
+
     def _repr_html_(self):
         return self.html()
 
 
-def fig_to_vega(fig, notebook=False):
+def fig_to_vega(fig, notebook=False, sidecar_dir=None):
     """Convert a matplotlib figure to vega dictionary
 
     if notebook=True, then return an object which will display in a notebook
-    otherwise, return an HTML string.
+    otherwise, return an HTML string.  If sidecar_dir is given, the data and
+    images of the HTML string are written to files in this directory, and
+    referenced relative to its parent.
     """
+    from ..exporter import Exporter
     renderer = VegaRenderer()
     Exporter(renderer).run(fig)
     vega_html = VegaHTML(renderer)
     if notebook:
         return vega_html
+    elif sidecar_dir is not None:
+        from ..sidecar import SidecarWriter
+        return vega_html.html(SidecarWriter(sidecar_dir))
     else:
         return vega_html.html()
 
 
+D3_URL = "http://d3js.org/d3.v3.min.js"
+VEGA_URL = "http://trifacta.github.com/vega/vega.js"
+
+
+class VegaBundle(object):
+    """A single HTML document holding many figures
+
+    The document loads d3 and vega once, and keeps the data of all figures
+    in one shared store of columns, in which columns with identical values
+    are stored once, whichever tables and figures they belong to; e.g. the
+    x values shared by the series of many figures.  Each figure's script
+    only adds the columns which are not yet in the store, references the
+    columns of its tables, and renders as soon as it is parsed, so the
+    first figure does not wait for the data of the others.
+
+    Parameters
+    ----------
+    d3_url, vega_url : strings (optional)
+        The URLs from which the libraries are loaded.
+    """
+    def __init__(self, d3_url=D3_URL, vega_url=VEGA_URL):
+        self.d3_url = d3_url
+        self.vega_url = vega_url
+        self.store = {}
+        self.figures = []
+
+    def add(self, fig):
+        """Export a matplotlib figure and add it to the bundle"""
+        from ..exporter import Exporter
+        renderer = VegaRenderer()
+        Exporter(renderer).run(fig)
+        self.add_specification(VegaHTML(renderer).specification)
+
+    def _column_key(self, values, new_keys):
+        """Return the store key of a column of values, adding it if new"""
+        values = json.dumps(values, separators=(',', ':'))
+        key = hashlib.sha1(values.encode('utf-8')).hexdigest()[:16]
+        if key not in self.store:
+            self.store[key] = values
+            new_keys.append(key)
+        return key
+
+    def add_specification(self, specification):
+        """Add a vega specification to the bundle"""
+        data = []
+        refs = {}
+        new_keys = []
+        for table in specification['data']:
+            # the rows of a table all have the same fields
+            rows = table['values']
+            fields = sorted(rows[0]) if rows else []
+            refs[table['name']] = dict(
+                (field, self._column_key([row[field] for row in rows],
+                                         new_keys))
+                for field in fields)
+            data.append(dict((name, value) for name, value in table.items()
+                             if name != 'values'))
+        specification = dict(specification, data=data)
+        self.figures.append((json.dumps(specification), json.dumps(refs),
+                             new_keys))
+
+    def html(self):
+        """Return the HTML document"""
+        prefix = "vis{0}-".format(random.randint(0, 2 ** 16))
+        parts = [VEGA_BUNDLE_HEAD.format(d3_url=self.d3_url,
+                                         vega_url=self.vega_url)]
+        for i, (specification, refs, new_keys) in enumerate(self.figures):
+            parts.append('<div id="{0}{1}"></div>\n<script>\n'.format(prefix,
+                                                                        i))
+            for key in new_keys:
+                parts.append('mplexporter.store["{0}"] = {1};\n'.format(
+                    key, self.store[key]))
+            parts.append('mplexporter.render({0}, {1}, "#{2}{3}");\n'
+                         '</script>\n'.format(specification, refs, prefix, i))
+        parts.append(VEGA_BUNDLE_TAIL)
+        return ''.join(parts)
+
+    def _repr_html_(self):
+        return self.html()
+
+
+def figs_to_vega_bundle(figs):
+    """Convert matplotlib figures to a single HTML document
+
+    See VegaBundle.
+    """
+    bundle = VegaBundle()
+    for fig in figs:
+        bundle.add(fig)
+    return bundle.html()
+
+
+VEGA_BUNDLE_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<script src="{d3_url}"></script>
+<script src="{vega_url}"></script>
+<script>
+var mplexporter = {{
+  store: {{}},
+  render: function(spec, refs, el) {{
+    var store = mplexporter.store;
+    spec.data.forEach(function(table) {{
+      var columns = refs[table.name], fields = Object.keys(columns);
+      var n = fields.length ? store[columns[fields[0]]].length : 0;
+      table.values = [];
+      for (var i = 0; i < n; i++) {{
+        var row = {{}};
+        fields.forEach(function(field) {{
+          row[field] = store[columns[field]][i];
+        }});
+        table.values.push(row);
+      }}
+    }});
+    vg.parse.spec(spec, function(chart) {{
+      chart({{el: el}}).update();
+    }});
+  }}
+}};
+</script>
+</head>
+<body>
+"""
+
+VEGA_BUNDLE_TAIL = """</body>
+</html>
+"""
+
+VEGA_DOCUMENT = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<script src="{d3_url}"></script>
+<script src="{vega_url}"></script>
+</head>
+<body>
+{body}</body>
+</html>
+"""
+
 VEGA_TEMPLATE = """
 ( function() {
   var _do_plot = function() {
@@ -1,6 +1,5 @@
 import warnings
 from .base import Renderer
-from ..exporter import Exporter
 
 
 class VincentRenderer(Renderer):
@@ -46,6 +45,7 @@ class VincentRenderer(Renderer):
 
 def fig_to_vincent(fig):
     """Convert a matplotlib figure to a vincent object"""
+    from ..exporter import Exporter
     renderer = VincentRenderer()
     exporter = Exporter(renderer)
     exporter.run(fig)
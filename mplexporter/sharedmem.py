@@ -0,0 +1,219 @@
+"""
+Shared-Memory Transport
+=======================
+This submodule transports the arrays of an export from a worker process to
+its parent through shared memory, rather than by pickling them.
+
+In the worker, :func:`export_shared` exports a figure to detached events
+(see :meth:`Event.detached`) and copies their arrays into a single shared
+memory block; the returned :class:`SharedExport` only holds small
+descriptors of the arrays, and is cheap to pickle.  In the parent,
+:meth:`SharedExport.attach` maps the block and rebuilds the events with
+zero-copy array views, which any renderer can consume::
+
+    with multiprocessing.Pool() as pool:
+        shared = pool.apply(export_shared, (fig,))
+    shared.replay(renderer)
+
+The block is owned by the latest unpickled (or never pickled) SharedExport.
+It is unlinked as soon as it is attached, and unmapped once the last array
+view is garbage-collected; a block which is never attached is unlinked when
+its owner is garbage-collected, or by the multiprocessing resource tracker
+if the owning process dies.
+
+This module requires Python 3.8 or later.
+"""
+import weakref
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # Python < 3.8
+    shared_memory = resource_tracker = None
+
+from .events import replay
+
+# byte alignment of the arrays within the block
+ALIGNMENT = 64
+
+
+class SharedArray(object):
+    """Descriptor of an array stored in a shared memory block"""
+    __slots__ = ('offset', 'shape', 'dtype')
+
+    def __init__(self, offset, shape, dtype):
+        self.offset = offset
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+    def __reduce__(self):
+        return (SharedArray, (self.offset, self.shape, self.dtype.str))
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def view(self, buffer):
+        """Return the array, as a view of the uint8 array buffer"""
+        data = buffer[self.offset:self.offset + self.nbytes]
+        return data.view(self.dtype).reshape(self.shape)
+
+    def __repr__(self):
+        return "SharedArray(offset={0}, shape={1}, dtype={2})".format(
+            self.offset, self.shape, self.dtype)
+
+
+def _map_arrays(value, func):
+    """Apply func to the arrays nested in lists, tuples and dicts of value"""
+    if isinstance(value, (np.ndarray, SharedArray)):
+        return func(value)
+    elif isinstance(value, list):
+        return [_map_arrays(item, func) for item in value]
+    elif isinstance(value, tuple):
+        return tuple(_map_arrays(item, func) for item in value)
+    elif isinstance(value, dict):
+        return dict((key, _map_arrays(item, func))
+                    for key, item in value.items())
+    return value
+
+
+def _map_events(events, func):
+    return [event.__class__(event.kind, event.mplobj,
+                            **_map_arrays(event.fields(), func))
+            for event in events]
+
+
+class SharedExport(object):
+    """Detached events whose arrays are stored in a shared memory block
+
+    Parameters
+    ----------
+    events : list of Event objects
+        Detached events (see Event.detached).
+    min_bytes : int
+        Arrays smaller than this are pickled along with the events rather
+        than stored in shared memory (default 1024).
+
+    Attributes
+    ----------
+    name : string or None
+        The name of the shared memory block, or None if no array was
+        large enough to be shared.
+    nbytes : int
+        The number of bytes stored in the block.
+    """
+    def __init__(self, events, min_bytes=1024):
+        if shared_memory is None:
+            raise RuntimeError("shared memory requires Python 3.8 or later")
+        arrays = []
+        self.nbytes = 0
+
+        def describe(array):
+            if (not isinstance(array, np.ndarray) or array.dtype.hasobject
+                    or array.nbytes < min_bytes):
+                return array
+            offset = -self.nbytes % ALIGNMENT + self.nbytes
+            arrays.append((offset, array))
+            self.nbytes = offset + array.nbytes
+            return SharedArray(offset, array.shape, array.dtype)
+
+        self.events = _map_events(events, describe)
+        self.name = None
+        self._attached = None
+        self._owner = False
+        if not arrays:
+            return
+
+        block = shared_memory.SharedMemory(create=True, size=self.nbytes)
+        try:
+            buffer = np.ndarray((self.nbytes,), np.uint8, buffer=block.buf)
+            for offset, array in arrays:
+                target = buffer[offset:offset + array.nbytes]
+                target.view(array.dtype).reshape(array.shape)[...] = array
+            del buffer, target
+        finally:
+            block.close()
+        self.name = block.name
+        self._owner = True
+        # the worker may exit before the block is attached: leave its
+        # cleanup to the owner rather than to this process' tracker
+        self._track(False)
+
+    def _track(self, register):
+        if getattr(shared_memory, '_USE_POSIX', False):
+            method = resource_tracker.register if register else \
+                resource_tracker.unregister
+            method('/' + self.name, 'shared_memory')
+
+    def __getstate__(self):
+        # ownership of the block passes to the unpickled copy
+        state = self.__dict__.copy()
+        state['_attached'] = None
+        self._owner = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._owner:
+            self._track(True)
+
+    def __del__(self):
+        if getattr(self, '_owner', False):
+            self._owner = False
+            try:
+                block = shared_memory.SharedMemory(name=self.name)
+            except (OSError, TypeError):
+                return
+            block.close()
+            block.unlink()
+
+    def attach(self):
+        """Return the events, with zero-copy views of the shared arrays
+
+        The first call maps the block and unlinks it, so that the memory is
+        released once the last view is garbage-collected; later calls
+        return the same events.
+        """
+        if self._attached is not None:
+            return self._attached
+        if self.name is None:
+            self._attached = self.events
+            return self._attached
+
+        block = shared_memory.SharedMemory(name=self.name)
+        block.unlink()
+        self._owner = False
+        buffer = np.ndarray((block.size,), np.uint8, buffer=block.buf)
+        # the mapping can only be closed once no view uses it
+        weakref.finalize(buffer, block.close)
+        self._attached = _map_events(
+            self.events, lambda array: (array.view(buffer)
+                                        if isinstance(array, SharedArray)
+                                        else array))
+        return self._attached
+
+    def replay(self, renderer):
+        """Replay the events into a renderer"""
+        replay(self.attach(), renderer)
+
+
+def export_shared(fig, min_bytes=1024, **kwargs):
+    """Export a figure to a SharedExport
+
+    This is meant to be run in a worker process, e.g. with
+    ``multiprocessing.Pool.apply``; the result is replayed in the parent.
+
+    Parameters
+    ----------
+    fig : matplotlib.Figure instance
+        The figure to export.
+    min_bytes : int
+        Arrays smaller than this are pickled rather than shared.
+    **kwargs :
+        Passed to the Exporter.  close_mpl defaults to False.
+    """
+    from .exporter import Exporter
+    kwargs.setdefault('close_mpl', False)
+    events = Exporter(None, **kwargs).iter_events(fig)
+    return SharedExport([event.detached() for event in events], min_bytes)
@@ -0,0 +1,90 @@
+"""
+Sidecar Files
+=============
+This submodule writes the bulky parts of an exported figure (data tables,
+typed arrays, images) to separate files next to an HTML document, so that
+the document only references them by URL.  Browsers then fetch the files
+in parallel and cache them across pages.
+
+File names are derived from a hash of their content: a table or image
+shared by several figures or pages is written, and downloaded, once.
+"""
+import os
+import json
+import base64
+import hashlib
+
+import numpy as np
+
+# numpy dtype -> JavaScript typed array
+TYPED_ARRAYS = {'<f8': 'Float64Array', '<f4': 'Float32Array',
+                '<i4': 'Int32Array', '<u4': 'Uint32Array',
+                '<i2': 'Int16Array', '<u2': 'Uint16Array',
+                '|i1': 'Int8Array', '|u1': 'Uint8Array'}
+
+
+class SidecarWriter(object):
+    """Write sidecar files to a directory
+
+    Parameters
+    ----------
+    directory : string
+        The directory of the sidecar files, created if needed.
+    url_prefix : string (optional)
+        The prefix of the URLs of the files.  By default, the name of the
+        directory, so that the files are found relative to a document saved
+        in the parent directory.
+
+    Attributes
+    ----------
+    files : list
+        The paths of the files written, or reused, by this writer.
+    """
+    def __init__(self, directory, url_prefix=None):
+        self.directory = directory
+        if url_prefix is None:
+            url_prefix = os.path.basename(os.path.normpath(directory)) + '/'
+        self.url_prefix = url_prefix
+        self.files = []
+
+    def write_bytes(self, data, extension):
+        """Write data to a content-addressed file, and return its URL"""
+        name = "{0}.{1}".format(hashlib.sha1(data).hexdigest()[:16],
+                                extension)
+        path = os.path.join(self.directory, name)
+        if path not in self.files:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            self.files.append(path)
+        return self.url_prefix + name
+
+    def write_json(self, obj):
+        """Write obj as a JSON file, and return its URL"""
+        data = json.dumps(obj, separators=(',', ':'))
+        return self.write_bytes(data.encode('utf-8'), 'json')
+
+    def write_array(self, array, dtype='<f8'):
+        """Write a one-dimensional array as a binary typed-array file
+
+        The values are stored little-endian, as read by the JavaScript
+        typed array returned in the 'type' key.
+
+        Returns
+        -------
+        reference : dictionary
+            The 'url', 'type' (e.g. 'Float64Array') and 'length' of the file.
+        """
+        array = np.ascontiguousarray(array, dtype=dtype)
+        dtype = array.dtype.str
+        if dtype not in TYPED_ARRAYS:
+            raise ValueError("no typed array for dtype {0}".format(dtype))
+        return {'url': self.write_bytes(array.tobytes(), 'bin'),
+                'type': TYPED_ARRAYS[dtype],
+                'length': len(array)}
+
+    def write_base64(self, data, extension='png'):
+        """Write base64-encoded data, e.g. an image, and return its URL"""
+        return self.write_bytes(base64.b64decode(data), extension)
@@ -0,0 +1,292 @@
+"""
+Spatial Index
+=============
+This submodule contains a compact spatial index of the points drawn in an
+axes, in display (pixel) coordinates, which answers hit tests -- which
+point is under the mouse, which points lie in a selection box -- on the
+server side, without matplotlib::
+
+    exporter = Exporter(renderer, spatial_index=True)
+    exporter.run(fig)
+    index = exporter.spatial_indexes[fig.axes[0]]
+    index.nearest(x, y, max_distance=5)   # -> (artist, index, distance)
+
+The index is a uniform grid: points are sorted by the row-major number of
+their grid cell, and an array of cell offsets gives the slice of points of
+each cell.  The cells of a row of the grid are therefore contiguous, and a
+box query reads one slice per row.  The index holds four flat arrays
+(points, owners, indices and cell offsets), which may be written next to
+the renderer output with :meth:`SpatialIndex.to_dict`.
+
+Display coordinates are those of the figure saved at its own dpi, with
+the origin at the lower left corner, as computed by the transforms of the
+artists.
+"""
+import numpy as np
+
+
+class SpatialIndex(object):
+    """A uniform grid index of points in display coordinates
+
+    Parameters
+    ----------
+    points : array_like
+        The (N, 2) display coordinates of the points.  Points with
+        non-finite coordinates are not indexed.
+    owners : array_like (optional)
+        The (N,) indices, in ``artists``, of the artists of the points.
+    indices : array_like (optional)
+        The (N,) indices of the points within the data of their artist.
+    artists : list (optional)
+        The artists (or any object) referred to by ``owners``.
+    points_per_cell : float
+        The average number of points per grid cell (default 4).
+
+    Attributes
+    ----------
+    origin : tuple
+        The display coordinates of the lower left corner of the grid.
+    cell_size : float
+        The width and height of the grid cells, in pixels.
+    shape : tuple
+        The number of (columns, rows) of the grid.
+    starts : ndarray
+        The int32 offsets of the points of each cell, of length
+        ``columns * rows + 1``: the points of cell ``row * columns + column``
+        are those of ``starts[cell]:starts[cell + 1]``.
+    points, owners, indices : ndarray
+        The float32 coordinates and the int32 owners and indices of the
+        points, sorted by cell.
+    """
+    def __init__(self, points, owners=None, indices=None, artists=None,
+                 points_per_cell=4):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if owners is None:
+            owners = np.zeros(len(points), dtype=np.int32)
+        if indices is None:
+            indices = np.arange(len(points), dtype=np.int32)
+        finite = np.isfinite(points).all(1)
+        points = points[finite]
+        owners = np.asarray(owners)[finite]
+        indices = np.asarray(indices)[finite]
+        self.artists = list(artists or [])
+
+        if len(points):
+            lower = points.min(0)
+            size = points.max(0) - lower
+        else:
+            lower = size = np.zeros(2)
+        area = max(size[0], 1.) * max(size[1], 1.)
+        cell_size = np.sqrt(area * points_per_cell / max(len(points), 1))
+        shape = np.maximum(np.ceil(size / cell_size), 1).astype(int)
+        self.origin = (float(lower[0]), float(lower[1]))
+        self.cell_size = float(cell_size)
+        self.shape = (int(shape[0]), int(shape[1]))
+
+        cells = self._cells(points)
+        order = np.argsort(cells, kind='mergesort')
+        counts = np.bincount(cells, minlength=self.shape[0] * self.shape[1])
+        self.starts = np.zeros(len(counts) + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.starts[1:])
+        self.points = points[order].astype(np.float32)
+        self.owners = owners[order].astype(np.int32)
+        self.indices = indices[order].astype(np.int32)
+
+    @classmethod
+    def from_artists(cls, artist_points, **kwargs):
+        """Build the index of the points of several artists
+
+        Parameters
+        ----------
+        artist_points : list
+            A list of (artist, points) pairs, points being the (N, 2)
+            display coordinates of the points of the artist, or of
+            (artist, points, indices) triples, indices being the (N,)
+            indices of the points within the data of the artist (by
+            default, 0 to N - 1).
+        """
+        artists = [entry[0] for entry in artist_points]
+        arrays = [np.asarray(entry[1], dtype=float).reshape(-1, 2)
+                  for entry in artist_points]
+        if not arrays:
+            return cls(np.zeros((0, 2)), artists=artists, **kwargs)
+        owners = np.concatenate([np.repeat(np.int32(i), len(points))
+                                 for i, points in enumerate(arrays)])
+        indices = np.concatenate([
+            np.asarray(entry[2], dtype=np.int32) if len(entry) > 2
+            else np.arange(len(points), dtype=np.int32)
+            for entry, points in zip(artist_points, arrays)])
+        return cls(np.concatenate(arrays), owners, indices, artists,
+                   **kwargs)
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def nbytes(self):
+        """The size of the arrays of the index, in bytes"""
+        return (self.starts.nbytes + self.points.nbytes
+                + self.owners.nbytes + self.indices.nbytes)
+
+    def _column_row(self, x, y):
+        """Return the grid cell containing (x, y), clipped to the grid"""
+        column = int(np.clip((x - self.origin[0]) // self.cell_size,
+                             0, self.shape[0] - 1))
+        row = int(np.clip((y - self.origin[1]) // self.cell_size,
+                          0, self.shape[1] - 1))
+        return column, row
+
+    def _cells(self, points):
+        columns = np.clip((points[:, 0] - self.origin[0]) // self.cell_size,
+                          0, self.shape[0] - 1).astype(np.intp)
+        rows = np.clip((points[:, 1] - self.origin[1]) // self.cell_size,
+                       0, self.shape[1] - 1).astype(np.intp)
+        return rows * self.shape[0] + columns
+
+    def _slices(self, columns, rows):
+        """Return the slices of the points of a box of cells
+
+        columns and rows are inclusive (first, last) ranges, clipped to the
+        grid.
+        """
+        first = max(columns[0], 0)
+        last = min(columns[1], self.shape[0] - 1)
+        if first > last:
+            return []
+        slices = []
+        last_row = min(rows[1], self.shape[1] - 1)
+        for row in range(max(rows[0], 0), last_row + 1):
+            cell = row * self.shape[0]
+            start = self.starts[cell + first]
+            stop = self.starts[cell + last + 1]
+            if stop > start:
+                slices.append(slice(start, stop))
+        return slices
+
+    def _select(self, slices):
+        if not slices:
+            return np.zeros(0, dtype=np.intp)
+        return np.concatenate([np.arange(s.start, s.stop) for s in slices])
+
+    def _result(self, position, distance=None):
+        artist = int(self.owners[position])
+        if artist < len(self.artists):
+            artist = self.artists[artist]
+        if distance is None:
+            return artist, int(self.indices[position])
+        return artist, int(self.indices[position]), float(distance)
+
+    def _distances(self, positions, x, y):
+        points = self.points[positions]
+        return np.hypot(points[:, 0] - x, points[:, 1] - y)
+
+    def nearest(self, x, y, max_distance=None):
+        """Return the point nearest to (x, y)
+
+        Parameters
+        ----------
+        x, y : float
+            The display coordinates of the query.
+        max_distance : float (optional)
+            Only consider points within this distance, in pixels.
+
+        Returns
+        -------
+        hit : tuple or None
+            The (artist, index, distance) of the nearest point, or None if
+            there is no point (within max_distance).
+        """
+        if not len(self):
+            return None
+        if max_distance is None:
+            max_distance = np.inf
+        column, row = self._column_row(x, y)
+        best, best_distance = None, np.inf
+        for ring in range(max(self.shape)):
+            # the points of this ring are at least ring - 1 cells away
+            bound = (ring - 1) * self.cell_size
+            if min(best_distance, max_distance) < bound:
+                break
+            if ring == 0:
+                slices = self._slices((column, column), (row, row))
+            else:
+                columns = (column - ring, column + ring)
+                slices = (self._slices(columns, (row - ring, row - ring))
+                          + self._slices(columns, (row + ring, row + ring)))
+                for side in (column - ring, column + ring):
+                    slices += self._slices((side, side),
+                                           (row - ring + 1, row + ring - 1))
+            positions = self._select(slices)
+            if len(positions):
+                distances = self._distances(positions, x, y)
+                i = distances.argmin()
+                if distances[i] < best_distance:
+                    best, best_distance = positions[i], distances[i]
+        if best is None or best_distance > max_distance:
+            return None
+        return self._result(best, best_distance)
+
+    def within(self, x, y, radius):
+        """Return the points within radius pixels of (x, y)
+
+        Returns
+        -------
+        hits : list
+            The (artist, index, distance) of the points, nearest first.
+        """
+        cells = self._cell_range(x - radius, x + radius,
+                                 y - radius, y + radius)
+        positions = self._select(self._slices(*cells))
+        distances = self._distances(positions, x, y)
+        keep = distances <= radius
+        positions, distances = positions[keep], distances[keep]
+        order = np.argsort(distances, kind='mergesort')
+        return [self._result(positions[i], distances[i]) for i in order]
+
+    def box(self, x0, y0, x1, y1):
+        """Return the (artist, index) of the points within a box"""
+        xmin, xmax = min(x0, x1), max(x0, x1)
+        ymin, ymax = min(y0, y1), max(y0, y1)
+        positions = self._select(self._slices(
+            *self._cell_range(xmin, xmax, ymin, ymax)))
+        points = self.points[positions]
+        keep = ((points[:, 0] >= xmin) & (points[:, 0] <= xmax)
+                & (points[:, 1] >= ymin) & (points[:, 1] <= ymax))
+        return [self._result(position) for position in positions[keep]]
+
+    def _cell_range(self, xmin, xmax, ymin, ymax):
+        """Return the (columns, rows) ranges of cells overlapping a box"""
+        x0, y0 = self.origin
+        columns = (int(np.floor((xmin - x0) / self.cell_size)),
+                   int(np.floor((xmax - x0) / self.cell_size)))
+        rows = (int(np.floor((ymin - y0) / self.cell_size)),
+                int(np.floor((ymax - y0) / self.cell_size)))
+        # points beyond the grid are stored in its border cells
+        columns = (min(columns[0], self.shape[0] - 1), max(columns[1], 0))
+        rows = (min(rows[0], self.shape[1] - 1), max(rows[1], 0))
+        return columns, rows
+
+    def to_dict(self, sidecar=None):
+        """Return a JSON-serializable description of the index
+
+        Parameters
+        ----------
+        sidecar : SidecarWriter object (optional)
+            If given, the arrays are written as binary typed-array files
+            (see mplexporter.sidecar), and referenced by URL.  Otherwise
+            they are included as lists.  Points are flattened as x0, y0,
+            x1, y1...
+        """
+        arrays = {'starts': (self.starts, '<i4'),
+                  'points': (self.points.ravel(), '<f4'),
+                  'owners': (self.owners, '<i4'),
+                  'indices': (self.indices, '<i4')}
+        description = {'origin': list(self.origin),
+                       'cell_size': self.cell_size,
+                       'shape': list(self.shape)}
+        for name, (array, dtype) in arrays.items():
+            if sidecar is None:
+                description[name] = array.tolist()
+            else:
+                description[name] = sidecar.write_array(array, dtype)
+        return description
@@ -0,0 +1,146 @@
+"""
+Interned Styles
+===============
+This submodule contains the style table used to intern style dictionaries:
+each distinct style is stored once as an immutable :class:`Style` record,
+identified by an integer id, so that renderers can emit a shared style
+definition once and refer to it from every element which uses it.
+"""
+import threading
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+import numpy as np
+
+
+def freeze(value):
+    """Return a hashable representation of a style value"""
+    if isinstance(value, np.ndarray):
+        return (value.shape, value.dtype.str, value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    else:
+        return value
+
+
+class Style(Mapping):
+    """An immutable style record
+
+    Style records are created by :meth:`StyleTable.intern`; two records from
+    the same table are equal if and only if they are the same object.
+
+    Attributes
+    ----------
+    id : int
+        The index of the style within its table.
+    """
+    __slots__ = ('id', '_items', '_key')
+
+    def __init__(self, id, items, key):
+        self.id = id
+        self._items = dict(items)
+        self._key = key
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def peek(self, key):
+        """Return the value for key (for compatibility with LazyStyle)"""
+        return self._items[key]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __eq__(self, other):
+        if isinstance(other, Style):
+            return self._key == other._key
+        return Mapping.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "Style({0}, {1})".format(self.id, self._items)
+
+
+class StyleTable(object):
+    """A table of the distinct styles used within an export"""
+    def __init__(self):
+        self.styles = []
+        self._index = {}
+        self._artist_index = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.styles)
+
+    def __iter__(self):
+        return iter(self.styles)
+
+    def __getitem__(self, id):
+        return self.styles[id]
+
+    def intern(self, style):
+        """Return the Style record for the given style mapping
+
+        Parameters
+        ----------
+        style : mapping
+            A style dictionary (or LazyStyle, whose fields are all computed).
+            The values must be hashable, or arrays and lists thereof.
+
+        Returns
+        -------
+        record : Style object
+            The unique record of this table with the same items as style.
+        """
+        if isinstance(style, Style) and self._index.get(style._key) is style:
+            return style
+        items = sorted((key, style[key]) for key in style)
+        key = tuple((name, freeze(value)) for name, value in items)
+        with self._lock:
+            record = self._index.get(key)
+            if record is None:
+                record = Style(len(self.styles), items, key)
+                self.styles.append(record)
+                self._index[key] = record
+        return record
+
+    def intern_artist(self, obj, fields, key):
+        """Return the Style record for the style of a matplotlib artist
+
+        Parameters
+        ----------
+        obj : matplotlib Artist
+            The artist the style describes.
+        fields : dictionary
+            A mapping of style keys to functions of ``obj`` computing the
+            value (see e.g. utils.LINE_STYLE).
+        key : function
+            A function of ``obj`` returning the raw properties which
+            determine its style (see e.g. utils.line_style_key).
+
+        Returns
+        -------
+        record : Style object
+            The record of the style.  Only the first artist with given raw
+            properties has its style computed; the others reuse its record.
+        """
+        raw = (key, freeze(key(obj)))
+        with self._lock:
+            record = self._artist_index.get(raw)
+        if record is None:
+            record = self.intern(dict((name, func(obj))
+                                      for name, func in fields.items()))
+            with self._lock:
+                self._artist_index[raw] = record
+        return record
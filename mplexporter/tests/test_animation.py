@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+
+from ..animation import export_animation, _equal
+from ..renderers import ExampleRenderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+
+
+def make_animation(frames):
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 50)
+    line, = ax.plot(x, np.sin(x), '-')
+    ax.plot(x, np.cos(x), 'o')
+    title = ax.set_title('')
+    lines = []
+
+    def update(i):
+        line.set_ydata(np.sin(x + i))
+        title.set_text('frame {0}'.format(i))
+        if i == 5:
+            lines.extend(ax.plot([0, 10], [0, 0], '-k'))
+        return [line, title] + lines
+
+    return FuncAnimation(fig, update, frames=frames, interval=40)
+
+
+def assert_same_events(events, expected):
+    assert [event.kind for event in events] == \
+        [event.kind for event in expected]
+    for event, other in zip(events, expected):
+        assert _equal(event.fields(), other.fields())
+
+
+def test_export_animation():
+    anim = make_animation(8)
+    stream = export_animation(anim, keyframe_interval=3)
+    assert len(stream) == 8
+    # frame 5 adds a line, which needs a keyframe
+    assert stream.keyframes() == [0, 3, 5]
+    assert stream.interval == 40
+
+    # deltas hold the changed fields only: the y column of the moving
+    # line, and the title of the axes
+    kind, changes = stream.frames[1]
+    assert kind == 'delta'
+    assert [sorted(fields) for index, fields in changes] == \
+        [['properties'], ['data']]
+    assert list(changes[0][1]['properties']) == ['title']
+    assert list(changes[1][1]['data']) == [1]
+
+    full = export_animation(make_animation(8), keyframe_interval=1)
+    assert full.keyframes() == list(range(8))
+    for i, events in enumerate(stream):
+        assert_same_events(events, full.events(i))
+        assert_same_events(stream.events(i), events)
+    assert stream.events(-1)[1].properties['title'] == 'frame 7'
+
+    size = len(json.dumps(stream.to_dict()))
+    assert size < 0.8 * len(json.dumps(full.to_dict()))
+
+    renderer = ExampleRenderer()
+    stream.replay(6, renderer)
+    assert renderer.output.count("draw line") == 2
+    assert "draw 50 markers" in renderer.output
@@ -0,0 +1,91 @@
+import json
+import time
+
+import pytest
+asyncio = pytest.importorskip('asyncio')
+
+from ..exporter import Exporter
+from ..asynchronous import AsyncExporter, stream_json
+from ..renderers import ExampleRenderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+class SlowRenderer(ExampleRenderer):
+    def draw_line(self, *args, **kwargs):
+        time.sleep(0.05)
+        ExampleRenderer.draw_line(self, *args, **kwargs)
+
+
+class Writer(object):
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def drain(self):
+        return asyncio.sleep(0)
+
+
+def run(future_factory):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(future_factory(loop))
+    finally:
+        loop.close()
+
+
+def test_concurrent_exports():
+    figures = []
+    for i in range(4):
+        fig, ax = plt.subplots()
+        ax.plot(range(10 * (i + 1)), '-k')
+        figures.append(fig)
+
+    with AsyncExporter(max_workers=2) as exporter:
+        def export(loop):
+            return asyncio.gather(*[
+                exporter.run(Exporter(ExampleRenderer(), close_mpl=False),
+                             fig, loop=loop) for fig in figures])
+        results = run(export)
+
+    for i, result in enumerate(results):
+        assert ("draw line with {0} points".format(10 * (i + 1))
+                in result.renderer.output)
+
+
+def test_timeout_cancels_export():
+    fig, ax = plt.subplots()
+    for i in range(20):
+        ax.plot(range(10), '-k')
+    renderer = SlowRenderer()
+
+    with AsyncExporter() as exporter:
+        with pytest.raises(asyncio.TimeoutError):
+            run(lambda loop: exporter.run(Exporter(renderer), fig,
+                                          timeout=0.1, loop=loop))
+    # the export stopped at the first draw event after the timeout
+    assert renderer.output.count("draw line") < 20
+
+
+def test_stream_json():
+    obj = {'data': [{'x': i, 'y': [i] * 10} for i in range(100)]}
+    writer = Writer()
+    nbytes = run(lambda loop: stream_json(obj, writer, chunksize=256,
+                                          loop=loop))
+    assert len(writer.chunks) > 1
+    assert nbytes == sum(len(chunk) for chunk in writer.chunks)
+    assert json.loads(b''.join(writer.chunks).decode('utf-8')) == obj
+
+
+def test_write_vega():
+    fig, ax = plt.subplots()
+    ax.plot(range(20), '-k')
+    writer = Writer()
+    with AsyncExporter() as exporter:
+        run(lambda loop: exporter.write_vega(fig, writer, loop=loop))
+    specification = json.loads(b''.join(writer.chunks).decode('utf-8'))
+    assert len(specification['marks']) == 1
@@ -1,5 +1,14 @@
+import os
+import sys
+import subprocess
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+
 from ..exporter import Exporter
-from ..renderers import ExampleRenderer
+from ..renderers import (ExampleRenderer, Renderer, get_renderer,
+                         available_renderers)
 
 import matplotlib
 matplotlib.use('Agg')
@@ -28,3 +37,87 @@ def test_fakerenderer():
     for line1, line2 in zip(renderer.output.strip().split(),
                             FAKE_OUTPUT.strip().split()):
         assert line1 == line2
+
+
+def test_memmap_line():
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        x = np.memmap(filename, dtype=float, mode='w+', shape=(1000,))
+        x[:] = np.linspace(0, 10, 1000)
+        fig, ax = plt.subplots()
+        ax.plot(x, x ** 2, '-k')
+
+        events = list(Exporter(ExampleRenderer(), chunksize=64,
+                               close_mpl=False).iter_events(fig))
+        data = events[2].data
+        assert_allclose(data, np.transpose([x, x ** 2]))
+        assert isinstance(data.values, np.memmap)
+
+        exporter = Exporter(ExampleRenderer(), chunk_threshold=10,
+                            chunksize=64)
+        assert_allclose(list(exporter.iter_events(fig))[2].data, data)
+        del x, data, events
+    finally:
+        os.remove(filename)
+
+
+def test_lazy_renderer_import():
+    code = ("import sys, mplexporter, mplexporter.renderers; "
+            "print(sorted(name for name, module in sys.modules.items() "
+            "if module is not None and ('plotly' in name or "
+            "name.startswith('mplexporter.renderers.'))))")
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.decode().strip() == "['mplexporter.renderers.base']"
+
+
+def test_get_renderer():
+    assert get_renderer('example') is ExampleRenderer
+    assert 'vega' in available_renderers()
+
+
+def test_batched_texts():
+    class TextRecorder(Renderer):
+        def __init__(self):
+            self.texts = []
+            self.batches = []
+
+        def draw_text(self, text, position, coordinates, style, mplobj=None):
+            self.texts.append((text, tuple(position), coordinates))
+
+    class BatchRecorder(TextRecorder):
+        def draw_texts(self, texts, positions, coordinates, styles,
+                       mplobj=None):
+            self.batches.append((texts, np.asarray(positions), coordinates,
+                                 styles))
+
+    fig, ax = plt.subplots()
+    ax.text(1, 2, "a")
+    ax.text(3, 4, "b")
+    ax.text(5, 6, "c", color='red')
+    ax.text(0.5, 0.5, "d", transform=ax.transAxes)
+    ax.set_xlim(0, 10)
+    ax.set_ylim(0, 10)
+
+    renderer = TextRecorder()
+    Exporter(renderer, close_mpl=False).run(fig)
+    assert [text[0] for text in renderer.texts] == ["a", "b", "c", "d"]
+    assert renderer.texts[1] == ("b", (3, 4), "data")
+
+    renderer = BatchRecorder()
+    Exporter(renderer).run(fig)
+    assert renderer.texts == []
+    assert len(renderer.batches) == 2
+    texts, positions, coordinates, styles = renderer.batches[0]
+    assert texts == ["a", "b", "c"]
+    assert coordinates == "data"
+    assert positions.tolist() == [[1, 2], [3, 4], [5, 6]]
+    assert styles[0] == styles[1] and styles[1] != styles[2]
+    assert styles[2]['color'] == '#FF0000'
+    assert all(type(style) is dict for style in styles)
+    assert renderer.batches[1][2] == "figure"
+
+    renderer = BatchRecorder()
+    Exporter(renderer, intern_styles=True).run(fig)
+    styles = renderer.batches[0][3]
+    assert styles[0] is styles[1] and styles[1] is not styles[2]
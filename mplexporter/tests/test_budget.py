@@ -0,0 +1,96 @@
+import base64
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from ..exporter import Exporter
+from ..budget import ExportBudget, allocate, simplify
+from ..instrument import Instrumentation
+from ..renderers import ExampleRenderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def test_simplify():
+    points = np.array([[0, 0], [0.1, 0.1], [0.2, 0.2], [3, 3],
+                       [np.nan, np.nan], [3.1, 3.1], [0.3, 0.3]])
+    assert_equal(simplify(points, 1), [0, 2, 3, 4, 5, 6])
+    assert_equal(simplify(points, 1, ordered=False), [4, 5, 6])
+
+
+def budget_events(fig, budget):
+    exporter = Exporter(None, close_mpl=False, budget=budget)
+    events = [event for event in exporter.iter_events(fig)
+              if event.kind in ('line', 'markers', 'collection', 'image')]
+    return events, exporter.stats['budget']
+
+
+def test_export_budget():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 100000)
+    ax.plot(x, np.sin(x), '-')
+    ax.scatter(np.arange(10000) % 100, np.arange(10000) // 100)
+
+    # within budget
+    events, stats = budget_events(fig, ExportBudget(points=200000))
+    assert stats['steps'] == [] and stats['points'] == 100000 + 10000 + \
+        sum(len(path.vertices) for path in ax.collections[0].get_paths())
+    assert len(events[0].data) == 100000
+
+    # the line is simplified; the scatter points are decimated
+    events, stats = budget_events(fig, ExportBudget(points=5000,
+                                                    allocate=False))
+    steps = [(step['kind'], step['step']) for step in stats['steps']]
+    assert steps == [('line', 'simplify'), ('collection', 'simplify'),
+                     ('collection', 'decimate')]
+    assert len(events[0].data) == stats['steps'][0]['output'] < 5000
+    assert stats['points'] <= 5000
+    assert len(events[1].offsets) < stats['steps'][2]['output']
+
+    # nothing left to output: the artists are rasterized
+    events, stats = budget_events(fig, ExportBudget(time=0))
+    assert [event.kind for event in events] == ['image', 'image']
+    assert stats['steps'][0]['reason'] == 'time'
+    assert base64.b64decode(events[0].imdata)[1:4] == b'PNG'
+    assert events[0].extent == ax.get_xlim() + ax.get_ylim()
+
+
+def test_allocate():
+    assert_equal(allocate(1000, [100, 5000, 5000], [10, 10, 30]),
+                 [100, 225, 675])
+    assert_equal(allocate(1000, [100, 200], [10, 10]), [100, 200])
+
+
+def test_allocate_points():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 20000)
+    long_line, = ax.plot(x, np.sin(x), '-o')
+    short_line, = ax.plot([1, 2], [0, 0], '-')
+    # a long series in a small part of the axes
+    corner, = ax.plot(np.linspace(0, 1, 20000), np.zeros(20000), '-o')
+
+    events, stats = budget_events(fig, ExportBudget(points=2000))
+    steps = dict((step['label'], step) for step in stats['steps'])
+    assert short_line.get_label() not in steps
+    assert steps[long_line.get_label()]['allowed'] > \
+        2 * steps[corner.get_label()]['allowed']
+    assert sum(len(event.data) for event in events
+               if event.kind == 'line') <= 2000
+
+
+def test_budget_instrumented():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 10, 10000)
+    ax.plot(x, np.sin(x), '-')
+
+    instrument = Instrumentation()
+    exporter = Exporter(ExampleRenderer(), budget=ExportBudget(points=100),
+                        instrument=instrument)
+    exporter.run(fig)
+    stages = instrument.report()
+    steps = exporter.stats['budget']['steps']
+    assert steps[0]['step'] == 'simplify'
+    assert stages['exporter.simplify'].calls == 1
+    assert stages['exporter.simplify'].points == steps[0]['output']
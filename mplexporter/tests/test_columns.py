@@ -0,0 +1,37 @@
+import numpy as np
+
+from ..columns import ColumnStore
+from ..exporter import Exporter
+from ..renderers import VegaRenderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def test_column_store():
+    store = ColumnStore()
+    x = np.arange(10.)
+    assert store.key(x) == 'c0'
+    assert store.key(x) == 'c0'
+    assert store.key(x.copy()) == 'c0'
+    assert store.key(x[::-1]) == 'c1'
+    assert store.key(np.arange(10)) == 'c2'
+    assert len(store) == 3
+
+
+def test_vega_shared_table():
+    x = np.linspace(0, 1, 50)
+    fig, ax = plt.subplots()
+    for i in range(4):
+        ax.plot(x, x ** i, '-o')
+    ax.plot(x[::-1], x, '-')
+
+    renderer = VegaRenderer()
+    Exporter(renderer).run(fig)
+
+    assert len(renderer.marks) == 9
+    assert len(renderer.data) == 2
+    # the first table holds x and the three other distinct y columns
+    assert len(renderer.data[0]['values'][0]) == 4
+    assert len(set(mark['from']['data'] for mark in renderer.marks)) == 2
@@ -0,0 +1,60 @@
+import pickle
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ..exporter import Exporter
+from ..events import replay
+from ..renderers import ExampleRenderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def test_event_stream():
+    fig, ax = plt.subplots()
+    ax.plot(range(20), '-k')
+    ax.plot(range(10), '.k')
+
+    events = list(Exporter(ExampleRenderer()).iter_events(fig))
+    kinds = [event.kind for event in events]
+    assert kinds == ['open_figure', 'open_axes', 'line', 'markers',
+                     'close_axes', 'close_figure']
+
+    line = events[2]
+    assert not line.is_computed('data')
+    assert_allclose(line.data[:, 1], range(20))
+    assert line.is_computed('data')
+
+
+def test_replay():
+    fig, ax = plt.subplots()
+    ax.plot(range(20), '-k')
+    ax.plot(range(10), '.k')
+
+    renderer1 = ExampleRenderer()
+    Exporter(renderer1, close_mpl=False).run(fig)
+
+    renderer2 = ExampleRenderer()
+    replay(Exporter(renderer2).iter_events(fig), renderer2)
+
+    assert renderer1.output == renderer2.output
+
+
+def test_detached_events():
+    fig, ax = plt.subplots()
+    ax.plot(range(20), '-k')
+
+    events = [event.detached()
+              for event in Exporter(ExampleRenderer()).iter_events(fig)]
+    assert 'column_store' not in events[0].keys()
+    line = pickle.loads(pickle.dumps(events[2], 2))
+    assert line.mplobj is None
+    assert isinstance(line.data, np.ndarray)
+    assert isinstance(line.style, dict)
+    assert_allclose(line.data[:, 1], range(20))
+
+    renderer = ExampleRenderer()
+    replay(events, renderer)
+    assert "draw line with 20 points" in renderer.output
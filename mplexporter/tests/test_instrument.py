@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from ..exporter import Exporter
+from ..instrument import Instrumentation, tracemalloc
+from ..renderers import ExampleRenderer, VegaRenderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def test_instrumentation():
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(100), '-k')
+    ax.plot(np.arange(10), 'ok')
+
+    measurements = []
+    instrument = Instrumentation(
+        sinks=[lambda name, m: measurements.append(name)])
+    renderer = VegaRenderer()
+    Exporter(renderer, instrument=instrument).run(fig)
+    report = instrument.report()
+
+    assert report['exporter.savefig'].calls == 1
+    assert report['exporter.process_transform'].points == 110
+    assert report['renderer.draw_line'].calls == 1
+    assert report['renderer.draw_markers'].points == 10
+    assert report['renderer.open_figure'].calls == 1
+    assert 'exporter.style' in report
+    assert 'renderer.draw_line' in str(report)
+    assert len(measurements) == sum(stats['calls'] for stats
+                                    in report.as_dict().values())
+
+    # the renderer methods are restored after the export
+    assert 'draw_line' not in vars(renderer)
+
+
+def test_lazy_stages_not_recorded():
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(100), '-k')
+
+    instrument = Instrumentation()
+    Exporter(ExampleRenderer(), lazy=True,
+             instrument=instrument).run(fig)
+    report = instrument.report()
+
+    # the example renderer never needs the transformed data
+    assert 'exporter.process_transform' not in report
+    assert report['renderer.draw_line'].points == 100
+
+
+def test_instrument_renderer_restores_methods():
+    renderer = ExampleRenderer()
+    own_draw_line = lambda *args, **kwargs: None
+    renderer.draw_line = own_draw_line
+
+    instrument = Instrumentation()
+    with instrument.instrument_renderer(renderer):
+        assert renderer.draw_line is not own_draw_line
+    assert renderer.draw_line is own_draw_line
+    assert 'draw_path' not in vars(renderer)
+
+
+@pytest.mark.skipif(tracemalloc is None or
+                    not hasattr(tracemalloc, 'reset_peak'),
+                    reason="requires tracemalloc.reset_peak")
+def test_trace_memory_peak():
+    instrument = Instrumentation(trace_memory=True)
+    instrument.start()
+    try:
+        with instrument.measure('outer'):
+            with instrument.measure('inner'):
+                data = np.ones(10 ** 6)
+                del data
+            with instrument.measure('small'):
+                pass
+    finally:
+        instrument.stop()
+    stages = instrument.report()
+    # the temporary array is counted by the stages enclosing it
+    assert stages['inner'].bytes >= 8 * 10 ** 6
+    assert stages['outer'].bytes >= 8 * 10 ** 6
+    assert 0 <= stages['small'].bytes < 10 ** 5
@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ..exporter import Exporter
+from ..events import Deferred
+from ..lazy import AccessLog, LazyArray, LazyStyle
+from ..renderers import ExampleRenderer, Renderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def test_lazy_array():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return np.arange(10.).reshape(5, 2)
+
+    data = LazyArray(Deferred(compute), shape=(5, 2))
+    assert data.shape[0] == 5
+    assert not calls
+    assert_allclose(data[:, 0], [0, 2, 4, 6, 8])
+    assert_allclose(np.asarray(data).sum(), 45)
+    assert len(calls) == 1
+
+
+def test_lazy_style():
+    log = AccessLog()
+    style = LazyStyle(None, {'color': lambda obj: 'red',
+                             'width': lambda obj: 1 / 0},
+                      log=log, kind='line')
+    assert style['color'] == 'red'
+    assert log.unused('line', 'style') == ['width']
+
+
+def test_access_log():
+    fig, ax = plt.subplots()
+    ax.plot(range(20), '-k')
+    ax.plot(range(10), '.k')
+
+    exporter = Exporter(ExampleRenderer(), track_access=True)
+    exporter.run(fig)
+
+    log = exporter.access_log
+    # the example renderer only needs the number of points
+    assert log.consumed[('line', 'data')] == {'shape': 1}
+    assert ('line', 'style') not in log.consumed
+    assert 'markerpath' in log.unused('markers', 'style')
+
+
+class PlainRenderer(Renderer):
+    """A renderer using its arguments as arrays and dictionaries"""
+    def __init__(self):
+        self.output = []
+
+    def draw_line(self, data, coordinates, style, mplobj=None):
+        assert isinstance(data, np.ndarray)
+        style = style.copy()
+        style['data'] = (data * 2).tolist()
+        self.output.append(json.dumps(style))
+
+    def draw_markers(self, data, coordinates, style, mplobj=None):
+        assert isinstance(data, np.ndarray)
+        style = dict(style, markerpath=None, data=(data + 1).tolist())
+        self.output.append(json.dumps(style))
+
+
+def test_plain_payloads():
+    fig, ax = plt.subplots()
+    ax.plot(range(5), '-ok')
+
+    renderer = PlainRenderer()
+    Exporter(renderer).run(fig)
+    line, markers = [json.loads(output) for output in renderer.output]
+    assert line['color'] == '#000000'
+    assert len(line['data']) == len(markers['data']) == 5
+
+    # lazy payloads are opt-in, and copy to plain dictionaries
+    style = LazyStyle(None, {'color': lambda obj: 'red'})
+    assert json.dumps(style.copy()) == '{"color": "red"}'
@@ -0,0 +1,82 @@
+import numpy as np
+from numpy.testing import assert_equal
+
+from ..exporter import Exporter
+from ..paths import PathCache
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
+
+
+def collection_paths(exporter, fig):
+    return [event.paths for event in exporter.iter_events(fig)
+            if event.kind == 'collection']
+
+
+def contour_figure():
+    x, y = np.meshgrid(np.linspace(-3, 3, 50), np.linspace(-3, 3, 50))
+    fig, ax = plt.subplots()
+    ax.contourf(x, y, np.exp(-x ** 2 - y ** 2), 5)
+    return fig
+
+
+def test_path_cache():
+    expected = collection_paths(Exporter(None, path_cache=False),
+                                contour_figure())
+
+    cache = PathCache()
+    exporter = Exporter(None, path_cache=cache)
+    for i in range(2):
+        # the contours are rebuilt identically: new paths, equal content
+        paths = collection_paths(exporter, contour_figure())
+        stats = exporter.stats['path_cache']
+        assert_equal(paths, expected)
+        assert stats['misses'] == (0 if i else stats['paths'])
+    assert stats['hits'] == stats['paths'] == len(cache) > 0
+    assert not paths[0][0][0].flags.writeable
+
+    # repeated and equal paths within a collection
+    fig, ax = plt.subplots()
+    square = Path([[0, 0], [1, 0], [1, 1], [0, 0]])
+    ax.add_collection(PathCollection([square, square, Path(square.vertices)]))
+    exporter = Exporter(None, path_cache=PathCache())
+    paths = collection_paths(exporter, fig)[0]
+    assert exporter.stats['path_cache'] == {'paths': 3, 'unique': 2,
+                                            'hits': 1, 'misses': 1}
+    assert paths[0] is paths[1]
+    assert_equal(paths[2], paths[0])
+
+
+def test_default_path_cache():
+    # each exporter has its own cache, kept from one export to the next
+    exporter = Exporter(None)
+    collection_paths(exporter, contour_figure())
+    paths = exporter.stats['path_cache']['paths']
+    collection_paths(exporter, contour_figure())
+    assert exporter.stats['path_cache']['hits'] == paths
+    other = Exporter(None)
+    assert other.path_cache is not exporter.path_cache
+    collection_paths(other, contour_figure())
+    assert other.stats['path_cache']['misses'] == paths
+
+
+def test_path_cache_eviction():
+    cache = PathCache(max_vertices=10)
+    paths = [Path(np.random.random((4, 2))) for i in range(5)]
+    for path in paths:
+        cache.get(path)
+    assert len(cache) == 2 and cache.vertices == 8
+    assert cache.evictions == 3
+    cache.get(paths[3])
+    cache.get(paths[0])
+    # the least recently used entry was evicted
+    assert cache.hits == 1 and cache.evictions == 4
+    cache.get(paths[3])
+    assert cache.hits == 2
+    cache.get(Path(np.random.random((20, 2))))
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0 and cache.vertices == 0
@@ -1,5 +1,12 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
 from ..exporter import Exporter
-from ..renderers import PlotlyRenderer
+from ..renderers import PlotlyRenderer, PlotlyHTML
+from ..sidecar import SidecarWriter
 
 import matplotlib
 matplotlib.use('Agg')
@@ -47,6 +54,26 @@ def test_subplots():
     assert equivalent, msg
 
 
+def test_sidecar_html():
+    fig, ax = plt.subplots()
+    ax.plot(range(10), '-k')
+    ax.plot(range(10), 'ok')
+    renderer = PlotlyRenderer()
+    Exporter(renderer).run(fig)
+
+    directory = tempfile.mkdtemp()
+    try:
+        sidecar = SidecarWriter(os.path.join(directory, 'figure_files'))
+        html = PlotlyHTML(renderer).html(sidecar)
+        # x and y are equal, and shared by both traces: one file
+        assert len(sidecar.files) == 1
+        assert html.count('figure_files/') == 4
+        values = np.fromfile(sidecar.files[0], dtype='<f8')
+        assert values.tolist() == list(range(10))
+    finally:
+        shutil.rmtree(directory)
+
+
 def compare_dict(dict1, dict2, equivalent=True, msg='', tol_digits=10):
     for key in dict1:
         if key not in dict2:
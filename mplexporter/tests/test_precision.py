@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from ..exporter import Exporter
+from ..precision import PrecisionPolicy, shortest_float64
+from ..renderers import VegaRenderer, PlotlyRenderer
+from ..renderers.vega_renderer import VegaHTML
+from ..renderers.plotly import PlotlyHTML
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def test_precision_policy():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 1, 1000)
+    line, = ax.plot(x, np.sin(x), '-k')
+    xydata = line.get_xydata().copy()
+
+    renderer = VegaRenderer()
+    exporter = Exporter(renderer, precision=PrecisionPolicy(measure=True))
+    exporter.run(fig)
+
+    # a unit range over a few hundred pixels: 1/10 pixel needs 4 decimals
+    assert PrecisionPolicy().decimals(ax, 'data') == (4, 4)
+    values = renderer.data[0]['values']
+    assert_allclose([v['x'] for v in values], xydata[:, 0], atol=1E-4)
+    assert_allclose(line.get_xydata(), xydata)
+
+    stats = exporter.stats['precision']
+    assert stats['values'] == 2000
+    assert stats['text_bytes_after'] < stats['text_bytes_before'] / 2
+
+
+def test_float32():
+    data = np.random.random((10, 2))
+    stats = PrecisionPolicy.new_stats()
+    result = PrecisionPolicy(pixel_fraction=None,
+                             dtype=np.float32).apply(data, None, 'figure',
+                                                     stats)
+    assert result.dtype == np.float32
+    assert stats['binary_bytes_after'] * 2 == stats['binary_bytes_before']
+
+
+def test_float32_renderers():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 1, 100)
+    ax.plot(x, np.sin(x), '-k')
+    ax.plot(x, np.cos(x), 'or')
+    policy = PrecisionPolicy(dtype=np.float32)
+
+    vega = VegaRenderer()
+    Exporter(vega, close_mpl=False, precision=policy).run(fig)
+    assert 'table001' in VegaHTML(vega).html()
+    assert_allclose([row['x'] for row in vega.data[0]['values']], x,
+                    atol=1E-4)
+
+    plotly = PlotlyRenderer()
+    Exporter(plotly, precision=policy).run(fig)
+    assert 'Plotly' in PlotlyHTML(plotly).html()
+    assert_allclose(plotly.data[1]['y'], np.cos(x), atol=1E-4)
+
+
+def test_float32_json():
+    values = np.array([0.12, -3.3, 1E-7, 123456.7, 0, np.nan, 7E20])
+    assert_equal(shortest_float64(values.astype(np.float32)), values)
+
+    fig, ax = plt.subplots()
+    ax.plot([0.12, 0.5, 2.25], [1.1, 2.2, 3.3], '-k')
+    policy = PrecisionPolicy(pixel_fraction=None, dtype=np.float32)
+
+    plotly = PlotlyRenderer()
+    Exporter(plotly, precision=policy).run(fig)
+    assert json.dumps(plotly.data[0]['x']) == '[0.12, 0.5, 2.25]'
+    assert json.dumps(plotly.data[0]['y']) == '[1.1, 2.2, 3.3]'
+
+    vega = VegaRenderer()
+    Exporter(vega, precision=policy).run(fig)
+    assert '0.11999' not in json.dumps(vega.data)
@@ -0,0 +1,54 @@
+from ..exporter import Exporter
+from ..prune import PrunePolicy
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def make_figure():
+    fig, (ax, hidden_ax) = plt.subplots(2)
+    ax.plot(range(10), '-k')
+    ax.plot(range(10), '-k', visible=False)
+    ax.plot([], [], '-k')
+    ax.plot(range(10), '-k', alpha=0)
+    ax.plot(range(10), 'o', color=(1, 0, 0, 0), markeredgecolor='none')
+    ax.text(0, 0, 'shown')
+    ax.text(0, 1, 'hidden', visible=False)
+    ax.text(0, 2, 'ghost', color='none')
+    ax.scatter([], [])
+    ax.scatter(range(3), range(3))
+    ax.bar([1], [1], color='none', edgecolor='none')
+    ax.bar([2], [1], color='none', edgecolor='none', hatch='/')
+    hidden_ax.plot(range(10))
+    hidden_ax.set_visible(False)
+    return fig
+
+
+def kinds(exporter, fig):
+    return [event.kind for event in exporter.iter_events(fig)
+            if event.kind not in ('open_figure', 'close_figure')]
+
+
+def test_prune():
+    fig = make_figure()
+
+    exporter = Exporter(None, close_mpl=False)
+    assert kinds(exporter, fig) == ['open_axes', 'line', 'texts', 'path',
+                                    'collection', 'close_axes']
+    # the reasons count both the axes and the artists skipped
+    assert exporter.stats['prune'] == {'axes': 1, 'artists': 8,
+                                       'invisible': 3, 'empty': 2,
+                                       'transparent': 4}
+    texts = [event for event in exporter.iter_events(fig)
+             if event.kind == 'texts']
+    assert texts[0].texts == ['shown']
+
+    exporter = Exporter(None, close_mpl=False,
+                        prune=PrunePolicy(transparent=False))
+    assert kinds(exporter, fig).count('line') == 2
+    assert exporter.stats['prune']['transparent'] == 0
+
+    exporter = Exporter(None, close_mpl=False, prune=False)
+    assert kinds(exporter, fig).count('open_axes') == 2
+    assert 'prune' not in exporter.stats
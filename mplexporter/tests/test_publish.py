@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from ..renderers.plotly import (PlotlyPublisher, UploadError, fig_to_plotly,
+                                figs_to_plotly)
+from ..renderers.plotly.mock_server import MockPlotlyServer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+FIGURE = ([{'x': [0, 1], 'y': [1, 0], 'mode': 'lines'}], {'width': 400})
+
+
+def test_publish_batch():
+    outbox = tempfile.mkdtemp()
+    try:
+        with MockPlotlyServer(latency=0.01, failures=2) as server:
+            with PlotlyPublisher('user', 'key', server=server.url,
+                                 max_workers=3, backoff=0.01,
+                                 outbox=outbox) as publisher:
+                results = publisher.publish([FIGURE] * 6, filename='batch')
+                assert publisher.pending() == []
+            assert len(set(result['url'] for result in results)) == 6
+            assert len(server.requests) == 6
+            assert len(server.connections) <= 3
+            request = server.requests[0]
+            assert request['args'] == FIGURE[0]
+            assert request['kwargs'] == {'layout': FIGURE[1],
+                                         'filename': 'batch'}
+
+            # missing credentials are not retried
+            publisher = PlotlyPublisher('user', '', server=server.url)
+            try:
+                publisher.upload(FIGURE)
+            except UploadError as err:
+                assert 'credentials' in str(err)
+            else:
+                assert False, "UploadError not raised"
+            publisher.close()
+    finally:
+        shutil.rmtree(outbox)
+
+
+def test_publish_batches_reuse_connections():
+    with MockPlotlyServer() as server:
+        with PlotlyPublisher('user', 'key', server=server.url,
+                             max_workers=2) as publisher:
+            for i in range(4):
+                results = publisher.publish([FIGURE] * 3)
+                assert not any(isinstance(result, UploadError)
+                               for result in results)
+            pool = publisher._pool
+        assert publisher._pool is None
+        assert len(server.requests) == 12
+        # the two workers keep their connections from batch to batch
+        assert len(server.connections) <= 2
+    assert all(not thread.is_alive() for thread in pool._pool)
+
+
+def test_outbox():
+    outbox = tempfile.mkdtemp()
+    try:
+        server = MockPlotlyServer().start()
+        url = server.url
+        server.stop()
+        publisher = PlotlyPublisher('user', 'key', server=url, retries=1,
+                                    backoff=0, outbox=outbox)
+        results = publisher.publish([FIGURE] * 2)
+        assert all(isinstance(result, UploadError) for result in results)
+        assert len(publisher.pending()) == 2
+
+        # another publisher, e.g. in a new process, sends them
+        with MockPlotlyServer() as server:
+            publisher = PlotlyPublisher('user', 'key', server=server.url,
+                                        outbox=outbox)
+            results = publisher.flush()
+            assert [result['error'] for result in results] == ['', '']
+            assert publisher.pending() == []
+            assert len(server.requests) == 2
+    finally:
+        shutil.rmtree(outbox)
+
+
+def test_no_duplicate_uploads():
+    outbox = tempfile.mkdtemp()
+    try:
+        # the connection is lost after the server stored the figure
+        with MockPlotlyServer(drops=1) as server:
+            publisher = PlotlyPublisher('user', 'key', server=server.url,
+                                        backoff=0, outbox=outbox)
+            result, = publisher.publish([FIGURE])
+            assert isinstance(result, UploadError) and result.sent
+            assert len(server.requests) == 1
+            # the figure is not sent again by a flush
+            assert publisher.pending() == []
+            assert publisher.flush() == []
+            assert len(server.requests) == 1
+            assert [name.endswith('.json.sending')
+                    for name in os.listdir(outbox)] == [True]
+            publisher.close()
+        shutil.rmtree(outbox)
+
+        # publishers flushing the same outbox send each figure once
+        outbox = tempfile.mkdtemp()
+        server = MockPlotlyServer().start()
+        url = server.url
+        server.stop()
+        publisher = PlotlyPublisher('user', 'key', server=url, retries=0,
+                                    outbox=outbox)
+        publisher.publish([FIGURE] * 8)
+        assert len(publisher.pending()) == 8
+
+        with MockPlotlyServer(latency=0.01) as server:
+            publishers = [PlotlyPublisher('user', 'key', server=server.url,
+                                          max_workers=2, outbox=outbox)
+                          for i in range(3)]
+            results = []
+            threads = [threading.Thread(
+                target=lambda p=p: results.extend(p.flush()))
+                for p in publishers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            for p in publishers:
+                p.close()
+            assert len(results) == 8
+            assert len(server.requests) == 8
+            assert os.listdir(outbox) == []
+    finally:
+        shutil.rmtree(outbox)
+
+
+def test_fig_to_plotly_publisher():
+    figs = []
+    for i in range(3):
+        fig, ax = plt.subplots()
+        ax.plot(range(10), '-k')
+        figs.append(fig)
+
+    with MockPlotlyServer() as server:
+        with PlotlyPublisher('user', 'key', server=server.url) as publisher:
+            url = fig_to_plotly(figs[0], publisher=publisher)
+            results = figs_to_plotly(figs[1:], publisher)
+        assert url.startswith(server.url)
+        assert len(results) == 2
+        assert server.requests[0]['args'][0]['y'] == list(range(10))
@@ -0,0 +1,123 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import numpy as np
+
+from ..exporter import Exporter
+from ..events import replay
+from ..recording import load, record
+from ..renderers import Renderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def normalize(value):
+    if isinstance(value, dict):
+        return sorted((key, normalize(item)) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    elif isinstance(value, np.ndarray) or hasattr(value, 'known_shape'):
+        return normalize(np.asarray(value).tolist())
+    elif hasattr(value, 'keys'):
+        return normalize(dict((key, value[key]) for key in value))
+    return value
+
+
+class CallRecorder(Renderer):
+    def __init__(self):
+        self.calls = []
+
+    def __getattribute__(self, name):
+        if name in ('open_figure', 'open_axes', 'draw_line', 'draw_markers',
+                    'draw_path', 'draw_path_collection', 'draw_text',
+                    'draw_image'):
+            def method(*args, **kwargs):
+                kwargs.pop('mplobj', None)
+                self.calls.append((name, normalize(args[1:]),
+                                   normalize(kwargs)))
+            return method
+        return Renderer.__getattribute__(self, name)
+
+
+def make_figure():
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(100), np.sin(np.arange(100)), '-or')
+    ax.scatter(np.random.random(20), np.random.random(20),
+               c=np.random.random(20))
+    ax.add_patch(plt.Circle((5, 0), 2))
+    ax.text(10, 0.5, "label")
+    ax.imshow(np.random.random((8, 8)), extent=(0, 10, 0, 1))
+    ax.set_xlabel("x")
+    return fig
+
+
+def test_record_and_load():
+    fig = make_figure()
+    direct = CallRecorder()
+    Exporter(direct, close_mpl=False).run(fig)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'figure.mplx')
+        record(fig, path)
+        for mmap in [True, False]:
+            events = load(path, mmap=mmap)
+            line = [event for event in events if event.kind == 'line'][0]
+            assert line.mplobj is None
+            assert line.data.ctypes.data % 64 == 0
+            assert isinstance(line.data, np.memmap) == mmap
+
+            replayed = CallRecorder()
+            replay(events, replayed)
+            assert replayed.calls == direct.calls
+            del events, line
+        with open(path, 'rb') as f:
+            assert len(load(f)) == len(direct.calls) + 2
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+REPLAY_WITHOUT_MATPLOTLIB = """
+import sys
+sys.modules['matplotlib'] = None
+from mplexporter.events import replay
+from mplexporter.recording import load
+from mplexporter.renderers import ExampleRenderer
+
+class PathRenderer(ExampleRenderer):
+    def draw_path(self, data, coordinates, pathcodes, style, offset=None,
+                  offset_coordinates="data", mplobj=None):
+        self.output += "    draw path {0} at {1}\\n".format(
+            style['facecolor'], list(offset))
+
+renderer = PathRenderer()
+replay(load(sys.argv[1]), renderer)
+print(renderer.output)
+"""
+
+
+def test_replay_without_matplotlib():
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(20), '-k')
+    ax.plot(np.arange(10), 'ok')
+    ax.scatter([1, 2, 3], [3, 2, 1], c='red')
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'figure.mplx')
+        record(fig, path)
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        output = subprocess.check_output(
+            [sys.executable, '-c', REPLAY_WITHOUT_MATPLOTLIB, path], cwd=root)
+    finally:
+        shutil.rmtree(tmpdir)
+    output = output.decode()
+    assert "draw line with 20 points" in output
+    assert "draw 10 markers" in output
+    assert output.count("draw path #FF0000") == 3
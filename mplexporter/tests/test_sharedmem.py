@@ -0,0 +1,59 @@
+import os
+import pickle
+import multiprocessing
+
+import numpy as np
+import pytest
+pytest.importorskip('multiprocessing.shared_memory')
+
+from ..exporter import Exporter
+from ..sharedmem import SharedExport, export_shared
+from ..renderers import ExampleRenderer
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def make_figure(n):
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.plot(np.arange(n), np.sin(np.arange(n)), '-k')
+    ax.plot(np.arange(10), 'ok')
+    return fig
+
+
+def export_in_worker(n):
+    return export_shared(make_figure(n))
+
+
+def test_shared_export_in_pool():
+    with multiprocessing.Pool(1) as pool:
+        shared = pool.apply(export_in_worker, (10000,))
+    assert shared.nbytes >= 10000 * 2 * 8
+    name = shared.name
+
+    renderer = ExampleRenderer()
+    shared.replay(renderer)
+    expected = ExampleRenderer()
+    Exporter(expected).run(make_figure(10000))
+    assert renderer.output == expected.output
+
+    # the line data is a view of the block, which is already unlinked
+    line = [event for event in shared.attach() if event.kind == 'line'][0]
+    assert not line.data.flags.owndata
+    assert line.data.shape == (10000, 2)
+    assert not os.path.exists('/dev/shm/' + name)
+
+
+def test_unattached_block_is_removed():
+    events = Exporter(None, close_mpl=False).iter_events(make_figure(1000))
+    shared = SharedExport([event.detached() for event in events])
+    copy = pickle.loads(pickle.dumps(shared))
+    del shared
+    assert os.path.exists('/dev/shm/' + copy.name)
+    name = copy.name
+    del copy
+    assert not os.path.exists('/dev/shm/' + name)
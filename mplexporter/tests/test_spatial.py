@@ -0,0 +1,85 @@
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ..budget import ExportBudget
+from ..exporter import Exporter
+from ..spatial import SpatialIndex
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def test_spatial_queries():
+    rng = np.random.RandomState(0)
+    points = np.vstack([rng.normal(100, 30, (500, 2)),
+                        rng.uniform(0, 400, (500, 2)), [[np.nan, 1]]])
+    index = SpatialIndex(points)
+    assert len(index) == 1000
+    assert index.starts[-1] == 1000
+
+    points = points[:1000]
+    for x, y in rng.uniform(-50, 450, (50, 2)):
+        distances = np.hypot(points[:, 0] - x, points[:, 1] - y)
+        artist, i, distance = index.nearest(x, y)
+        assert_allclose(distance, distances.min(), atol=1E-3)
+        assert index.nearest(x, y, max_distance=distances.min() / 2) is None
+
+        hits = index.within(x, y, 20)
+        assert sorted(i for artist, i, d in hits) == \
+            sorted(np.where(distances <= 20)[0])
+
+    hits = index.box(150, 50, 50, 150)
+    inside = np.where((abs(points - 100) <= 50).all(1))[0]
+    assert sorted(i for artist, i in hits) == sorted(inside)
+
+
+def test_exporter_spatial_index():
+    fig, ax = plt.subplots()
+    line, = ax.plot([0, 1, 2], [0, 1, 0], '-o')
+    scatter = ax.scatter([0.5, 1.5], [0.2, 0.8])
+    ax.plot([0, 2], [1, 1], transform=ax.transAxes)
+
+    exporter = Exporter(None, close_mpl=False, spatial_index=True)
+    events = list(exporter.iter_events(fig))
+    assert [event.kind for event in events][-3:] == ['spatial_index',
+                                                     'close_axes',
+                                                     'close_figure']
+    index = events[-3].index
+    assert index is exporter.spatial_indexes[ax]
+    assert len(index) == 7
+
+    x, y = ax.transData.transform((1.5, 0.8))
+    assert index.nearest(x + 1, y - 1)[:2] == (scatter, 1)
+    x, y = ax.transData.transform((2, 0))
+    assert index.nearest(x, y)[:2] == (line, 2)
+    assert index.within(x, y, 1)[0][2] < 1E-3
+
+    description = index.to_dict()
+    assert len(description['points']) == 14
+    assert len(description['starts']) == index.shape[0] * index.shape[1] + 1
+
+
+def test_spatial_index_exported_points():
+    fig, ax = plt.subplots()
+    line, = ax.plot(np.arange(1000), np.arange(1000) % 7, 'o')
+    ax.plot([0, 1], [0, 1], 'o', visible=False)
+
+    exporter = Exporter(None, close_mpl=False, spatial_index=True,
+                        budget=ExportBudget(points=100, allocate=False))
+    events = list(exporter.iter_events(fig))
+    markers = [event for event in events if event.kind == 'markers']
+    index = exporter.spatial_indexes[ax]
+
+    # only the decimated points of the visible line are indexed
+    assert index.artists == [line]
+    assert len(index) == len(markers[0].data) < 1000
+    indices = np.sort(index.indices)
+    assert_allclose(ax.transData.transform(line.get_xydata()[indices]),
+                    index.points[np.argsort(index.indices)], rtol=1E-5)
+
+    # a rasterized line is not indexed
+    exporter = Exporter(None, close_mpl=False, spatial_index=True,
+                        budget=ExportBudget(time=0))
+    list(exporter.iter_events(fig))
+    assert len(exporter.spatial_indexes[ax]) == 0
@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+
+from .. import utils
+from ..exporter import Exporter
+from ..instrument import Instrumentation
+from ..renderers import Renderer
+from ..styles import Style, StyleTable
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+class StyleRecorder(Renderer):
+    def __init__(self):
+        self.styles = []
+
+    def draw_path(self, data, coordinates, pathcodes, style,
+                  offset=None, offset_coordinates="data", mplobj=None):
+        self.styles.append(style)
+
+    def draw_line(self, data, coordinates, style, mplobj=None):
+        self.styles.append(style)
+
+
+def test_style_table():
+    table = StyleTable()
+    s1 = table.intern({'color': '#000000', 'linewidth': 1.0})
+    s2 = table.intern({'linewidth': 1.0, 'color': '#000000'})
+    s3 = table.intern({'color': '#000000', 'markerpath': (np.zeros((3, 2)),
+                                                          ['M', 'L', 'L'])})
+    assert s1 is s2
+    assert s1.id == 0 and s3.id == 1
+    assert len(table) == 2
+    assert dict(s1) == {'color': '#000000', 'linewidth': 1.0}
+
+
+def test_interned_styles():
+    fig, ax = plt.subplots()
+    for i in range(5):
+        ax.plot(np.arange(10) + i, '-k')
+    ax.scatter(np.arange(100), np.arange(100) % 7, c=np.arange(100) % 2)
+
+    renderer = StyleRecorder()
+    exporter = Exporter(renderer, intern_styles=True)
+    exporter.run(fig)
+
+    assert all(isinstance(style, Style) for style in renderer.styles)
+    # five identical lines, and scatter points in two colors
+    assert len(renderer.styles) == 105
+    assert len(set(style.id for style in renderer.styles)) == 3
+
+
+def test_intern_artist():
+    fig, ax = plt.subplots()
+    lines = [ax.plot(np.arange(10) + i, '-k')[0] for i in range(20)]
+    lines[-1].set_color('red')
+
+    calls = []
+    fields = dict((name, lambda line, func=func: calls.append(1) or
+                   func(line)) for name, func in utils.LINE_STYLE.items())
+    table = StyleTable()
+    records = [table.intern_artist(line, fields, utils.line_style_key)
+               for line in lines]
+
+    # the style dictionary is only built for the first line of each style
+    assert len(calls) == 2 * len(utils.LINE_STYLE)
+    assert len(table) == 2
+    assert records[0] is records[18] and records[19].id == 1
+    assert records[19]['color'] == '#FF0000'
+
+
+def test_interned_styles_computed_once():
+    fig, ax = plt.subplots()
+    for i in range(20):
+        ax.plot(np.arange(10) + i, '-k')
+
+    instrument = Instrumentation()
+    Exporter(StyleRecorder(), intern_styles=True,
+             instrument=instrument).run(fig)
+    # one line and one marker style computed, not one per line
+    assert instrument.report()['exporter.style'].calls == \
+        len(utils.LINE_STYLE) + len(utils.MARKER_STYLE)
+
+
+def test_plain_styles():
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(10), '-k')
+    ax.scatter(np.arange(10), np.arange(10), c=np.arange(10) % 2)
+
+    renderer = StyleRecorder()
+    Exporter(renderer).run(fig)
+    # without intern_styles, every element gets its own dictionary
+    assert len(renderer.styles) == 11
+    assert all(type(style) is dict for style in renderer.styles)
+    assert renderer.styles[1] == renderer.styles[3]
+    assert renderer.styles[1] is not renderer.styles[3]
+    json.dumps(renderer.styles)
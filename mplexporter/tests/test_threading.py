@@ -0,0 +1,170 @@
+import threading
+
+import numpy as np
+
+from ..exporter import Exporter
+from ..precision import PrecisionPolicy
+from ..pool import RendererPool
+from ..renderers import Renderer, VegaRenderer
+from ..styles import freeze
+
+from matplotlib import transforms
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+class AxesRecorder(Renderer):
+    """Record, per thread, the current axes of each line and markers"""
+    def __init__(self):
+        self.lines = {}
+
+    def draw_line(self, data, coordinates, style, mplobj=None):
+        self.lines.setdefault(threading.current_thread().name, []).append(
+            (mplobj.axes, self._current_ax))
+
+    draw_markers = draw_line
+
+
+def make_figure(n):
+    # created without pyplot, which is not thread-safe
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    for i in range(3):
+        ax = fig.add_subplot(3, 1, i + 1)
+        ax.plot(np.arange(n) * i, '-k')
+        ax.plot(np.arange(n), 'or')
+    return fig
+
+
+def run_threads(target, nthreads=8):
+    errors = []
+
+    def run(i):
+        try:
+            target(i)
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=run, args=(i,), name=str(i))
+               for i in range(nthreads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_shared_renderer_context():
+    figures = [make_figure(10 + i) for i in range(8)]
+    renderer = AxesRecorder()
+
+    def export(i):
+        for repeat in range(3):
+            Exporter(renderer, close_mpl=False).run(figures[i])
+
+    run_threads(export)
+    assert len(renderer.lines) == 8
+    for lines in renderer.lines.values():
+        assert len(lines) == 18
+        for line_axes, current_axes in lines:
+            assert line_axes is current_axes
+
+
+def test_renderer_pool():
+    figures = [make_figure(10 + i) for i in range(8)]
+    pool = RendererPool(VegaRenderer, size=3)
+    results = {}
+
+    def export(i):
+        for repeat in range(3):
+            data = pool.export(figures[i % 4], lambda renderer: renderer.data)
+            results.setdefault(i % 4, []).append(data)
+
+    run_threads(export)
+    assert pool.created <= 3
+    for i, outputs in results.items():
+        assert len(outputs) == 6
+        assert all(data == outputs[0] for data in outputs)
+        assert len(outputs[0][0]['values']) == 10 + i
+
+
+def freeze_style(style):
+    return sorted((key, freeze(style[key])) for key in style)
+
+
+class DataRecorder(Renderer):
+    def __init__(self):
+        self.calls = []
+
+    def open_axes(self, ax, properties):
+        self.calls.append(('axes', properties['xlim']))
+
+    def draw_line(self, data, coordinates, style, mplobj=None):
+        self.calls.append(('line', np.array(data), freeze_style(style)))
+
+    def draw_markers(self, data, coordinates, style, mplobj=None):
+        self.calls.append(('markers', np.array(data), freeze_style(style)))
+
+
+def test_parallel_axes():
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    for i in range(12):
+        ax = fig.add_subplot(3, 4, i + 1)
+        ax.plot(np.arange(100 + i) * i, '-k')
+        ax.plot(np.arange(10 + i), 'or')
+
+    serial = DataRecorder()
+    Exporter(serial, close_mpl=False).run(fig)
+    parallel = DataRecorder()
+    Exporter(parallel, close_mpl=False, workers=4).run(fig)
+
+    assert len(parallel.calls) == len(serial.calls) == 36
+    for call1, call2 in zip(serial.calls, parallel.calls):
+        assert call1[0] == call2[0]
+        np.testing.assert_array_equal(call1[1], call2[1])
+        assert call1[2:] == call2[2:]
+
+
+class ElementRecorder(DataRecorder):
+    def draw_path(self, data, coordinates, pathcodes, style, offset=None,
+                  offset_coordinates="data", mplobj=None):
+        self.calls.append(('path', np.array(data), freeze_style(style)))
+
+    def draw_text(self, text, position, coordinates, style, mplobj=None):
+        self.calls.append(('text', text, freeze_style(style)))
+
+
+def test_parallel_axes_frozen_transforms():
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    for i in range(4):
+        ax = fig.add_subplot(2, 2, i + 1)
+        ax.plot(np.arange(100 + i) * i, '-ok')
+        ax.scatter(np.arange(10), np.arange(10) % 3)
+        ax.bar([1, 2], [3, 4])
+        ax.text(1, 1, 'text')
+
+    # matplotlib's live transforms, whose caches are not thread-safe, are
+    # only read in the calling thread
+    threads = set()
+    methods = [(transforms.BboxTransformTo, 'get_matrix'),
+               (transforms.BboxTransformFrom, 'get_matrix'),
+               (transforms.TransformedBbox, 'get_points')]
+    originals = [getattr(cls, name) for cls, name in methods]
+
+    def recording(method):
+        def wrapper(self, *args, **kwargs):
+            threads.add(threading.current_thread().name)
+            return method(self, *args, **kwargs)
+        return wrapper
+
+    try:
+        for (cls, name), method in zip(methods, originals):
+            setattr(cls, name, recording(method))
+        Exporter(ElementRecorder(), close_mpl=False, workers=4,
+                 precision=PrecisionPolicy()).run(fig)
+    finally:
+        for (cls, name), method in zip(methods, originals):
+            setattr(cls, name, method)
+    assert threads == set([threading.current_thread().name])
@@ -0,0 +1,69 @@
+import datetime
+
+from ..exporter import Exporter
+from ..ticks import AxisPropertyCache
+from .. import utils
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib import ticker
+
+
+def axes_properties(exporter, fig):
+    return [event.properties for event in exporter.iter_events(fig)
+            if event.kind == 'open_axes']
+
+
+def test_axis_cache():
+    fig, ax = plt.subplots()
+    start = datetime.datetime(2014, 1, 1)
+    ax.plot([start + datetime.timedelta(days=i) for i in range(100)],
+            range(100))
+
+    cache = AxisPropertyCache()
+    exporter = Exporter(None, close_mpl=False, axis_cache=cache)
+    first = axes_properties(exporter, fig)
+    assert exporter.stats['axis_cache'] == {'hits': 0, 'misses': 2}
+    assert axes_properties(exporter, fig) == first
+    assert exporter.stats['axis_cache'] == {'hits': 2, 'misses': 0}
+
+    # the key follows limits, locators, formatters and figure size
+    ax.set_xlim(start, start + datetime.timedelta(days=3))
+    ax.yaxis.set_major_locator(ticker.FixedLocator([0, 50]))
+    properties = axes_properties(exporter, fig)[0]
+    assert exporter.stats['axis_cache'] == {'hits': 0, 'misses': 2}
+    assert properties['axes'] == [utils.get_axis_properties(ax.xaxis),
+                                  utils.get_axis_properties(ax.yaxis)]
+    assert properties['axes'][1]['tickvalues'] == [0, 50]
+
+    ax.yaxis.set_major_formatter(ticker.NullFormatter())
+    fig.set_size_inches(3, 2)
+    assert axes_properties(exporter, fig)[0]['axes'][1]['tickformat'] == ''
+    assert exporter.stats['axis_cache'] == {'hits': 0, 'misses': 2}
+
+    # and the parameters of locators and formatters changed in place
+    ax.yaxis.get_major_locator().locs = [0, 25, 50]
+    assert axes_properties(exporter, fig)[0]['axes'][1]['nticks'] == 3
+    assert exporter.stats['axis_cache'] == {'hits': 1, 'misses': 1}
+    ax.yaxis.set_major_locator(ticker.MaxNLocator(3))
+    ax.yaxis.set_major_formatter(ticker.ScalarFormatter())
+    first = axes_properties(exporter, fig)[0]['axes'][1]
+    ax.yaxis.get_major_locator().set_params(nbins=8)
+    properties = axes_properties(exporter, fig)[0]['axes'][1]
+    assert properties == utils.get_axis_properties(ax.yaxis)
+    assert properties['nticks'] > first['nticks']
+    assert exporter.stats['axis_cache'] == {'hits': 1, 'misses': 1}
+    ax.yaxis.get_major_formatter().set_powerlimits((-1, 1))
+    axes_properties(exporter, fig)
+    assert exporter.stats['axis_cache'] == {'hits': 1, 'misses': 1}
+    assert axes_properties(exporter, fig) == axes_properties(exporter, fig)
+    assert exporter.stats['axis_cache'] == {'hits': 2, 'misses': 0}
+
+    cache.invalidate(ax)
+    axes_properties(exporter, fig)
+    assert exporter.stats['axis_cache'] == {'hits': 0, 'misses': 2}
+
+    exporter = Exporter(None, close_mpl=False, axis_cache=False)
+    assert axes_properties(exporter, fig)[0]['axes'][1] == properties
+    assert 'axis_cache' not in exporter.stats
@@ -1,5 +1,7 @@
+import numpy as np
 from numpy.testing import assert_allclose, assert_equal
 import matplotlib.pyplot as plt
+from matplotlib.transforms import Affine2D
 from .. import utils
 
 
@@ -9,3 +11,13 @@ def test_path_data():
 
     assert_allclose(vertices.shape, (25, 2))
     assert_equal(codes, ['M', 'C', 'C', 'C', 'C', 'C', 'C', 'C', 'C', 'Z'])
+
+
+def test_transform_chunked():
+    transform = Affine2D().scale(2, 3).translate(1, 0)
+    data = np.random.random((1001, 2))
+
+    for step in [1, 3]:
+        result = utils.transform_chunked(transform, data[:, 0], data[:, 1],
+                                         chunksize=100, step=step)
+        assert_allclose(result, transform.transform(data[::step]))
@@ -0,0 +1,105 @@
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from ..exporter import Exporter
+from ..renderers import VegaBundle
+from ..renderers.vega_renderer import VegaHTML, VegaRenderer
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def test_vega_bundle():
+    x = np.linspace(0, 10, 50)
+    bundle = VegaBundle()
+    for i in range(3):
+        fig, ax = plt.subplots()
+        ax.plot(x, np.sin(x), '-k')
+        ax.plot(x, np.sin(x + i), '-r')
+        bundle.add(fig)
+
+    # one stored copy of each distinct column: x, sin(x), sin(x + 1) and
+    # sin(x + 2)
+    assert len(bundle.store) == 4
+    assert [len(new_keys) for spec, refs, new_keys in bundle.figures] == \
+        [2, 1, 1]
+    html = bundle.html()
+    assert html.count('<script src=') == 2
+    assert html.count('mplexporter.store["') == 4
+    assert html.count('mplexporter.render(') == 3
+
+    specification, refs, new_keys = bundle.figures[1]
+    specification = json.loads(specification)
+    assert 'values' not in specification['data'][0]
+    refs = json.loads(refs)
+    assert sorted(refs) == [table['name'] for table
+                            in specification['data']]
+    first_refs = json.loads(bundle.figures[0][1])
+    assert set(refs['table001'].values()) == \
+        set(first_refs['table001'].values()) | set(new_keys)
+
+    # identical figures share all of their data
+    fig, ax = plt.subplots()
+    ax.plot(x, np.sin(x), '-k')
+    ax.plot(x, np.sin(x + 2), '-r')
+    bundle.add(fig)
+    assert len(bundle.store) == 4
+    assert bundle.figures[-1][2] == []
+
+
+def test_vega_sidecar():
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(10), '-k')
+    ax.imshow(np.random.random((4, 4)), extent=(0, 9, 0, 9))
+    renderer = VegaRenderer()
+    Exporter(renderer).run(fig)
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'figure.html')
+        VegaHTML(renderer).save(path)
+        with open(path) as f:
+            html = f.read()
+        files = sorted(os.listdir(os.path.join(directory, 'figure_files')))
+        assert sorted(os.path.splitext(name)[1]
+                      for name in files) == ['.json', '.png']
+        for name in files:
+            assert 'figure_files/' + name in html
+        assert 'base64' not in html
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_vega_spatial_index():
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(10), 'ok')
+    renderer = VegaRenderer()
+    exporter = Exporter(renderer, spatial_index=True)
+    exporter.run(fig)
+    index = renderer.spatial_indexes[0]
+    assert index is exporter.spatial_indexes[ax]
+
+    vega_html = VegaHTML(renderer)
+    description, = vega_html.specification['spatial_indexes']
+    assert description == index.to_dict()
+    assert len(description['points']) == 20
+    assert json.dumps(description) in vega_html.html()
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'figure.html')
+        vega_html.save(path)
+        with open(path) as f:
+            html = f.read()
+        files = os.listdir(os.path.join(directory, 'figure_files'))
+        assert len([name for name in files
+                    if os.path.splitext(name)[1] == '.bin']) == 4
+        assert html.count('Int32Array') == 3
+        assert html.count('Float32Array') == 1
+    finally:
+        shutil.rmtree(directory)
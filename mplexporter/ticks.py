@@ -0,0 +1,139 @@
+"""
+Axis Property Cache
+===================
+This submodule contains the cache of axis and tick properties used by the
+Exporter.  Extracting the properties of an axis calls its tick locator and
+formats its tick labels, which is costly for some locators (e.g. those of
+date axes); the cache keeps the properties of each axis from one export to
+the next, until the axis changes.
+
+An entry is reused while the view limits, scale, locator, formatter and
+tick parameters of the axis, the visibility of its tick labels, and the
+size of its figure and axes are unchanged.  The locator and formatter are
+compared along with the values of their attributes, so that parameters
+changed in place (e.g. with ``set_params`` or ``set_powerlimits``) are
+seen; the objects they refer to, such as the time zone of a date locator,
+are only compared by type.  Changes the key cannot see require an
+explicit :meth:`AxisPropertyCache.invalidate`.
+"""
+import numbers
+import threading
+import weakref
+
+import numpy as np
+
+from . import utils
+from .styles import freeze
+
+
+def _snapshot(value):
+    """Return a copy of a plain value (a number, string, array or container
+    of them) which compares equal to it while it is unchanged, or the type
+    of other objects"""
+    if isinstance(value, np.ndarray):
+        return freeze(value)
+    elif isinstance(value, (list, tuple)):
+        return tuple(_snapshot(item) for item in value)
+    elif isinstance(value, dict):
+        return tuple((key, _snapshot(item)) for key, item in value.items())
+    elif value is None or isinstance(value, (numbers.Number, str, bytes,
+                                             type(u''))):
+        return value
+    return type(value)
+
+
+def _state(obj):
+    """Return the locator or formatter obj, with a snapshot of its
+    attributes"""
+    return (obj, sorted((name, _snapshot(value))
+                        for name, value in vars(obj).items()))
+
+
+def axis_key(axis):
+    """Return the values which determine the properties of an axis
+
+    The key holds the locator and formatter themselves, so that a new
+    locator never matches a discarded one which had the same id.
+    """
+    fig = axis.axes.figure
+    return (tuple(axis.get_view_interval()),
+            axis.get_scale(),
+            _state(axis.get_major_locator()),
+            _state(axis.get_major_formatter()),
+            sorted(axis._major_tick_kw.items()),
+            [(tick.label1.get_visible(), tick.label2.get_visible())
+             for tick in axis.majorTicks],
+            tuple(fig.get_size_inches()), fig.dpi,
+            tuple(axis.axes.get_position().bounds))
+
+
+class AxisPropertyCache(object):
+    """A cache of the properties of matplotlib axes, across exports
+
+    Entries are held per Axis object, and released with it.  The cache may
+    be shared by exporters running in several threads.
+
+    Attributes
+    ----------
+    hits, misses : int
+        The number of lookups answered from the cache, and computed.
+    """
+    def __init__(self):
+        self._entries = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, axis, stats=None):
+        """Return the property dictionary of an Axis instance
+
+        The result is that of utils.get_axis_properties; it is a copy, which
+        the caller may modify.  If stats is given, its 'hits' or 'misses'
+        entry is incremented.
+        """
+        key = axis_key(axis)
+        with self._lock:
+            entry = self._entries.get(axis)
+        try:
+            hit = entry is not None and entry[0] == key
+        except ValueError:
+            # e.g. array-valued tick parameters
+            hit = False
+        if hit:
+            props = entry[1]
+        else:
+            props = utils.get_axis_properties(axis)
+            # calling the locator may update its attributes
+            key = axis_key(axis)
+            with self._lock:
+                self._entries[axis] = (key, props)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if stats is not None:
+                stats['hits' if hit else 'misses'] += 1
+        props = dict(props)
+        if props['tickvalues'] is not None:
+            props['tickvalues'] = list(props['tickvalues'])
+        return props
+
+    def invalidate(self, axis=None):
+        """Drop the entry of an Axis instance (or of its two axes, given an
+        Axes instance), or all entries if axis is None"""
+        with self._lock:
+            if axis is None:
+                self._entries.clear()
+            elif hasattr(axis, 'xaxis'):
+                for item in (axis.xaxis, axis.yaxis):
+                    self._entries.pop(item, None)
+            else:
+                self._entries.pop(axis, None)
+
+
+# the cache shared by exporters by default
+default_cache = AxisPropertyCache()
@@ -2,9 +2,11 @@
 Utility Routines for Working with Matplotlib Objects
 ====================================================
 """
+import warnings
 import itertools
 import io
 import base64
+import tempfile
 
 import numpy as np
 
@@ -18,7 +20,7 @@ from matplotlib import ticker
 
 def color_to_hex(color):
     """Convert matplotlib color code to hex color code"""
-    if color in ['none', 'None', None]:
+    if not isinstance(color, np.ndarray) and color in ['none', 'None', None]:
         return 'none'
     else:
         rgb = colorConverter.to_rgb(color)
@@ -113,68 +115,185 @@ def SVG_path(path, transform=None, simplify=False):
         return vertices, list(codes)
 
 
-def get_path_style(path):
-    """Get the style dictionary for matplotlib path objects"""
-    style = {}
-    style['alpha'] = path.get_alpha()
-    if style['alpha'] is None:
-        style['alpha'] = 1
-    style['edgecolor'] = color_to_hex(path.get_edgecolor())
-    style['facecolor'] = color_to_hex(path.get_facecolor())
-    style['edgewidth'] = path.get_linewidth()
-    style['dasharray'] = get_dasharray(path)
-    style['zorder'] = path.get_zorder()
-    return style
+def is_memmap(array):
+    """Return True if array is (a view of) a numpy memory-mapped array"""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, 'base', None)
+    return False
 
 
-def get_line_style(line):
-    """Get the style dictionary for matplotlib line objects"""
-    style = {}
-    style['alpha'] = line.get_alpha()
-    if style['alpha'] is None:
-        style['alpha'] = 1
-    style['color'] = color_to_hex(line.get_color())
-    style['linewidth'] = line.get_linewidth()
-    style['dasharray'] = get_dasharray(line)
-    style['zorder'] = line.get_zorder()
-    return style
+def empty_buffer(shape, dtype=float, memmap=False):
+    """Allocate an uninitialized output array
 
+    If memmap is True, the array is backed by an anonymous temporary file
+    rather than by memory.
+    """
+    if memmap:
+        return np.memmap(tempfile.TemporaryFile(), dtype=dtype,
+                         mode='w+', shape=shape)
+    else:
+        return np.empty(shape, dtype=dtype)
 
-def get_marker_style(line):
-    """Get the style dictionary for matplotlib marker objects"""
-    style = {}
-    style['alpha'] = line.get_alpha()
-    if style['alpha'] is None:
-        style['alpha'] = 1
 
-    style['facecolor'] = color_to_hex(line.get_markerfacecolor())
-    style['edgecolor'] = color_to_hex(line.get_markeredgecolor())
-    style['edgewidth'] = line.get_markeredgewidth()
+def transform_chunked(transform, x, y, chunksize=65536, step=1, out=None):
+    """Transform data in fixed-size chunks
 
-    style['marker'] = line.get_marker()
+    Parameters
+    ----------
+    transform : matplotlib Transform object
+        The transform applied to the data.
+    x, y : array_like
+        The length-N x and y columns of the data.  These may be
+        memory-mapped: only one chunk at a time is read into memory.
+    chunksize : integer (optional)
+        The number of output points transformed at once.
+    step : integer (optional)
+        If greater than 1, decimate the data by keeping every step-th point.
+    out : ndarray (optional)
+        The shape (M, 2) output array, where M = ceil(N / step).  If not
+        specified, a new array is allocated.
+
+    Returns
+    -------
+    out : ndarray
+        The shape (M, 2) array of transformed data.
+    """
+    npts = (len(x) + step - 1) // step
+    if out is None:
+        out = np.empty((npts, 2))
+    chunk = np.empty((min(chunksize, npts), 2))
+    for start in range(0, npts, chunksize):
+        stop = min(start + chunksize, npts)
+        source = slice(start * step, stop * step, step)
+        chunk = chunk[:stop - start]
+        chunk[:, 0] = x[source]
+        chunk[:, 1] = y[source]
+        out[start:stop] = transform.transform(chunk)
+    return out
+
+
+def get_alpha(obj):
+    """Get the alpha of a matplotlib object, defaulting to 1"""
+    alpha = obj.get_alpha()
+    if alpha is None:
+        alpha = 1
+    return alpha
+
+
+def get_marker_path(line):
+    """Get the SVG vertices and codes of the marker of a matplotlib line"""
     markerstyle = MarkerStyle(line.get_marker())
     markersize = line.get_markersize()
     markertransform = (markerstyle.get_transform()
                        + Affine2D().scale(markersize, -markersize))
-    style['markerpath'] = SVG_path(markerstyle.get_path(),
-                                   markertransform)
-    style['zorder'] = line.get_zorder()
-    return style
+    return SVG_path(markerstyle.get_path(), markertransform)
+
+
+# The style dictionaries are defined as mappings of keys to functions
+# computing the value from the matplotlib object: this allows them to be
+# built either eagerly by get_style, or lazily via
+# mplexporter.lazy.LazyStyle.
+
+PATH_STYLE = {'alpha': get_alpha,
+              'edgecolor': lambda path: color_to_hex(path.get_edgecolor()),
+              'facecolor': lambda path: color_to_hex(path.get_facecolor()),
+              'edgewidth': lambda path: path.get_linewidth(),
+              'dasharray': get_dasharray,
+              'zorder': lambda path: path.get_zorder()}
+
+LINE_STYLE = {'alpha': get_alpha,
+              'color': lambda line: color_to_hex(line.get_color()),
+              'linewidth': lambda line: line.get_linewidth(),
+              'dasharray': get_dasharray,
+              'zorder': lambda line: line.get_zorder()}
+
+MARKER_STYLE = {'alpha': get_alpha,
+                'facecolor': lambda line: color_to_hex(
+                    line.get_markerfacecolor()),
+                'edgecolor': lambda line: color_to_hex(
+                    line.get_markeredgecolor()),
+                'edgewidth': lambda line: line.get_markeredgewidth(),
+                'marker': lambda line: line.get_marker(),
+                'markerpath': get_marker_path,
+                'zorder': lambda line: line.get_zorder()}
+
+TEXT_STYLE = {'alpha': get_alpha,
+              'fontsize': lambda text: text.get_size(),
+              'color': lambda text: color_to_hex(text.get_color()),
+              # left, center, right
+              'halign': lambda text: text.get_horizontalalignment(),
+              # baseline, center, top
+              'valign': lambda text: text.get_verticalalignment(),
+              'rotation': lambda text: text.get_rotation(),
+              'zorder': lambda text: text.get_zorder()}
+
+COLLECTION_STYLE = {'linewidth': lambda coll: coll.get_linewidths(),
+                    'facecolor': lambda coll: coll.get_facecolors(),
+                    'edgecolor': lambda coll: coll.get_edgecolors(),
+                    'alpha': lambda coll: coll._alpha,
+                    'zorder': lambda coll: coll.get_zorder()}
+
+IMAGE_STYLE = {'alpha': lambda image: image.get_alpha(),
+               'zorder': lambda image: image.get_zorder()}
+
+
+# The style keys are functions returning the raw properties which determine
+# the corresponding style dictionary, so that an interned style can be found
+# without formatting its values (see mplexporter.styles.StyleTable).
+
+def path_style_key(path):
+    return (path.get_alpha(), path.get_edgecolor(), path.get_facecolor(),
+            path.get_linewidth(), path.get_linestyle(),
+            path.__dict__.get('_dashSeq', None), path.get_zorder())
+
+
+def line_style_key(line):
+    return (line.get_alpha(), line.get_color(), line.get_linewidth(),
+            line.get_linestyle(), line.__dict__.get('_dashSeq', None),
+            line.get_zorder())
+
+
+def marker_style_key(line):
+    return (line.get_alpha(), line.get_markerfacecolor(),
+            line.get_markeredgecolor(), line.get_markeredgewidth(),
+            line.get_marker(), line.get_markersize(), line.get_zorder())
+
+
+def text_style_key(text):
+    return (text.get_alpha(), text.get_size(), text.get_color(),
+            text.get_horizontalalignment(), text.get_verticalalignment(),
+            text.get_rotation(), text.get_zorder())
+
+
+def image_style_key(image):
+    return (image.get_alpha(), image.get_zorder())
+
+
+def get_style(obj, fields):
+    """Build the style dictionary for obj from a mapping of style fields"""
+    return dict((key, func(obj)) for key, func in fields.items())
+
+
+def get_path_style(path):
+    """Get the style dictionary for matplotlib path objects"""
+    return get_style(path, PATH_STYLE)
+
+
+def get_line_style(line):
+    """Get the style dictionary for matplotlib line objects"""
+    return get_style(line, LINE_STYLE)
+
+
+def get_marker_style(line):
+    """Get the style dictionary for matplotlib marker objects"""
+    return get_style(line, MARKER_STYLE)
 
 
 def get_text_style(text):
     """Return the text style dict for a text instance"""
-    style = {}
-    style['alpha'] = text.get_alpha()
-    if style['alpha'] is None:
-        style['alpha'] = 1
-    style['fontsize'] = text.get_size()
-    style['color'] = color_to_hex(text.get_color())
-    style['halign'] = text.get_horizontalalignment()  # left, center, right
-    style['valign'] = text.get_verticalalignment()  # baseline, center, top
-    style['rotation'] = text.get_rotation()
-    style['zorder'] = text.get_zorder()
-    return style
+    return get_style(text, TEXT_STYLE)
 
 
 def get_axis_properties(axis):
@@ -195,12 +314,13 @@ def get_axis_properties(axis):
     else:
         raise ValueError("{0} should be an Axis instance".format(axis))
 
-    props['nticks'] = len(axis.get_major_locator()())
+    locator = axis.get_major_locator()
+    ticks = locator()
+    props['nticks'] = len(ticks)
 
     # Use tick values if appropriate
-    locator = axis.get_major_locator()
     if isinstance(locator, ticker.FixedLocator):
-        props['tickvalues'] = list(locator())
+        props['tickvalues'] = list(ticks)
     else:
         props['tickvalues'] = None
 
@@ -242,3 +362,41 @@ def image_to_base64(image):
 
     binary_buffer.seek(0)
     return base64.b64encode(binary_buffer.read()).decode('utf-8')
+
+
+def rasterize_artist(artist, ax):
+    """
+    Draw a matplotlib artist alone, and return a base64 png of the axes area
+
+    Parameters
+    ----------
+    artist : matplotlib artist
+        The artist to be drawn, e.g. a line or a collection.
+    ax : matplotlib Axes
+        The axes of the artist: the image covers its bounding box, at the
+        resolution of the figure.
+
+    Returns
+    -------
+    image_base64 : string
+        The UTF8-encoded base64 string representation of the png image,
+        transparent where the artist is not drawn.
+    """
+    from matplotlib.backends.backend_agg import RendererAgg
+    from matplotlib.image import imsave
+
+    fig = ax.figure
+    width, height = fig.bbox.size
+    renderer = RendererAgg(width, height, fig.dpi)
+    artist.draw(renderer)
+    rgba = np.frombuffer(renderer.buffer_rgba(), np.uint8).reshape(
+        int(height), int(width), 4)
+
+    # display coordinates start from the bottom, image rows from the top
+    x0, y0, x1, y1 = np.round(ax.bbox.extents).astype(int)
+    rgba = rgba[max(int(height) - y1, 0):max(int(height) - y0, 0),
+                max(x0, 0):max(x1, 0)]
+
+    binary_buffer = io.BytesIO()
+    imsave(binary_buffer, rgba, format='png')
+    return base64.b64encode(binary_buffer.getvalue()).decode('utf-8')